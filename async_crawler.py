@@ -0,0 +1,162 @@
+import asyncio
+import time
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from crawler import Crawler
+from http_client import (
+    ASYNC_TRANSIENT_ERRORS,
+    RETRY_STATUSES,
+    FetchedResponse,
+    HtmlBodyReader,
+    TransientError,
+    retry_after_seconds,
+)
+
+
+class AsyncCrawler(Crawler):
+    def __init__(self, *args, client_session=None, **kwargs):
+        """
+        Crawler driven by an asyncio event loop.
+
+        Takes the same arguments as Crawler. Pages are fetched with aiohttp
+        when a client session is given; otherwise the blocking fetch runs on
+        the loop's default executor. Link extraction and all bookkeeping stay
+        on the event loop, exactly as in Crawler.iter_crawl().
+
+        Args:
+            client_session: aiohttp.ClientSession used for fetches, or None
+        """
+        super().__init__(*args, **kwargs)
+        self.client_session = client_session
+
+    async def aload_robots_txt(self) -> None:
+        """Fetch robots.txt once without blocking the event loop."""
+        if self.robot_parser is None or self.robots_loaded:
+            return
+        if self.client_session is None:
+            await asyncio.get_running_loop().run_in_executor(None, self.load_robots_txt)
+            return
+
+        self.robots_loaded = True
+        try:
+            async with self.client_session.get(self.robot_parser.url) as response:
+                text = await response.text(errors="replace")
+                self.parse_robots_txt(response.status, text)
+        except Exception as e:
+            print(f"Warning: Could not read robots.txt: {e}")
+
+    async def afetch(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> FetchedResponse:
+        """
+        Fetch a single page and report the outcome to the rate limiter.
+
+        Args:
+            url: The URL to fetch
+            headers: Extra request headers, e.g. conditional request validators
+
+        Returns:
+            The HTTP response (status 200 or 304)
+
+        Raises:
+            ResponseRejected: If the page is not HTML or exceeds max_page_bytes
+            TransientError: If the request failed in a way worth retrying
+        """
+        if self.client_session is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.fetch, url, headers
+            )
+
+        status_code, ttfb, retry_after = None, None, None
+        try:
+            start = time.perf_counter()
+            async with self.client_session.get(url, headers=headers) as response:
+                status_code, ttfb = response.status, time.perf_counter() - start
+                text, size = "", 0
+                if response.ok and response.status != 304:
+                    reader = HtmlBodyReader(response.headers, self.max_page_bytes)
+                    async for chunk in response.content.iter_chunked(65536):
+                        reader.feed(chunk)
+                    text, size = reader.text(), reader.size
+                if self.metrics.enabled:
+                    self.record_fetch(
+                        status_code, ttfb, time.perf_counter() - start, size
+                    )
+                if status_code in RETRY_STATUSES:
+                    retry_after = retry_after_seconds(
+                        response.headers.get("Retry-After")
+                    )
+                    raise TransientError(
+                        f"{status_code} {response.reason} for url: {url}",
+                        status_code,
+                        retry_after,
+                    )
+                response.raise_for_status()
+                return FetchedResponse(
+                    status_code, response.headers, text, str(response.url)
+                )
+        except ASYNC_TRANSIENT_ERRORS as e:
+            raise TransientError(str(e) or type(e).__name__) from e
+        finally:
+            self.rate_limiter.record(url, status_code, ttfb, retry_after)
+
+    async def aiter_crawl(self) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Crawl the website, yielding each page as soon as it has been fetched.
+
+        The asyncio counterpart of Crawler.iter_crawl(): up to ``concurrency``
+        fetches are awaited at once. Fetches still in flight are cancelled if
+        the consumer stops early.
+
+        Yields:
+            Tuples of (url, page) where page is the dictionary built by
+            build_page
+        """
+        await self.aload_robots_txt()
+        for url, page in self.start_crawl():
+            yield url, page
+        if self.use_sitemaps:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.seed_from_sitemaps
+            )
+        in_flight: Dict[asyncio.Task, Tuple[str, int]] = {}
+
+        try:
+            while self.frontier or self.retries or in_flight:
+                # Keep every slot busy while there is work queued
+                while len(in_flight) < self.concurrency:
+                    request = self.next_request()
+                    if request is None:
+                        break
+                    url, depth, headers = request
+                    in_flight[asyncio.ensure_future(self.afetch(url, headers))] = (
+                        url,
+                        depth,
+                    )
+
+                while self.ready:
+                    yield self.ready.popleft()
+                if not in_flight:
+                    # Nothing to handle until the next request slot or retry
+                    pause = self.idle_time()
+                    if pause:
+                        await asyncio.sleep(pause)
+                    continue
+
+                # Wake up for the next request slot if a slot is free for it
+                timeout = (
+                    self.idle_time() if len(in_flight) < self.concurrency else None
+                )
+                done, _ = await asyncio.wait(
+                    in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    url, depth = in_flight.pop(task)
+                    page = self.handle_response(url, depth, task.result)
+                    if page is not None:
+                        yield url, page
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+        self.finish_crawl()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+"""
+Link Extraction Benchmark
+
+Times how long the crawler takes to pull the title and same-site links out
+of a page, comparing the PageScanner pass that Crawler.extract_links uses
+with building a full BeautifulSoup tree and searching it. Pages come from
+the benchmark fixture site, with a configurable number of navigation links.
+Both paths must find the same title and links; any difference is reported.
+
+Example:
+    python benchmarks/bench_extract.py --pages 50 --links 2000 -o extract.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urljoin, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from bench_pipeline import summarize  # noqa: E402
+from crawler import Crawler  # noqa: E402
+from fixture_site import FixtureSite  # noqa: E402
+from page_document import PageDocument  # noqa: E402
+
+BASE_URL = "http://docs.example.com/docs/page0.html"
+
+
+def extract_with_soup(
+    crawler: Crawler, url: str, html: str, parser: str
+) -> Tuple[str, List[str]]:
+    """The tree-based path: parse the page, then find <title>, <base> and <a href>."""
+    soup = BeautifulSoup(html, parser)
+    title_tag = soup.find("title")
+    title = title_tag.get_text() if title_tag else "Untitled Page"
+    base_tag = soup.find("base", href=True)
+    base_url = urljoin(url, base_tag["href"]) if base_tag else url
+
+    base_netloc = urlparse(crawler.base_url).netloc
+    links = []
+    for a_tag in soup.find_all("a", href=True):
+        normalized_url = crawler.normalize_url(urljoin(base_url, a_tag["href"]))
+        if urlparse(normalized_url).netloc == base_netloc:
+            links.append(normalized_url)
+    return title, links
+
+
+def extract_with_scanner(
+    crawler: Crawler, url: str, html: str, parser: str
+) -> Tuple[str, List[str]]:
+    """The crawler's path: one PageScanner pass, no tree."""
+    document = PageDocument(url, html, parser)
+    return crawler.extract_title(document), crawler.extract_links(url, document)
+
+
+def time_path(
+    extract: Callable,
+    crawler: Crawler,
+    pages: List[Tuple[str, str]],
+    parser: str,
+    rounds: int,
+) -> Tuple[List[float], List[Tuple[str, List[str]]]]:
+    """Extract every page ``rounds`` times; returns latencies and the last results."""
+    samples, results = [], []
+    for _ in range(rounds):
+        results = []
+        for url, html in pages:
+            start = time.perf_counter()
+            results.append(extract(crawler, url, html, parser))
+            samples.append(time.perf_counter() - start)
+    return samples, results
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict:
+    """Render the fixture pages and time both extraction paths on them."""
+    site = FixtureSite(
+        pages=args.pages, fanout=args.links, page_size=args.page_size, images_per_page=0
+    )
+    pages = [
+        (urljoin(BASE_URL, f"page{n}.html"), site.render_page(n).decode("utf-8"))
+        for n in range(args.pages)
+    ]
+
+    paths = {"soup": extract_with_soup, "scanner": extract_with_scanner}
+    stages, results = {}, {}
+    for name, extract in paths.items():
+        # A fresh crawler per path, so the scanner path starts with a cold link cache
+        crawler = Crawler(BASE_URL, respect_robots_txt=False, parser=args.parser)
+        samples, results[name] = time_path(
+            extract, crawler, pages, args.parser, args.rounds
+        )
+        stages[name] = summarize(samples)
+
+    mismatches = [
+        url
+        for (url, _), soup, scanner in zip(pages, results["soup"], results["scanner"])
+        if soup != scanner
+    ]
+    soup_total, scanner_total = stages["soup"]["total_s"], stages["scanner"]["total_s"]
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "pages": args.pages,
+            "links": args.links,
+            "page_size": args.page_size,
+            "parser": args.parser,
+            "rounds": args.rounds,
+        },
+        "speedup": round(soup_total / scanner_total, 2) if scanner_total else 0.0,
+        "mismatches": mismatches,
+        "stages": stages,
+    }
+
+
+def print_report(result: Dict) -> None:
+    """Print a human-readable summary of a benchmark result."""
+    config = result["config"]
+    print(
+        f"Pages: {config['pages']}  Links per page: {config['links']}  "
+        f"Parser: {config['parser']}"
+    )
+    print(
+        f"{'path':<16}{'count':>8}{'total s':>10}"
+        f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+    )
+    for path, stats in result["stages"].items():
+        print(
+            f"{path:<16}{stats['count']:>8}{stats['total_s']:>10.3f}"
+            f"{stats['p50_ms']:>10.3f}{stats['p90_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+        )
+    print(f"Speedup: {result['speedup']}x")
+    if result["mismatches"]:
+        print(
+            f"Different results on {len(result['mismatches'])} pages, "
+            f"e.g. {result['mismatches'][0]}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark link and title extraction on fixture pages."
+    )
+    parser.add_argument(
+        "--pages", type=int, default=50, help="Number of pages (default: 50)"
+    )
+    parser.add_argument(
+        "--links", type=int, default=1000, help="Links per page (default: 1000)"
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=20000,
+        help="Approximate page size in bytes (default: 20000)",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=["html.parser", "lxml", "html5lib"],
+        default="html.parser",
+        help="BeautifulSoup parser for the tree-based path (default: html.parser)",
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=3,
+        help="Times each page is extracted (default: 3)",
+    )
+    parser.add_argument("-o", "--output", help="Write the result as JSON to this file")
+
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if result["mismatches"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
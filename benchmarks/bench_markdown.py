@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+
+"""
+Markdown Backend Benchmark
+
+Checks that every Markdown backend renders a corpus of small HTML cases
+(headings, emphasis, links, lists, tables, code blocks, block quotes and
+images) to the same document, then times each backend on pages from the
+benchmark fixture site. Backends differ in layout details that do not change
+the document, e.g. html2text indents code blocks where the tree backend
+fences them, so both outputs are normalized before they are compared. Any
+case whose normalized output differs is reported and fails the run.
+
+Timings are taken twice: with the page tree already built, as when the
+crawl has parsed the page (e.g. for --near-duplicates), and from raw HTML,
+where the tree backend pays for parsing the page itself.
+
+Example:
+    python benchmarks/bench_markdown.py --pages 100 -o markdown.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_pipeline import summarize  # noqa: E402
+from fixture_site import FixtureSite  # noqa: E402
+from markdown_backends import BACKENDS, create_backend  # noqa: E402
+from page_document import PageDocument  # noqa: E402
+
+BASE_URL = "http://docs.example.com/docs/page0.html"
+
+# Small pages covering each construct the converter has to handle
+CORPUS = {
+    "headings": (
+        "<h1>Title</h1><p>Intro</p><h2>Section <em>two</em></h2>"
+        "<h3>Three</h3><p>Body</p>"
+    ),
+    "emphasis": (
+        "<p>Some <strong>bold</strong>, <em>italic</em> and "
+        "<b>mixed <i>nested</i></b> text.</p>"
+    ),
+    "inline_code": (
+        "<p>Call <code>run()</code> or <kbd>Ctrl</kbd> then <code>exit</code>.</p>"
+    ),
+    "links": (
+        '<p>See <a href="guide.html">the guide</a>, <a href="/api/">API</a> and '
+        '<a href="https://example.org/x?a=1#top">elsewhere</a>.</p>'
+    ),
+    "unordered_list": (
+        "<ul><li>One</li><li>Two <a href='b.html'>link</a></li><li>Three</li></ul>"
+    ),
+    "ordered_list": "<ol><li>First</li><li>Second</li><li>Third</li></ol>",
+    "nested_list": (
+        "<ul><li>Outer<ul><li>Inner one</li><li>Inner two</li></ul></li>"
+        "<li>Last</li></ul>"
+    ),
+    "table": (
+        "<table><tr><th>Name</th><th>Value</th></tr><tr><td>a</td><td>1</td></tr>"
+        "<tr><td><code>b</code></td><td><em>2</em></td></tr></table>"
+    ),
+    "table_sections": (
+        "<table><thead><tr><th>Key</th><th>Description</th></tr></thead>"
+        "<tbody><tr><td>x</td><td>The x axis</td></tr></tbody></table>"
+    ),
+    "code_block": (
+        "<p>Example:</p><pre><code>def f(x):\n    return x * 2\n\nprint(f(3))\n"
+        "</code></pre><p>Done.</p>"
+    ),
+    "code_language": (
+        '<pre><code class="language-python">import os\nprint(os.sep)</code></pre>'
+    ),
+    "blockquote": (
+        "<blockquote><p>Quoted <strong>text</strong>.</p>"
+        "<p>Second paragraph.</p></blockquote>"
+    ),
+    "images": (
+        '<p><img src="images/logo.png" alt="Logo"> and '
+        '<img src="/static/a.svg" alt=""></p>'
+        '<p><a href="big.html"><img src="thumb.png" alt="Thumb"></a></p>'
+    ),
+    "line_breaks": "<p>Line one<br>Line two<br/>Line three</p>",
+    "mixed": (
+        "<div><h2>Install</h2><p>Run:</p><pre>pip install docrepo</pre>"
+        "<ul><li>Step <code>one</code></li><li>Step two</li></ul><hr><p>End</p></div>"
+    ),
+}
+
+FENCE_PATTERN = re.compile(r"^\s*(`{3,}|~{3,})")
+LIST_PATTERN = re.compile(r"^(\s*)(?:[*+-]|\d+\.)\s+(.*)$")
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*#*$")
+TABLE_SEPARATOR_PATTERN = re.compile(r"^[\s|:-]+$")
+# Link and image targets written as <url>
+PROTECTED_TARGET_PATTERN = re.compile(r"\]\(<([^>]*)>\)")
+SPACE_BEFORE_PUNCTUATION_PATTERN = re.compile(r"\s+([,.;:!?)])")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+HR_PATTERN = re.compile(r"^\s*(?:[*_-]\s*){3,}$")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize inline Markdown: link targets, spacing and escapes."""
+    text = PROTECTED_TARGET_PATTERN.sub(r"](\1)", text)
+    text = WHITESPACE_PATTERN.sub(" ", text).strip()
+    text = SPACE_BEFORE_PUNCTUATION_PATTERN.sub(r"\1", text)
+    return text.replace("\\|", "|")
+
+
+def normalize(markdown: str) -> List[Tuple]:
+    """
+    Reduce Markdown to a list of blocks that do not depend on layout.
+
+    Fenced and indented code become the same code block, table rows become
+    lists of cells whatever their outer pipes, list items keep their nesting
+    depth but not their marker, and headings, quotes and paragraphs keep
+    only their normalized text.
+
+    Args:
+        markdown: Markdown produced by a backend
+
+    Returns:
+        List of (kind, ...) tuples
+    """
+    blocks: List[Tuple] = []
+    lines = markdown.replace("\r\n", "\n").split("\n")
+    code: List[str] = []
+    # Indents of the enclosing list items, to turn indent widths into depths
+    indents: List[int] = []
+    index = 0
+
+    def flush_code():
+        if code:
+            blocks.append(("code", "\n".join(code).strip("\n")))
+            code.clear()
+
+    while index < len(lines):
+        line = lines[index].rstrip()
+        index += 1
+
+        fence = FENCE_PATTERN.match(line)
+        if fence:
+            flush_code()
+            while index < len(lines) and not lines[index].strip().startswith(
+                fence.group(1)
+            ):
+                code.append(lines[index].rstrip())
+                index += 1
+            index += 1
+            flush_code()
+            continue
+        if line.startswith("    ") and not LIST_PATTERN.match(line):
+            # An indented code line (html2text's code blocks)
+            code.append(line[4:])
+            continue
+        if not line.strip():
+            # Blank lines inside indented code belong to the code
+            if code and index < len(lines) and lines[index].startswith("    "):
+                code.append("")
+            continue
+        flush_code()
+
+        if HR_PATTERN.match(line):
+            blocks.append(("hr",))
+            continue
+        heading = HEADING_PATTERN.match(line)
+        if heading:
+            blocks.append(
+                ("heading", len(heading.group(1)), normalize_text(heading.group(2)))
+            )
+            continue
+        if line.startswith(">"):
+            text = normalize_text(line.lstrip("> "))
+            if text:
+                blocks.append(("quote", text))
+            continue
+        item = LIST_PATTERN.match(line)
+        if item:
+            indent = len(item.group(1).replace("\t", "    "))
+            while indents and indents[-1] > indent:
+                indents.pop()
+            if not indents or indents[-1] < indent:
+                indents.append(indent)
+            blocks.append(("item", len(indents) - 1, normalize_text(item.group(2))))
+            continue
+        indents.clear()
+        if "|" in line.replace("\\|", ""):
+            if TABLE_SEPARATOR_PATTERN.match(line):
+                continue
+            cells = re.split(r"(?<!\\)\|", line.strip().strip("|"))
+            blocks.append(("row", tuple(normalize_text(cell) for cell in cells)))
+            continue
+        blocks.append(("text", normalize_text(line)))
+
+    flush_code()
+    return blocks
+
+
+def check_corpus(backends: Dict, parser: str) -> Dict[str, Dict[str, str]]:
+    """
+    Render every corpus case with every backend.
+
+    Returns:
+        The cases whose normalized output differs, with each backend's Markdown
+    """
+    mismatches = {}
+    for case, body in CORPUS.items():
+        html = f"<html><head><title>{case}</title></head><body>{body}</body></html>"
+        outputs = {
+            name: backend.convert(PageDocument(BASE_URL, html, parser))
+            for name, backend in backends.items()
+        }
+        if len({repr(normalize(markdown)) for markdown in outputs.values()}) > 1:
+            mismatches[case] = outputs
+    return mismatches
+
+
+def time_backends(
+    backends: Dict, pages: List[str], parser: str, rounds: int, parsed: bool
+) -> Dict[str, Dict[str, float]]:
+    """
+    Convert every page ``rounds`` times with each backend.
+
+    With ``parsed``, the page tree is built before the clock starts, as when
+    the crawl has already parsed the page; otherwise parsing counts towards
+    the backends that need the tree.
+    """
+    stages = {}
+    for name, backend in backends.items():
+        samples = []
+        for _ in range(rounds):
+            for html in pages:
+                document = PageDocument(BASE_URL, html, parser)
+                if parsed:
+                    document.soup  # noqa: B018 (builds and caches the tree)
+                start = time.perf_counter()
+                backend.convert(document)
+                samples.append(time.perf_counter() - start)
+        stages[name] = summarize(samples)
+    return stages
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict:
+    """Check the corpus, then time each backend on the fixture pages."""
+    backends = {name: create_backend(name) for name in BACKENDS}
+    mismatches = check_corpus(backends, args.parser)
+
+    site = FixtureSite(
+        pages=args.pages, fanout=args.links, page_size=args.page_size, images_per_page=2
+    )
+    pages = [site.render_page(n).decode("utf-8") for n in range(args.pages)]
+    stages = {
+        f"{name} ({mode})": stats
+        for mode, parsed in (("parsed", True), ("unparsed", False))
+        for name, stats in time_backends(
+            backends, pages, args.parser, args.rounds, parsed
+        ).items()
+    }
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "pages": args.pages,
+            "links": args.links,
+            "page_size": args.page_size,
+            "parser": args.parser,
+            "rounds": args.rounds,
+        },
+        # Relative to html2text on the same kind of input
+        "speedup": {
+            stage: (
+                round(
+                    stages["html2text" + stage[stage.index(" ") :]]["total_s"]
+                    / stats["total_s"],
+                    2,
+                )
+                if stats["total_s"]
+                else 0.0
+            )
+            for stage, stats in stages.items()
+        },
+        "corpus_cases": len(CORPUS),
+        "mismatches": mismatches,
+        "stages": stages,
+    }
+
+
+def print_report(result: Dict) -> None:
+    """Print a human-readable summary of a benchmark result."""
+    config = result["config"]
+    print(
+        f"Pages: {config['pages']}  Page size: {config['page_size']}  "
+        f"Parser: {config['parser']}"
+    )
+    print(
+        f"{'backend':<24}{'count':>8}{'total s':>10}"
+        f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'speedup':>10}"
+    )
+    for backend, stats in result["stages"].items():
+        print(
+            f"{backend:<24}{stats['count']:>8}{stats['total_s']:>10.3f}"
+            f"{stats['p50_ms']:>10.3f}{stats['p90_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+            f"{result['speedup'][backend]:>9}x"
+        )
+    mismatches = result["mismatches"]
+    print(
+        f"Corpus: {result['corpus_cases'] - len(mismatches)}/{result['corpus_cases']} "
+        "cases match"
+    )
+    for case, outputs in mismatches.items():
+        print(f"\nMismatch in {case}:")
+        for backend, markdown in outputs.items():
+            print(f"--- {backend}\n{markdown.rstrip()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check and benchmark the Markdown backends."
+    )
+    parser.add_argument(
+        "--pages", type=int, default=50, help="Number of pages to time (default: 50)"
+    )
+    parser.add_argument(
+        "--links", type=int, default=50, help="Links per page (default: 50)"
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=20000,
+        help="Approximate page size in bytes (default: 20000)",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=["html.parser", "lxml", "html5lib"],
+        default="html.parser",
+        help="BeautifulSoup parser for the page tree (default: html.parser)",
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=3,
+        help="Times each page is converted (default: 3)",
+    )
+    parser.add_argument("-o", "--output", help="Write the result as JSON to this file")
+
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if result["mismatches"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
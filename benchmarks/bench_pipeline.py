@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+
+"""
+DocRepo Pipeline Benchmark
+
+Crawls a synthetic documentation site served from localhost and times each
+stage of DocRepo.run separately: fetch, parse, convert, image download,
+file writes (on the background writer, plus the time the pipeline waits for
+it to finish), link/image fix-up and index. Results (pages/sec, peak RSS, Markdown
+output size and per-stage latency percentiles) are printed and optionally
+saved as JSON;
+passing an earlier result file with --baseline reports regressions.
+
+Example:
+    python benchmarks/bench_pipeline.py --pages 500 --concurrency 8 -o bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docrepo import DocRepo  # noqa: E402
+from fixture_site import FixtureSite  # noqa: E402
+from markdown_backends import BACKENDS, DEFAULT_BACKEND  # noqa: E402
+
+# Fractional slowdown against the baseline that counts as a regression, and
+# the absolute slowdown below which stage latencies are treated as noise
+REGRESSION_TOLERANCE = 0.10
+REGRESSION_MIN_MS = 1.0
+
+
+class StageTimer:
+    def __init__(self):
+        """Collect per-call latencies, keyed by pipeline stage."""
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        """Return ``func`` wrapped to record each call's duration under ``stage``."""
+        samples = self.samples[stage]
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        return timed
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    index = min(
+        len(sorted_samples) - 1, max(0, int(round(fraction * len(sorted_samples))) - 1)
+    )
+    return sorted_samples[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summarize latencies (seconds) into count, total and percentiles (ms)."""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "total_s": round(sum(ordered), 6),
+        "mean_ms": round(1000 * sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        "p50_ms": round(1000 * percentile(ordered, 0.50), 3),
+        "p90_ms": round(1000 * percentile(ordered, 0.90), 3),
+        "p99_ms": round(1000 * percentile(ordered, 0.99), 3),
+        "max_ms": round(1000 * ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in megabytes."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def instrument(doc_repo: DocRepo, timer: StageTimer) -> None:
+    """Wrap the components of a DocRepo so every stage reports its latency."""
+    crawler = doc_repo.crawler
+    crawler.fetch = timer.wrap("fetch", crawler.fetch)
+    crawler.build_page = timer.wrap("parse", crawler.build_page)
+
+    create_converter = doc_repo.create_converter
+
+    def create_timed_converter():
+        converter = create_converter()
+        converter.convert_html_to_markdown = timer.wrap(
+            "convert", converter.convert_html_to_markdown
+        )
+        return converter
+
+    doc_repo.create_converter = create_timed_converter
+
+    if doc_repo.image_downloader is not None:
+        downloader = doc_repo.image_downloader
+        downloader._download = timer.wrap("image_download", downloader._download)
+
+    file_handler = doc_repo.file_handler
+    # save_markdown only queues the file; the background writer does the I/O,
+    # and the pipeline waits for it in flush() and close()
+    writer = file_handler.writer
+    writer._write_file = timer.wrap("write", writer._write_file)
+    writer.flush = timer.wrap("write_wait", writer.flush)
+    writer.close = timer.wrap("write_wait", writer.close)
+    doc_repo.fix_up_pages = timer.wrap("fix_up", doc_repo.fix_up_pages)
+    file_handler.create_index = timer.wrap("index", file_handler.create_index)
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict:
+    """Serve the fixture site, run DocRepo against it and collect results."""
+    timer = StageTimer()
+    site = FixtureSite(
+        pages=args.pages,
+        fanout=args.fanout,
+        page_size=args.page_size,
+        images_per_page=args.images,
+        image_pool=args.image_pool,
+        sidebar=args.sidebar,
+    )
+
+    with site, tempfile.TemporaryDirectory() as output_dir:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            doc_repo = DocRepo(
+                base_url=site.base_url,
+                output_dir=output_dir,
+                max_depth=args.depth,
+                delay=0,
+                download_images=args.images > 0,
+                respect_robots_txt=False,
+                concurrency=args.concurrency,
+                stream=args.stream,
+                markdown_backend=args.markdown_backend,
+                content_selectors=args.content_selector,
+                strip_boilerplate=args.strip_boilerplate,
+            )
+            instrument(doc_repo, timer)
+
+            start = time.perf_counter()
+            doc_repo.run()
+            wall = time.perf_counter() - start
+
+        pages = len(doc_repo.url_to_file_map)
+        output_bytes = sum(
+            os.path.getsize(os.path.join(output_dir, filename))
+            for filename in set(doc_repo.url_to_file_map.values())
+        )
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "pages": args.pages,
+            "fanout": args.fanout,
+            "page_size": args.page_size,
+            "images_per_page": args.images,
+            "image_pool": args.image_pool,
+            "depth": args.depth,
+            "concurrency": args.concurrency,
+            "stream": args.stream,
+            "markdown_backend": args.markdown_backend,
+            "sidebar": args.sidebar,
+            "content_selectors": args.content_selector,
+            "strip_boilerplate": args.strip_boilerplate,
+        },
+        "pages_crawled": pages,
+        "wall_s": round(wall, 3),
+        "pages_per_s": round(pages / wall, 2) if wall else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "output_mb": round(output_bytes / (1024 * 1024), 2),
+        "stages": {
+            stage: summarize(samples) for stage, samples in timer.samples.items()
+        },
+    }
+
+
+def find_regressions(result: Dict, baseline: Dict) -> List[str]:
+    """Compare a result with a baseline result and describe any slowdowns."""
+    regressions = []
+    if result["pages_per_s"] < baseline["pages_per_s"] * (1 - REGRESSION_TOLERANCE):
+        regressions.append(
+            f"pages/s {baseline['pages_per_s']} -> {result['pages_per_s']}"
+        )
+
+    for stage, stats in result["stages"].items():
+        old = baseline.get("stages", {}).get(stage)
+        if (
+            old
+            and stats["p50_ms"] > old["p50_ms"] * (1 + REGRESSION_TOLERANCE)
+            and stats["p50_ms"] - old["p50_ms"] > REGRESSION_MIN_MS
+        ):
+            regressions.append(f"{stage} p50 {old['p50_ms']}ms -> {stats['p50_ms']}ms")
+
+    return regressions
+
+
+def print_report(result: Dict) -> None:
+    """Print a human-readable summary of a benchmark result."""
+    print(
+        f"Pages: {result['pages_crawled']}  Wall: {result['wall_s']}s  "
+        f"Pages/s: {result['pages_per_s']}  Peak RSS: {result['peak_rss_mb']} MB  "
+        f"Output: {result['output_mb']} MB"
+    )
+    print(
+        f"{'stage':<16}{'count':>8}{'total s':>10}"
+        f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+    )
+    for stage, stats in result["stages"].items():
+        print(
+            f"{stage:<16}{stats['count']:>8}{stats['total_s']:>10.3f}"
+            f"{stats['p50_ms']:>10.3f}{stats['p90_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the DocRepo pipeline against a local fixture site."
+    )
+    parser.add_argument(
+        "--pages",
+        type=int,
+        default=200,
+        help="Number of pages in the fixture site (default: 200)",
+    )
+    parser.add_argument(
+        "--fanout", type=int, default=10, help="Links per page (default: 10)"
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=20000,
+        help="Approximate page size in bytes (default: 20000)",
+    )
+    parser.add_argument(
+        "--images",
+        type=int,
+        default=2,
+        help="Images per page, 0 to disable (default: 2)",
+    )
+    parser.add_argument(
+        "--image-pool", type=int, default=20, help="Distinct image URLs (default: 20)"
+    )
+    parser.add_argument(
+        "-d", "--depth", type=int, default=50, help="Maximum crawl depth (default: 50)"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Parallel fetches (default: 4)"
+    )
+    parser.add_argument(
+        "--stream", action="store_true", help="Benchmark streaming mode"
+    )
+    parser.add_argument(
+        "--markdown-backend",
+        choices=list(BACKENDS),
+        default=DEFAULT_BACKEND,
+        help="Markdown backend to convert pages with (default: html2text)",
+    )
+    parser.add_argument(
+        "--sidebar",
+        type=int,
+        default=0,
+        help="Links in a sidebar repeated on every page, 0 for none (default: 0)",
+    )
+    parser.add_argument(
+        "--content-selector",
+        action="append",
+        default=[],
+        metavar="CSS",
+        help="Convert only the main content matched by this selector (repeatable)",
+    )
+    parser.add_argument(
+        "--strip-boilerplate",
+        action="store_true",
+        help="Remove blocks repeated across pages before converting",
+    )
+    parser.add_argument("-o", "--output", help="Write the result as JSON to this file")
+    parser.add_argument(
+        "--baseline", help="Earlier JSON result to check for regressions"
+    )
+
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = find_regressions(result, json.load(f))
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
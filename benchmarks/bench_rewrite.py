@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+"""
+Link Rewrite Benchmark
+
+Times MarkdownConverter.rewrite_links on large synthetic Markdown pages
+(by default 10,000 links and 10,000 images, a fifth of them mapped to local
+files) against a straightforward reference: one pass for images and one for
+links, resolving every target with urljoin each time it occurs. Both must
+produce the same Markdown; any difference fails the run. Passing an earlier
+result file with --baseline reports regressions.
+
+Example:
+    python benchmarks/bench_rewrite.py --links 10000 -o rewrite.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_pipeline import (  # noqa: E402
+    REGRESSION_MIN_MS,
+    REGRESSION_TOLERANCE,
+    summarize,
+)  # noqa: E402
+from markdown_converter import MarkdownConverter  # noqa: E402
+
+PAGE_URL = "http://docs.example.com/docs/guide/page.html"
+
+IMAGE_PATTERN = re.compile(r"!\[([^\]]*)\]\(([^)]+)\)")
+# Link text may be a linked image, whose image the first pass already rewrote
+LINK_PATTERN = re.compile(r"(?<!!)\[((?:!\[[^\]]*\]\([^)]+\)|[^\]])+)\]\(([^)]+)\)")
+
+
+def build_page(links: int, images: int, distinct: int) -> str:
+    """
+    Build Markdown with the given numbers of links and images.
+
+    Targets cycle through ``distinct`` pages and images, written as relative,
+    root-relative, absolute, protected (<...>) and fragment links, with some
+    links to other sites and linked images mixed in.
+    """
+    lines = []
+    for n in range(max(links, images)):
+        page = n % distinct
+        if n < links:
+            target = (
+                f"page{page}.html",
+                f"/docs/api/page{page}.html",
+                f"http://docs.example.com/docs/guide/page{page}.html",
+                f"<../guide/page{page}.html>",
+                f"page{page}.html#section-{n % 7}",
+                f"https://other.example.org/page{page}",
+            )[n % 6]
+            lines.append(f"See [link {n}]({target}) for details.")
+        if n < images:
+            lines.append(f"![figure {n}](images/figure{page}.png)")
+        if n < min(links, images) and n % 10 == 0:
+            lines.append(f"[![icon {n}](images/figure{page}.png)](page{page}.html)")
+    return "\n".join(lines) + "\n"
+
+
+def build_maps(distinct: int, mapped: float) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Map the first ``mapped`` fraction of the pages and images to local files."""
+    count = int(distinct * mapped)
+    link_map = {}
+    for n in range(count):
+        link_map[f"http://docs.example.com/docs/guide/page{n}.html"] = (
+            f"guide_page{n}.md"
+        )
+        link_map[f"http://docs.example.com/docs/api/page{n}.html"] = f"api_page{n}.md"
+    image_map = {
+        f"http://docs.example.com/docs/guide/images/figure{n}.png": (
+            f"images/{n:032x}.png"
+        )
+        for n in range(count)
+    }
+    return link_map, image_map
+
+
+def rewrite_reference(
+    markdown: str, url: str, link_map: Dict[str, str], image_map: Dict[str, str]
+) -> str:
+    """Rewrite images, then links, resolving every occurrence from scratch."""
+
+    def unwrap(target: str) -> str:
+        return (
+            target[1:-1] if target.startswith("<") and target.endswith(">") else target
+        )
+
+    def replace_image(match):
+        local_path = image_map.get(
+            urljoin(url, unwrap(match.group(2))).partition("#")[0]
+        )
+        return f"![{match.group(1)}]({local_path})" if local_path else match.group(0)
+
+    def replace_link(match):
+        absolute_link, _, fragment = urljoin(url, unwrap(match.group(2))).partition("#")
+        local_path = link_map.get(absolute_link)
+        if local_path is None:
+            return match.group(0)
+        return (
+            f"[{match.group(1)}]({local_path}#{fragment})"
+            if fragment
+            else f"[{match.group(1)}]({local_path})"
+        )
+
+    return LINK_PATTERN.sub(replace_link, IMAGE_PATTERN.sub(replace_image, markdown))
+
+
+def time_path(
+    rewrite: Callable[[str], str], markdown: str, rounds: int
+) -> Tuple[List[float], str]:
+    """Rewrite the page ``rounds`` times; returns latencies and the output."""
+    samples, output = [], ""
+    for _ in range(rounds):
+        start = time.perf_counter()
+        output = rewrite(markdown)
+        samples.append(time.perf_counter() - start)
+    return samples, output
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict:
+    """Build the page and time both rewrite paths on it."""
+    markdown = build_page(args.links, args.images, args.distinct)
+    link_map, image_map = build_maps(args.distinct, args.mapped)
+    converter = MarkdownConverter(link_map, image_handler=image_map.get)
+
+    paths = {
+        "single_pass": lambda page: converter.rewrite_links(page, PAGE_URL),
+        "reference": lambda page: rewrite_reference(
+            page, PAGE_URL, link_map, image_map
+        ),
+    }
+    stages, outputs = {}, {}
+    for name, rewrite in paths.items():
+        samples, outputs[name] = time_path(rewrite, markdown, args.rounds)
+        stages[name] = summarize(samples)
+
+    single, reference = stages["single_pass"]["total_s"], stages["reference"]["total_s"]
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "links": args.links,
+            "images": args.images,
+            "distinct": args.distinct,
+            "mapped": args.mapped,
+            "rounds": args.rounds,
+            "page_kb": round(len(markdown) / 1024, 1),
+        },
+        "speedup": round(reference / single, 2) if single else 0.0,
+        "matches": outputs["single_pass"] == outputs["reference"],
+        "stages": stages,
+    }
+
+
+def find_regressions(result: Dict, baseline: Dict) -> List[str]:
+    """Compare a result with a baseline and describe slowdowns of the single pass."""
+    stats, old = result["stages"]["single_pass"], baseline.get("stages", {}).get(
+        "single_pass"
+    )
+    if (
+        old
+        and stats["p50_ms"] > old["p50_ms"] * (1 + REGRESSION_TOLERANCE)
+        and stats["p50_ms"] - old["p50_ms"] > REGRESSION_MIN_MS
+    ):
+        return [f"single_pass p50 {old['p50_ms']}ms -> {stats['p50_ms']}ms"]
+    return []
+
+
+def print_report(result: Dict) -> None:
+    """Print a human-readable summary of a benchmark result."""
+    config = result["config"]
+    print(
+        f"Links: {config['links']}  Images: {config['images']}  "
+        f"Distinct targets: {config['distinct']}  Page: {config['page_kb']} KB"
+    )
+    print(
+        f"{'path':<16}{'count':>8}{'total s':>10}"
+        f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+    )
+    for path, stats in result["stages"].items():
+        print(
+            f"{path:<16}{stats['count']:>8}{stats['total_s']:>10.3f}"
+            f"{stats['p50_ms']:>10.3f}{stats['p90_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+        )
+    print(f"Speedup: {result['speedup']}x")
+    if not result["matches"]:
+        print("The single pass and the reference produced different Markdown")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark link and image rewriting on a large page."
+    )
+    parser.add_argument(
+        "--links", type=int, default=10000, help="Links on the page (default: 10000)"
+    )
+    parser.add_argument(
+        "--images", type=int, default=10000, help="Images on the page (default: 10000)"
+    )
+    parser.add_argument(
+        "--distinct",
+        type=int,
+        default=2000,
+        help="Distinct pages and images linked to (default: 2000)",
+    )
+    parser.add_argument(
+        "--mapped",
+        type=float,
+        default=0.2,
+        help="Fraction of targets mapped to local files (default: 0.2)",
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=5, help="Times the page is rewritten (default: 5)"
+    )
+    parser.add_argument("-o", "--output", help="Write the result as JSON to this file")
+    parser.add_argument(
+        "--baseline", help="Earlier JSON result to check for regressions"
+    )
+
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if not result["matches"]:
+        sys.exit(1)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = find_regressions(result, json.load(f))
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Synthetic documentation site for benchmarks.
+
+Serves a deterministic site from a local HTTP server on a background thread.
+Pages live at /docs/page<N>.html, link to ``fanout`` other pages, are padded
+to roughly ``page_size`` bytes and reference ``images_per_page`` images out
+of a shared pool of ``image_pool`` distinct images. With ``sidebar``, every
+page also carries the same header and a sidebar of that many links, like the
+navigation chrome of a real documentation site.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class FixtureSite:
+    def __init__(
+        self,
+        pages: int = 200,
+        fanout: int = 10,
+        page_size: int = 20000,
+        images_per_page: int = 2,
+        image_pool: int = 20,
+        image_size: int = 4096,
+        sidebar: int = 0,
+    ):
+        """
+        Configure the synthetic site.
+
+        Args:
+            pages: Number of pages
+            fanout: Number of links from each page to other pages
+            page_size: Approximate size of each page in bytes
+            images_per_page: Number of <img> tags per page
+            image_pool: Number of distinct image URLs across the site
+            image_size: Size of each image in bytes
+            sidebar: Number of links in a sidebar repeated on every page
+                (0 for none)
+        """
+        self.pages = pages
+        self.fanout = fanout
+        self.page_size = page_size
+        self.images_per_page = images_per_page
+        self.image_pool = image_pool
+        self.image_size = image_size
+        self.sidebar = sidebar
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """URL of the first page."""
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/docs/page0.html"
+
+    def render_page(self, n: int) -> bytes:
+        """Render page ``n`` as HTML."""
+        links = "".join(
+            f'<li><a href="page{target}.html">Page {target}</a></li>'
+            for target in ((n * 7 + k + 1) % self.pages for k in range(self.fanout))
+        )
+        images = "".join(
+            f'<img src="/static/img{(n + k) % self.image_pool}.png" alt="Figure {k}">'
+            for k in range(self.images_per_page)
+        )
+        chrome = ""
+        if self.sidebar:
+            chrome = (
+                '<header><div class="brand">Fixture Docs: '
+                "documentation for the benchmark fixture site</div>"
+                '<form class="search">Search the documentation <input name="q"></form>'
+                "</header>"
+                '<aside class="sidebar"><ul>'
+                + "".join(
+                    f'<li><a href="/docs/page{k % self.pages}.html">'
+                    f"Section {k}: Page {k % self.pages}</a></li>"
+                    for k in range(self.sidebar)
+                )
+                + "</ul></aside>"
+            )
+        head = (
+            f"<!DOCTYPE html><html><head><title>Page {n}</title></head><body>{chrome}"
+            f'<nav><ul><li><a href="/docs/page0.html">Home</a></li></ul></nav>'
+            f"<main><h1>Page {n}</h1>{images}"
+            "<table><tr><th>Name</th><th>Value</th></tr>"
+            f"<tr><td>n</td><td>{n}</td></tr></table>"
+            f"<pre><code>def page_{n}():\n    return {n}\n</code></pre>"
+        )
+        tail = f"<ul>{links}</ul></main><footer>Fixture site</footer></body></html>"
+
+        paragraphs = []
+        size = len(head) + len(tail)
+        i = 0
+        while size < self.page_size:
+            paragraph = (
+                f"<p>Paragraph {i} of page {n} with <b>bold</b>, <em>emphasis</em> "
+                f"and <code>inline code</code> for realistic markup.</p>"
+            )
+            paragraphs.append(paragraph)
+            size += len(paragraph)
+            i += 1
+        return (head + "".join(paragraphs) + tail).encode("utf-8")
+
+    def render_image(self, n: int) -> bytes:
+        """Render image ``n``; every other image duplicates its neighbour's bytes."""
+        seed = (n // 2).to_bytes(4, "big")
+        return (
+            b"\x89PNG\r\n\x1a\n"
+            + (seed * (self.image_size // 4 + 1))[: self.image_size]
+        )
+
+    def start(self) -> "FixtureSite":
+        """Start serving on an ephemeral localhost port."""
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                body, content_type = None, "text/html; charset=utf-8"
+                try:
+                    if path.startswith("/docs/page") and path.endswith(".html"):
+                        n = int(path[len("/docs/page") : -len(".html")])
+                        if 0 <= n < site.pages:
+                            body = site.render_page(n)
+                    elif path.startswith("/static/img") and path.endswith(".png"):
+                        n = int(path[len("/static/img") : -len(".png")])
+                        if 0 <= n < site.image_pool:
+                            body, content_type = site.render_image(n), "image/png"
+                except ValueError:
+                    pass
+
+                if body is None:
+                    body, content_type = b"Not found", "text/plain"
+                    self.send_response(404)
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self) -> "FixtureSite":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
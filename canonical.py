@@ -0,0 +1,112 @@
+from urllib.parse import unquote, urlsplit, urlunsplit
+from typing import Dict, Iterable, Optional, Tuple
+
+# Query parameters that only track where a visitor came from
+TRACKING_PARAMS = frozenset(
+    {
+        "fbclid",
+        "gclid",
+        "dclid",
+        "msclkid",
+        "yclid",
+        "igshid",
+        "mc_cid",
+        "mc_eid",
+        "_ga",
+        "_gl",
+        "ref_src",
+    }
+)
+TRACKING_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def parse_alias(value: str) -> Tuple[str, str]:
+    """
+    Parse an alias rule written as ``FROM=TO``, e.g. ``/latest/=/v3/``.
+
+    Raises:
+        ValueError: If the rule has no "="
+    """
+    source, separator, target = value.partition("=")
+    if not separator or not source:
+        raise ValueError(f"Invalid alias {value!r}; use FROM=TO, e.g. /latest/=/v3/")
+    return source, target
+
+
+class UrlCanonicalizer:
+    def __init__(
+        self,
+        aliases: Optional[Dict[str, str]] = None,
+        strip_params: Iterable[str] = TRACKING_PARAMS,
+        strip_prefixes: Iterable[str] = TRACKING_PREFIXES,
+    ):
+        """
+        Reduce the different spellings of a URL to one canonical form.
+
+        Only rewrites that cannot change which page is served are applied by
+        default: the fragment is dropped, the scheme and host are lowercased,
+        default ports and tracking query parameters are removed and an empty
+        path becomes "/". Aliases add site-specific rules, such as serving
+        /latest/ from /v3/.
+
+        Args:
+            aliases: Map of prefix to canonical prefix. Prefixes starting
+                with "/" apply to the URL path; others to the whole URL
+            strip_params: Query parameters to remove
+            strip_prefixes: Remove query parameters starting with these
+        """
+        # Longest prefixes first, so the most specific rule wins
+        self.aliases = sorted(
+            (aliases or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self.strip_params = frozenset(strip_params)
+        self.strip_prefixes = tuple(strip_prefixes)
+
+    def canonicalize(self, url: str) -> str:
+        """
+        Return the canonical form of a URL.
+
+        Args:
+            url: An absolute URL
+
+        Returns:
+            The canonical URL, without fragment
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+
+        userinfo, at, hostport = parts.netloc.rpartition("@")
+        host, colon, port = hostport.rpartition(":")
+        if not port.isdigit():
+            # No port (an IPv6 address without one ends in "]")
+            host, colon, port = hostport, "", ""
+        elif int(port) == DEFAULT_PORTS.get(scheme):
+            colon = port = ""
+        netloc = f"{userinfo}{at}{host.lower()}{colon}{port}"
+
+        path = parts.path or "/"
+        query = parts.query
+        if query:
+            query = "&".join(
+                pair
+                for pair in query.split("&")
+                if pair and not self._is_tracking(pair)
+            )
+
+        canonical = urlunsplit((scheme, netloc, path, query, ""))
+        for source, target in self.aliases:
+            if source.startswith("/"):
+                if path.startswith(source):
+                    return urlunsplit(
+                        (scheme, netloc, target + path[len(source) :], query, "")
+                    )
+            elif canonical.startswith(source):
+                return target + canonical[len(source) :]
+        return canonical
+
+    def _is_tracking(self, pair: str) -> bool:
+        """Check whether a key=value query pair is a tracking parameter."""
+        key = unquote(pair.partition("=")[0]).lower()
+        return key in self.strip_params or key.startswith(self.strip_prefixes)
@@ -0,0 +1,511 @@
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from page_document import PageDocument
+
+# Markup that is not an element (comments, doctypes/CDATA, processing
+# instructions), then start and end tags: group 1 is "/" for end tags, group
+# 2 the name and group 3 the attributes, which may hold ">" inside quotes
+TOKEN_PATTERN = re.compile(
+    r"<!--.*?(?:-->|$)|<![^>]*>|<\?[^>]*>"
+    r'|<(/?)([a-zA-Z][^\s/>]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>',
+    re.S,
+)
+ATTRIBUTE_PATTERN = re.compile(
+    r'([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+)))?'
+)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Elements that can be a repeated block of navigation chrome. <main> and
+# <article> are left out: they hold the page's own content
+BLOCK_TAGS = frozenset(
+    {"header", "footer", "nav", "aside", "div", "section", "ul", "ol", "form", "table"}
+)
+# Elements whose content is not markup, and is not shown in the page body
+RAW_TEXT_END_PATTERNS = {
+    name: re.compile(rf"</{name}\s*>", re.I) for name in ("script", "style", "title")
+}
+VOID_TAGS = frozenset(
+    {
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "link",
+        "meta",
+        "param",
+        "source",
+        "track",
+        "wbr",
+    }
+)
+
+# A compound selector, e.g. div#main.content[role=main], and its parts
+COMPOUND_PATTERN = re.compile(
+    r"(\*|[a-zA-Z][\w-]*)?((?:#[\w-]+|\.[\w-]+"
+    r'|\[\s*[\w-]+\s*(?:=\s*(?:"[^"]*"|\'[^\']*\'|[\w-]+)\s*)?\])*)$'
+)
+QUALIFIER_PATTERN = re.compile(
+    r"#([\w-]+)|\.([\w-]+)"
+    r'|\[\s*([\w-]+)\s*(=\s*(?:"([^"]*)"|\'([^\']*)\'|([\w-]+))\s*)?\]'
+)
+
+
+def parse_selectors(value: str) -> List[str]:
+    """Split a comma-separated list of CSS selectors, e.g. ``main, div.content``."""
+    return [selector.strip() for selector in value.split(",") if selector.strip()]
+
+
+class SimpleSelector:
+    def __init__(self, selector: str):
+        """
+        A CSS selector made of tag names, #ids, .classes and [attr] or
+        [attr=value] tests, joined by descendant (" ") and child (">")
+        combinators, e.g. ``div.document > div.body``.
+
+        Args:
+            selector: The selector
+
+        Raises:
+            ValueError: If the selector uses anything else
+        """
+        self.text = selector
+        compounds = []
+        combinator = None
+        for token in re.split(r"\s*(>)\s*|\s+", selector.strip()):
+            if not token:
+                continue
+            if token == ">":
+                if not compounds or combinator == ">":
+                    raise ValueError(f"Invalid content selector {selector!r}")
+                combinator = ">"
+                continue
+            compounds.append(self._parse_compound(token) + (combinator,))
+            combinator = " "
+        if not compounds or combinator == ">":
+            raise ValueError(f"Invalid content selector {selector!r}")
+        # Matched right to left; each part keeps the combinator to its left neighbour
+        self.parts: List[
+            Tuple[Optional[str], Dict[str, Optional[str]], Set[str], Optional[str]]
+        ] = compounds[::-1]
+
+    def _parse_compound(
+        self, token: str
+    ) -> Tuple[Optional[str], Dict[str, Optional[str]], Set[str]]:
+        """Parse a compound selector into (tag, {attribute: value or None}, classes)."""
+        match = COMPOUND_PATTERN.match(token)
+        if not match or not token:
+            raise ValueError(
+                f"Unsupported content selector {self.text!r}: "
+                "use tags, #ids, .classes, "
+                f"[attr] or [attr=value], joined by spaces or >"
+            )
+        tag = match.group(1)
+        attributes: Dict[str, Optional[str]] = {}
+        classes: Set[str] = set()
+        for (
+            element_id,
+            css_class,
+            name,
+            equals,
+            double,
+            single,
+            bare,
+        ) in QUALIFIER_PATTERN.findall(match.group(2)):
+            if element_id:
+                attributes["id"] = element_id
+            elif css_class:
+                classes.add(css_class)
+            else:
+                attributes[name.lower()] = (
+                    (double or single or bare) if equals else None
+                )
+        return (tag.lower() if tag and tag != "*" else None), attributes, classes
+
+    def matches(self, stack: List["_OpenElement"]) -> bool:
+        """Check whether the innermost of the open elements matches."""
+        return self._match(0, stack, len(stack) - 1)
+
+    def _match(self, part: int, stack: List["_OpenElement"], index: int) -> bool:
+        """Match parts[part:] with stack[index] as the element for parts[part]."""
+        tag, attributes, classes, combinator = self.parts[part]
+        if not stack[index].matches(tag, attributes, classes):
+            return False
+        if part + 1 == len(self.parts):
+            return True
+        if combinator == ">":
+            return index > 0 and self._match(part + 1, stack, index - 1)
+        return any(
+            self._match(part + 1, stack, ancestor)
+            for ancestor in range(index - 1, -1, -1)
+        )
+
+
+class _OpenElement:
+    __slots__ = (
+        "name",
+        "start",
+        "attribute_text",
+        "text_index",
+        "text_offset",
+        "selector",
+        "_attributes",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        start: int,
+        attribute_text: str,
+        text_index: int,
+        text_offset: int,
+    ):
+        self.name = name
+        self.start = start
+        self.attribute_text = attribute_text
+        # Number of text segments and length of text before the element
+        self.text_index = text_index
+        self.text_offset = text_offset
+        # Index of the first content selector that matches the element
+        self.selector: Optional[int] = None
+        self._attributes: Optional[Dict[str, str]] = None
+
+    @property
+    def attributes(self) -> Dict[str, str]:
+        """Attributes of the start tag, parsed on first use."""
+        if self._attributes is None:
+            self._attributes = {}
+            for name, double, single, bare in ATTRIBUTE_PATTERN.findall(
+                self.attribute_text
+            ):
+                self._attributes.setdefault(name.lower(), double or single or bare)
+        return self._attributes
+
+    def matches(
+        self,
+        tag: Optional[str],
+        attributes: Dict[str, Optional[str]],
+        classes: Set[str],
+    ) -> bool:
+        """Check the element against one compound selector."""
+        if tag is not None and tag != self.name:
+            return False
+        if not attributes and not classes:
+            return True
+        own = self.attributes
+        for name, value in attributes.items():
+            if name not in own or (value is not None and own[name] != value):
+                return False
+        return not classes or classes <= set(own.get("class", "").split())
+
+
+class Block:
+    def __init__(
+        self,
+        name: str,
+        start: int,
+        end: int,
+        text_length: int,
+        fingerprint: Optional[int],
+        selector: Optional[int],
+    ):
+        """
+        An element found by ContentExtractor.scan().
+
+        Args:
+            name: Tag name
+            start: Offset of the start tag in the HTML
+            end: Offset just past the end tag, or of the tag that implicitly
+                closed the element
+            text_length: Length of the element's text
+            fingerprint: Hash of the element's text, for candidate blocks
+                when fingerprints were asked for
+            selector: Index of the first content selector that matches the
+                element, or None
+        """
+        self.name = name
+        self.start = start
+        self.end = end
+        self.text_length = text_length
+        self.fingerprint = fingerprint
+        self.selector = selector
+
+
+class ContentExtractor:
+    def __init__(
+        self,
+        selectors: Optional[Sequence[str]] = None,
+        auto: bool = False,
+        sample_pages: int = 20,
+        min_share: float = 0.5,
+        min_chars: int = 20,
+    ):
+        """
+        Cut pages down to their main content before they are converted.
+
+        With ``selectors``, only the elements the first matching selector
+        finds (e.g. ``main`` or ``div.document``) are converted; a page no
+        selector matches is kept whole. With ``auto``, blocks such as
+        sidebars, headers and footers are recognised by their text recurring
+        on at least ``min_share`` of the pages seen by learn() (and on at
+        least two), and removed. Both can be combined: repeated blocks are
+        then removed from inside the selected content.
+
+        No tree is built for this. One regular-expression pass over the tags
+        finds the offsets and text of the elements, and the Markdown backend
+        gets the HTML cut down to the kept ranges, so it has less to parse.
+
+        Args:
+            selectors: CSS selectors of the content root, tried in order
+                (see SimpleSelector for what is supported)
+            auto: Remove blocks repeated across pages
+            sample_pages: Number of pages to learn repeated blocks from
+                before removing any (see ready)
+            min_share: Fraction of the learned pages a block must appear on
+            min_chars: Blocks with less text than this are never removed
+
+        Raises:
+            ValueError: If a selector is not supported
+        """
+        self.selectors = [SimpleSelector(selector) for selector in selectors or ()]
+        self.auto = auto
+        self.sample_pages = sample_pages
+        self.min_share = min_share
+        self.min_chars = min_chars
+        # Number of learned pages each block fingerprint appeared on
+        self.block_counts: Counter = Counter()
+        self.learned_pages = 0
+        self._boilerplate: Optional[Set[int]] = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether enough pages were learned to remove repeated blocks."""
+        return not self.auto or self.learned_pages >= self.sample_pages
+
+    @property
+    def boilerplate(self) -> Set[int]:
+        """Fingerprints of the blocks that count as repeated."""
+        if self._boilerplate is None:
+            threshold = max(2, self.min_share * self.learned_pages)
+            self._boilerplate = {
+                fingerprint
+                for fingerprint, count in self.block_counts.items()
+                if count >= threshold
+            }
+        return self._boilerplate
+
+    def learn(self, document: PageDocument) -> None:
+        """
+        Count the blocks of a page towards the repeated ones.
+
+        Only the first ``sample_pages`` pages are counted; later calls do
+        nothing.
+
+        Args:
+            document: The page
+        """
+        if not self.auto or self.learned_pages >= self.sample_pages:
+            return
+        blocks, _ = self.scan(document.html, fingerprints=True)
+        roots = self._roots(blocks)
+        self.block_counts.update(
+            {
+                block.fingerprint
+                for block in blocks
+                if block.fingerprint is not None and _inside(block, roots)
+            }
+        )
+        self.learned_pages += 1
+        self._boilerplate = None
+
+    def extract(self, document: PageDocument) -> PageDocument:
+        """
+        Return the main content of a page.
+
+        Args:
+            document: The page
+
+        Returns:
+            A document holding only the main content (the same document if
+            nothing was removed)
+        """
+        html = document.html
+        boilerplate = self.boilerplate if self.auto else set()
+        blocks, text_length = self.scan(html, fingerprints=bool(boilerplate))
+        roots = self._roots(blocks)
+
+        # Blocks are listed as they end, so sort to find the outermost ones
+        repeated = sorted(
+            (
+                block
+                for block in blocks
+                if block.fingerprint in boilerplate and _inside(block, roots)
+            ),
+            key=lambda block: (block.start, -block.end),
+        )
+        cut: List[Block] = []
+        for block in repeated:
+            if not cut or block.start >= cut[-1].end:
+                cut.append(block)
+
+        kept_length = sum(root.text_length for root in roots) if roots else text_length
+        if cut and sum(block.text_length for block in cut) >= kept_length:
+            # Everything on the page is repeated; better keep it than save an empty page
+            cut = []
+        if not roots and not cut:
+            return document
+
+        keep = [(root.start, root.end) for root in roots] or [(0, len(html))]
+        return PageDocument(
+            document.url,
+            _cut(html, keep, [(block.start, block.end) for block in cut]),
+            document.parser,
+        )
+
+    def scan(self, html: str, fingerprints: bool = False) -> Tuple[List[Block], int]:
+        """
+        Find the elements of a page with their offsets and text length.
+
+        Only the elements that may be kept or removed as a whole are
+        returned: those matching a content selector, and candidate blocks
+        with at least ``min_chars`` of text. Elements the page leaves open
+        are closed where their parent ends, as browsers do.
+
+        Args:
+            html: The page HTML
+            fingerprints: Hash the text of candidate blocks
+
+        Returns:
+            The blocks in the order they end, and the length of all text
+        """
+        blocks: List[Block] = []
+        stack: List[_OpenElement] = []
+        texts: List[str] = []
+        text_length = 0
+        position = 0
+
+        def close(element: _OpenElement, end: int) -> None:
+            length = text_length - element.text_offset
+            is_block = element.name in BLOCK_TAGS and length >= self.min_chars
+            if not is_block and element.selector is None:
+                return
+            fingerprint = None
+            if fingerprints and is_block:
+                text = WHITESPACE_PATTERN.sub(
+                    " ", " ".join(texts[element.text_index :])
+                ).strip()
+                digest = hashlib.blake2b(
+                    f"{element.name}:{text}".encode("utf-8"), digest_size=8
+                ).digest()
+                fingerprint = int.from_bytes(digest, "big")
+            blocks.append(
+                Block(
+                    element.name,
+                    element.start,
+                    end,
+                    length,
+                    fingerprint,
+                    element.selector,
+                )
+            )
+
+        while True:
+            # Searched from the current position, so the text of raw text
+            # elements (scripts, styles) skipped below is not tokenized
+            match = TOKEN_PATTERN.search(html, position)
+            if match is None:
+                break
+            if match.start() > position:
+                text = html[position : match.start()]
+                if not text.isspace():
+                    texts.append(text)
+                    text_length += len(text)
+            position = match.end()
+            name = match.group(2)
+            if name is None:
+                continue
+            name = name.lower()
+
+            if match.group(1):
+                # An end tag closes its element and whatever was left open inside it
+                for index in range(len(stack) - 1, -1, -1):
+                    if stack[index].name == name:
+                        while len(stack) > index + 1:
+                            close(stack.pop(), match.start())
+                        close(stack.pop(), match.end())
+                        break
+                continue
+
+            end_pattern = RAW_TEXT_END_PATTERNS.get(name)
+            if end_pattern is not None:
+                end = end_pattern.search(html, position)
+                position = end.end() if end else len(html)
+                continue
+            if name in VOID_TAGS or match.group(3).endswith("/"):
+                continue
+
+            element = _OpenElement(
+                name, match.start(), match.group(3), len(texts), text_length
+            )
+            stack.append(element)
+            for index, selector in enumerate(self.selectors):
+                if selector.matches(stack):
+                    element.selector = index
+                    break
+
+        if position < len(html) and not html[position:].isspace():
+            texts.append(html[position:])
+            text_length += len(html) - position
+        while stack:
+            close(stack.pop(), len(html))
+        return blocks, text_length
+
+    def _roots(self, blocks: List[Block]) -> List[Block]:
+        """
+        The outermost elements matched by the first selector that matches any, in
+        document order.
+        """
+        matched = [block for block in blocks if block.selector is not None]
+        if not matched:
+            return []
+        first = min(block.selector for block in matched)
+        roots: List[Block] = []
+        for block in sorted(
+            (block for block in matched if block.selector == first),
+            key=lambda block: (block.start, -block.end),
+        ):
+            if not roots or block.start >= roots[-1].end:
+                roots.append(block)
+        return roots
+
+
+def _inside(block: Block, roots: List[Block]) -> bool:
+    """Whether a block lies within one of the roots (anywhere when there are none)."""
+    return not roots or any(
+        root.start <= block.start and block.end <= root.end and block is not root
+        for root in roots
+    )
+
+
+def _cut(html: str, keep: List[Tuple[int, int]], cut: List[Tuple[int, int]]) -> str:
+    """
+    Join the kept ranges of the HTML without the cut ones (both sorted, cut ones
+    inside kept ones).
+    """
+    parts = []
+    cut_index = 0
+    for start, end in keep:
+        position = start
+        while cut_index < len(cut) and cut[cut_index][1] <= end:
+            cut_start, cut_end = cut[cut_index]
+            parts.append(html[position:cut_start])
+            position = cut_end
+            cut_index += 1
+        parts.append(html[position:end])
+    return "".join(parts)
@@ -0,0 +1,156 @@
+import json
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class CrawlCheckpoint:
+    JOURNAL_FILENAME = ".docrepo_checkpoint.jsonl"
+
+    def __init__(
+        self, output_dir: str, flush_every: int = 50, flush_interval: float = 5.0
+    ):
+        """
+        Append-only journal of crawl progress, used to resume interrupted crawls.
+
+        Every URL added to the frontier, every fetched page (including its
+        HTML) and every URL that failed or was skipped is appended as one JSON
+        line. Replaying the journal restores the frontier, the visited set and
+        the fetched pages without refetching anything.
+
+        The journal is flushed and fsynced every ``flush_every`` records or
+        ``flush_interval`` seconds, whichever comes first, so at most that
+        much work is lost on a hard kill.
+
+        Args:
+            output_dir: Directory holding the generated documentation
+            flush_every: Maximum number of records between flushes
+            flush_interval: Maximum number of seconds between flushes
+        """
+        self.path = os.path.join(output_dir, self.JOURNAL_FILENAME)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._file = None
+        self._valid_length: Optional[int] = None
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def exists(self) -> bool:
+        """Check whether a journal from an earlier run is present."""
+        return os.path.exists(self.path)
+
+    def load(self) -> Dict:
+        """
+        Replay the journal.
+
+        Returns:
+            Dictionary with:
+            - 'pending': (url, depth) pairs still to crawl, in queue order
+            - 'seen': every URL that was ever queued
+            - 'pages': file offsets of the fetched page records, in fetch order
+        """
+        queued: Dict[str, int] = {}
+        done: Set[str] = set()
+        pages: List[int] = []
+
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from an interrupted write
+                    break
+
+                event = record["e"]
+                if event == "enqueue":
+                    queued[record["u"]] = record["d"]
+                elif event == "page":
+                    done.add(record["u"])
+                    pages.append(offset)
+                elif event == "done":
+                    done.add(record["u"])
+                offset += len(line)
+
+        self._valid_length = offset
+        return {
+            "pending": [
+                (url, depth) for url, depth in queued.items() if url not in done
+            ],
+            "seen": set(queued),
+            "pages": pages,
+        }
+
+    def read_page(self, offset: int) -> Tuple[str, int, Dict]:
+        """
+        Read one page record from the journal.
+
+        Args:
+            offset: File offset returned by load()
+
+        Returns:
+            Tuple of (url, depth, page)
+        """
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            record = json.loads(f.readline())
+        return record["u"], record["d"], record["p"]
+
+    def open(self, resume: bool = False) -> None:
+        """
+        Open the journal for writing.
+
+        Args:
+            resume: Append to the existing journal instead of starting afresh
+        """
+        if resume and self._valid_length is not None:
+            # Drop a torn final line so appended records stay parseable
+            with open(self.path, "r+b") as f:
+                f.truncate(self._valid_length)
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+
+    def record_enqueue(self, url: str, depth: int) -> None:
+        """Record a URL added to the frontier."""
+        self._write({"e": "enqueue", "u": url, "d": depth})
+
+    def record_page(self, url: str, depth: int, page: Dict) -> None:
+        """Record a fetched page; the parsed document is not stored."""
+        payload = {key: value for key, value in page.items() if key != "document"}
+        self._write({"e": "page", "u": url, "d": depth, "p": payload})
+
+    def record_done(self, url: str) -> None:
+        """Record a URL that was finished without producing a page (error or skip)."""
+        self._write({"e": "done", "u": url})
+
+    def _write(self, record: Dict) -> None:
+        if self._file is None:
+            return
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._unflushed += 1
+        if (
+            self._unflushed >= self.flush_every
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered records through to disk."""
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        """Flush and close the journal."""
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def remove(self) -> None:
+        """Close and delete the journal once the crawl has completed."""
+        self.close()
+        if self.exists():
+            os.remove(self.path)
@@ -0,0 +1,173 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+
+class CrawlStateStore:
+    STATE_FILENAME = ".docrepo_state.sqlite"
+
+    def __init__(self, output_dir: str, commit_every: int = 100):
+        """
+        Open (or create) the persistent crawl state for an output directory.
+
+        For every page written, the store remembers the validators the server
+        sent (ETag, Last-Modified), a hash of the HTML, the page title, its
+        same-site links and the output filename. Later runs use this to send
+        conditional requests and to skip pages that have not changed.
+
+        The store is not thread-safe: calls must not overlap. They may come
+        from different threads one after the other, as in the asyncio API,
+        which saves pages on a worker thread while the crawl is paused.
+
+        Args:
+            output_dir: Directory holding the generated documentation
+            commit_every: Number of updates to batch into one transaction
+        """
+        self.output_dir = output_dir
+        self.commit_every = commit_every
+        self._pending = 0
+        self.connection = sqlite3.connect(
+            os.path.join(output_dir, self.STATE_FILENAME), check_same_thread=False
+        )
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                title TEXT,
+                links TEXT,
+                filename TEXT,
+                updated_at REAL
+            )""")
+        self.connection.commit()
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Look up the stored state for a URL.
+
+        Args:
+            url: The page URL
+
+        Returns:
+            Dictionary with the stored fields, or None if the URL is unknown
+        """
+        row = self.connection.execute(
+            "SELECT etag, last_modified, content_hash, title, links, filename,"
+            " updated_at FROM pages WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        return {
+            "etag": row[0],
+            "last_modified": row[1],
+            "content_hash": row[2],
+            "title": row[3],
+            "links": json.loads(row[4]) if row[4] else [],
+            "filename": row[5],
+            "updated_at": row[6],
+        }
+
+    def has_output(self, state: Optional[Dict]) -> bool:
+        """Check whether the file recorded for a page still exists on disk."""
+        return bool(
+            state
+            and state["filename"]
+            and os.path.exists(os.path.join(self.output_dir, state["filename"]))
+        )
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Build If-None-Match / If-Modified-Since headers for a URL.
+
+        Headers are only sent when the page's output file still exists, since
+        a 304 response carries no content to regenerate it from.
+
+        Args:
+            url: The page URL
+
+        Returns:
+            Dictionary of request headers (empty if nothing is known)
+        """
+        state = self.get(url)
+        if not self.has_output(state):
+            return {}
+
+        headers = {}
+        if state["etag"]:
+            headers["If-None-Match"] = state["etag"]
+        if state["last_modified"]:
+            headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+
+    def filenames(self) -> Dict[str, str]:
+        """Return the output filename recorded for every known URL."""
+        rows = self.connection.execute(
+            "SELECT url, filename FROM pages WHERE filename IS NOT NULL"
+        )
+        return dict(rows)
+
+    def record(
+        self,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        content_hash: Optional[str],
+        title: str,
+        links: List[str],
+        filename: str,
+    ) -> None:
+        """
+        Store the state of a page whose output file is up to date.
+
+        Args:
+            url: The page URL
+            etag: ETag response header, if any
+            last_modified: Last-Modified response header, if any
+            content_hash: Hash of the page HTML
+            title: Page title
+            links: Same-site links found on the page
+            filename: Output filename the page was saved to
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                url,
+                etag,
+                last_modified,
+                content_hash,
+                title,
+                json.dumps(links),
+                filename,
+                time.time(),
+            ),
+        )
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.commit()
+
+    def forget(self, filename: str) -> None:
+        """
+        Drop the state of the page saved under a filename.
+
+        Used when the file could not be written, so the next run regenerates
+        it instead of trusting what is on disk.
+
+        Args:
+            filename: Output filename the page was recorded with
+        """
+        self.connection.execute("DELETE FROM pages WHERE filename = ?", (filename,))
+        self._pending += 1
+
+    def commit(self) -> None:
+        """Flush pending updates to disk."""
+        self.connection.commit()
+        self._pending = 0
+
+    def close(self) -> None:
+        """Commit pending updates and close the database."""
+        self.commit()
+        self.connection.close()
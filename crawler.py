@@ -1,140 +1,1016 @@
-import requests
-import time
-import urllib.robotparser
-from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
-from typing import Set, List, Dict, Optional
-
-
-class Crawler:
-    def __init__(self, 
-                 base_url: str, 
-                 max_depth: int = 3, 
-                 delay: float = 0.5, 
-                 respect_robots_txt: bool = True):
-        """
-        Initialize the crawler with the base URL and configuration.
-        
-        Args:
-            base_url: The starting URL to crawl
-            max_depth: Maximum depth of links to follow
-            delay: Delay between requests in seconds
-            respect_robots_txt: Whether to respect robots.txt rules
-        """
-        self.base_url = base_url
-        self.max_depth = max_depth
-        self.delay = delay
-        self.respect_robots_txt = respect_robots_txt
-        self.visited_urls: Set[str] = set()
-        self.url_contents: Dict[str, str] = {}
-        self.url_titles: Dict[str, str] = {}
-        
-        # Parse the base domain for robots.txt
-        parsed_url = urlparse(base_url)
-        self.base_domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
-        
-        # Initialize robots parser if needed
-        self.robot_parser = None
-        if self.respect_robots_txt:
-            self.robot_parser = urllib.robotparser.RobotFileParser()
-            self.robot_parser.set_url(urljoin(self.base_domain, '/robots.txt'))
-            try:
-                self.robot_parser.read()
-            except Exception as e:
-                print(f"Warning: Could not read robots.txt: {e}")
-    
-    def is_allowed(self, url: str) -> bool:
-        """Check if the URL is allowed to be crawled according to robots.txt."""
-        if not self.respect_robots_txt or self.robot_parser is None:
-            return True
-        return self.robot_parser.can_fetch("*", url)
-    
-    def normalize_url(self, url: str) -> str:
-        """Normalize URL by removing fragments and resolving relative URLs."""
-        parsed = urlparse(url)
-        # Remove fragments
-        clean_url = parsed._replace(fragment="").geturl()
-        return clean_url
-
-    def extract_links(self, url: str, html_content: str) -> List[str]:
-        """Extract links from HTML content that are on the same domain."""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        links = []
-        
-        # Find all anchor tags
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-            absolute_url = urljoin(url, href)
-            normalized_url = self.normalize_url(absolute_url)
-            
-            # Only include links from the same domain
-            if urlparse(normalized_url).netloc == urlparse(self.base_url).netloc:
-                links.append(normalized_url)
-        
-        return links
-    
-    def extract_title(self, html_content: str) -> str:
-        """Extract the title from HTML content."""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        title_tag = soup.find('title')
-        return title_tag.get_text() if title_tag else "Untitled Page"
-    
-    def crawl(self) -> Dict[str, Dict]:
-        """
-        Crawl the website starting from the base URL up to the specified depth.
-        
-        Returns:
-            Dictionary mapping URLs to their content, title, and other metadata
-        """
-        to_crawl = [(self.base_url, 0)]  # (url, depth)
-        
-        if not self.respect_robots_txt:
-            print("Warning: robots.txt is being ignored.")
-        
-        while to_crawl:
-            url, depth = to_crawl.pop(0)
-            
-            # Skip if already visited or exceeds max depth
-            if url in self.visited_urls or depth > self.max_depth:
-                continue
-            
-            # Skip if not allowed by robots.txt
-            if not self.is_allowed(url):
-                print(f"Skipping {url} (disallowed by robots.txt)")
-                continue
-            
-            print(f"Crawling {url} (depth {depth})")
-            self.visited_urls.add(url)
-            
-            try:
-                response = requests.get(url, headers={'User-Agent': 'DocRepo Crawler'})
-                response.raise_for_status()
-                
-                # Store content and title
-                html_content = response.text
-                self.url_contents[url] = html_content
-                self.url_titles[url] = self.extract_title(html_content)
-                
-                # If we haven't reached max depth, extract links and add to crawl queue
-                if depth < self.max_depth:
-                    links = self.extract_links(url, html_content)
-                    for link in links:
-                        if link not in self.visited_urls:
-                            to_crawl.append((link, depth + 1))
-                
-                # Respect the delay between requests
-                time.sleep(self.delay)
-                
-            except Exception as e:
-                print(f"Error crawling {url}: {e}")
-        
-        # Compile results
-        results = {}
-        for url in self.visited_urls:
-            if url in self.url_contents:
-                results[url] = {
-                    'content': self.url_contents[url],
-                    'title': self.url_titles.get(url, "Untitled Page")
-                }
-        
-        return results 
\ No newline at end of file
+import hashlib
+import heapq
+import itertools
+import random
+import threading
+import time
+import urllib.robotparser
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse, urlsplit
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from canonical import UrlCanonicalizer
+from crawl_checkpoint import CrawlCheckpoint
+from crawl_state import CrawlStateStore
+from dedupe import DuplicateIndex
+from frontier import Frontier
+from http_client import (
+    DEFAULT_MAX_PAGE_BYTES,
+    RETRY_STATUSES,
+    TRANSIENT_ERRORS,
+    FetchedResponse,
+    HtmlBodyReader,
+    HttpSession,
+    ResponseRejected,
+    TransientError,
+    create_session,
+    retry_after_seconds,
+)
+from metrics import NULL_METRICS, Metrics
+from page_document import PageDocument
+from sitemap import SitemapReader
+from url_registry import VISITED, UrlMap, UrlRegistry, UrlSet
+
+
+class _HostPace:
+    def __init__(self, interval: float, floor: float):
+        """Request pacing state of one host."""
+        self.interval = interval
+        self.floor = floor
+        self.next_slot = 0.0
+        # Moving average and best moving average of the response latency
+        self.latency: Optional[float] = None
+        self.best_latency: Optional[float] = None
+        # The interval is not raised again before this time
+        self.hold_until = 0.0
+
+
+class HostRateLimiter:
+    # Interval factor on a 429/5xx response or a failed connection
+    BACKOFF_FACTOR = 2.0
+    # Interval factor when responses slow down
+    SLOWDOWN_FACTOR = 1.25
+    # Interval a host without one backs off to
+    BACKOFF_START = 0.25
+    # Requests per second added after each fast response
+    RATE_STEP = 0.5
+    # Intervals shorter than this snap to the floor
+    MIN_INTERVAL = 0.01
+    # Latency is slow above LATENCY_FACTOR times the host's best plus LATENCY_SLACK
+    # seconds
+    LATENCY_FACTOR = 2.0
+    LATENCY_SLACK = 0.05
+    # Weight of the newest latency in the moving average
+    LATENCY_WEIGHT = 0.3
+
+    def __init__(
+        self,
+        delay: float,
+        min_delay: Optional[float] = None,
+        max_delay: float = 60.0,
+        max_retry_after: float = 300.0,
+    ):
+        """
+        Adaptive per-host request scheduler shared by all crawl workers.
+
+        Requests to a host start at least its current interval apart. The
+        interval starts at ``delay`` and adapts to the responses (AIMD): each
+        fast response adds RATE_STEP requests per second, down to an
+        interval of ``min_delay``, while 429/5xx responses, failed
+        connections and growing latency multiply it, up to ``max_delay``.
+        A Retry-After header also holds back the host's next request.
+
+        Args:
+            delay: Initial spacing between requests to the same host in seconds
+            min_delay: Shortest spacing the rate may rise to (default: ``delay``,
+                so the crawl never runs faster than asked)
+            max_delay: Longest spacing the rate may fall to
+            max_retry_after: Longest Retry-After that is honoured in seconds
+        """
+        self.delay = delay
+        self.min_delay = delay if min_delay is None else min(min_delay, delay)
+        self.max_delay = max(max_delay, delay)
+        self.max_retry_after = max_retry_after
+        self._hosts: Dict[str, _HostPace] = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url: str) -> _HostPace:
+        """Return the pacing state of the URL's host; the caller holds the lock."""
+        host = urlparse(url).netloc
+        pace = self._hosts.get(host)
+        if pace is None:
+            pace = self._hosts[host] = _HostPace(self.delay, self.min_delay)
+        return pace
+
+    def set_min_delay(self, url: str, seconds: float) -> None:
+        """
+        Never start requests to the URL's host less than ``seconds`` apart (e.g.
+        robots.txt Crawl-delay).
+        """
+        with self._lock:
+            pace = self._host(url)
+            pace.floor = max(self.min_delay, seconds)
+            pace.interval = max(pace.interval, pace.floor)
+
+    def ready_in(self, url: str) -> float:
+        """Return the seconds until a request to the URL's host may start."""
+        with self._lock:
+            return max(0.0, self._host(url).next_slot - time.monotonic())
+
+    def reserve(self, url: str) -> float:
+        """
+        Claim the next request slot for the URL's host without waiting.
+
+        Returns:
+            Seconds the caller must wait before starting the request
+        """
+        with self._lock:
+            pace = self._host(url)
+            now = time.monotonic()
+            slot = max(now, pace.next_slot)
+            pace.next_slot = slot + pace.interval
+        return slot - now
+
+    def record(
+        self,
+        url: str,
+        status_code: Optional[int],
+        latency: Optional[float] = None,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """
+        Adapt the host's request rate to the outcome of a request.
+
+        Args:
+            url: The requested URL
+            status_code: HTTP status of the response, None if the request failed
+            latency: Seconds until the response headers arrived
+            retry_after: Seconds the server asked to wait (Retry-After), if any
+        """
+        with self._lock:
+            pace = self._host(url)
+            now = time.monotonic()
+            if retry_after is not None:
+                pace.next_slot = max(
+                    pace.next_slot, now + min(retry_after, self.max_retry_after)
+                )
+
+            if status_code is None or status_code in RETRY_STATUSES:
+                self._slow_down(pace, now, self.BACKOFF_FACTOR)
+                return
+            if latency is None:
+                return
+
+            pace.latency = (
+                latency
+                if pace.latency is None
+                else pace.latency + self.LATENCY_WEIGHT * (latency - pace.latency)
+            )
+            pace.best_latency = min(pace.best_latency or pace.latency, pace.latency)
+            if (
+                pace.latency
+                > pace.best_latency * self.LATENCY_FACTOR + self.LATENCY_SLACK
+            ):
+                self._slow_down(pace, now, self.SLOWDOWN_FACTOR)
+            elif pace.interval > pace.floor and now >= pace.hold_until:
+                interval = 1 / (1 / pace.interval + self.RATE_STEP)
+                pace.interval = max(
+                    pace.floor, interval if interval >= self.MIN_INTERVAL else 0.0
+                )
+
+    def _slow_down(self, pace: _HostPace, now: float, factor: float) -> None:
+        """
+        Multiply a host's interval at most once per interval, so a burst counts once.
+        """
+        if now < pace.hold_until:
+            return
+        pace.interval = min(
+            self.max_delay, max(pace.interval * factor, self.BACKOFF_START, pace.floor)
+        )
+        pace.hold_until = now + pace.interval + (pace.latency or 0.0)
+
+
+def not_modified_response() -> FetchedResponse:
+    """Return a bare 304 response, standing in for a fetch that was skipped."""
+    return FetchedResponse(304, {}, "")
+
+
+class Crawler:
+    # Number of link targets whose canonical form is remembered; navigation
+    # links repeat on every page of a site
+    LINK_CACHE_SIZE = 65536
+    # Longest wait before retrying a failed fetch, in seconds
+    MAX_RETRY_BACKOFF = 300.0
+
+    def __init__(
+        self,
+        base_url: str,
+        max_depth: int = 3,
+        delay: float = 0.5,
+        respect_robots_txt: bool = True,
+        concurrency: int = 1,
+        parser: Optional[str] = None,
+        state_store: Optional[CrawlStateStore] = None,
+        session: Optional[HttpSession] = None,
+        checkpoint: Optional[CrawlCheckpoint] = None,
+        resume: bool = False,
+        registry: Optional[UrlRegistry] = None,
+        use_sitemaps: bool = False,
+        metrics: Optional[Metrics] = None,
+        max_page_bytes: Optional[int] = DEFAULT_MAX_PAGE_BYTES,
+        canonicalizer: Optional[UrlCanonicalizer] = None,
+        dedupe: bool = True,
+        near_duplicates: Optional[int] = None,
+        min_delay: Optional[float] = None,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+    ):
+        """
+        Initialize the crawler with the base URL and configuration.
+
+        Args:
+            base_url: The starting URL to crawl
+            max_depth: Maximum depth of links to follow
+            delay: Delay between requests to the same host in seconds; it
+                grows while the server answers slowly or with 429/5xx
+                errors, and shrinks back once it recovers
+            respect_robots_txt: Whether to respect robots.txt rules
+            concurrency: Number of pages fetched in parallel
+            parser: BeautifulSoup parser backend (defaults to lxml when installed)
+            state_store: Crawl state from a previous run, used to send
+                conditional requests and detect unchanged pages
+            session: HTTP session to fetch with (a pooled one sized for
+                ``concurrency`` is created if omitted)
+            checkpoint: Journal that crawl progress is appended to
+            resume: Continue the crawl recorded in ``checkpoint``
+            registry: URL registry shared with other components (a private
+                one is created if omitted)
+            use_sitemaps: Also queue every page listed in the site's sitemaps
+                (from robots.txt, else /sitemap.xml) when the crawl starts
+            metrics: Metrics that fetch, parse and error statistics are
+                recorded into
+            max_page_bytes: Skip pages whose body is larger than this many
+                bytes; None for no limit
+            canonicalizer: Rules that reduce URL variants to one form (the
+                default one strips fragments and tracking parameters)
+            dedupe: Recognise pages served under several URLs, by redirect,
+                <link rel="canonical"> or identical HTML, and report them as
+                duplicates of the first one instead of as new pages
+            near_duplicates: Also treat pages whose text SimHash differs
+                from an earlier page's in at most this many bits as
+                duplicates; None to only detect exact copies
+            min_delay: Shortest delay the crawl may speed up to while the
+                server answers quickly (default: ``delay``)
+            max_retries: Times a fetch that failed with a connection error,
+                timeout or 429/5xx status is retried
+            retry_backoff: Wait before the first retry in seconds; it doubles
+                with every further attempt
+        """
+        self.canonicalizer = canonicalizer or UrlCanonicalizer()
+        self.base_url = self.canonicalizer.canonicalize(base_url)
+        self.max_depth = max_depth
+        self.delay = delay
+        self.respect_robots_txt = respect_robots_txt
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = HostRateLimiter(delay, min_delay)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.parser = parser
+        self.state_store = state_store
+        self.session = session or create_session(self.concurrency)
+        self.checkpoint = checkpoint
+        self.resume = resume
+        self.registry = registry if registry is not None else UrlRegistry()
+        self.metrics = metrics or NULL_METRICS
+        self.max_page_bytes = max_page_bytes
+        self.visited_urls = UrlSet(self.registry, VISITED)
+        self.url_contents = UrlMap(self.registry)
+        self.url_titles = UrlMap(self.registry)
+        self.frontier = Frontier(self.registry)
+        self.use_sitemaps = use_sitemaps
+        # <lastmod> of sitemap pages, as Unix timestamps
+        self.sitemap_lastmod = UrlMap(self.registry)
+        # Pages completed without a fetch, waiting to be yielded
+        self.ready: Deque[Tuple[str, Dict]] = deque()
+        # Content hashes of the pages crawled so far
+        self.duplicates = DuplicateIndex(near_duplicates) if dedupe else None
+        # Duplicate and alias URLs, mapped to the page that stands for them
+        self.duplicate_of = UrlMap(self.registry)
+        # Failed fetches waiting to be retried, as a heap of (due time,
+        # sequence, url, depth), and the number of retries of each URL
+        self.retries: List[Tuple[float, int, str, int]] = []
+        self.retry_counts: Dict[str, int] = {}
+        self._retry_sequence = itertools.count()
+
+        # Parse the base domain for robots.txt
+        parsed_url = urlparse(self.base_url)
+        self.base_domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        self.base_netloc = parsed_url.netloc
+        self.same_site_url = lru_cache(maxsize=self.LINK_CACHE_SIZE)(
+            self._same_site_url
+        )
+
+        # Initialize robots parser if needed; robots.txt itself is fetched
+        # when the crawl starts
+        self.robot_parser = None
+        self.robots_loaded = False
+        if self.respect_robots_txt:
+            self.robot_parser = urllib.robotparser.RobotFileParser()
+            self.robot_parser.set_url(urljoin(self.base_domain, "/robots.txt"))
+
+    def load_robots_txt(self) -> None:
+        """
+        Fetch robots.txt once, warning (and allowing everything) if it is unreadable.
+        """
+        if self.robot_parser is None or self.robots_loaded:
+            return
+        self.robots_loaded = True
+        try:
+            self.read_robots_txt()
+        except Exception as e:
+            print(f"Warning: Could not read robots.txt: {e}")
+
+    def read_robots_txt(self) -> None:
+        """
+        Fetch robots.txt through the crawl session and feed it to robot_parser.
+
+        This mirrors RobotFileParser.read(), but goes through the pooled
+        session so the request gets a timeout.
+        """
+        response = self.session.get(self.robot_parser.url)
+        self.parse_robots_txt(response.status_code, response.text)
+
+    def parse_robots_txt(self, status_code: int, text: str) -> None:
+        """Apply a robots.txt response the way RobotFileParser.read() does."""
+        if status_code in (401, 403):
+            self.robot_parser.disallow_all = True
+        elif 400 <= status_code < 500:
+            self.robot_parser.allow_all = True
+        elif status_code >= 500:
+            raise IOError(
+                f"{status_code} Server Error for url: {self.robot_parser.url}"
+            )
+        else:
+            self.robot_parser.parse(text.splitlines())
+
+    def apply_robots_delay(self) -> None:
+        """
+        Keep requests as far apart as robots.txt's Crawl-delay or Request-rate asks.
+        """
+        if self.robot_parser is None:
+            return
+        delays = []
+        crawl_delay = self.robot_parser.crawl_delay("*")
+        if crawl_delay:
+            delays.append(float(crawl_delay))
+        request_rate = self.robot_parser.request_rate("*")
+        if request_rate and request_rate.requests:
+            delays.append(request_rate.seconds / request_rate.requests)
+        if delays:
+            print(f"robots.txt asks for {max(delays):g}s between requests")
+            self.rate_limiter.set_min_delay(self.base_url, max(delays))
+
+    def is_allowed(self, url: str) -> bool:
+        """Check if the URL is allowed to be crawled according to robots.txt."""
+        if not self.respect_robots_txt or self.robot_parser is None:
+            return True
+        return self.robot_parser.can_fetch("*", url)
+
+    def normalize_url(self, url: str) -> str:
+        """
+        Reduce an absolute URL to its canonical form (no fragment or tracking params).
+        """
+        return self.canonicalizer.canonicalize(url)
+
+    def _same_site_url(self, url: str) -> Optional[str]:
+        """Return the canonical form of an absolute URL, or None if on another site."""
+        normalized_url = self.normalize_url(url)
+        return (
+            normalized_url
+            if urlsplit(normalized_url).netloc == self.base_netloc
+            else None
+        )
+
+    def extract_links(
+        self, url: str, html_content: Union[str, PageDocument]
+    ) -> List[str]:
+        """Extract links from HTML content that are on the same domain."""
+        document = self.as_document(url, html_content)
+        links = []
+
+        for absolute_url in document.links():
+            # Only include links from the same domain
+            normalized_url = self.same_site_url(absolute_url)
+            if normalized_url is not None:
+                links.append(normalized_url)
+
+        return links
+
+    def extract_title(self, html_content: Union[str, PageDocument]) -> str:
+        """Extract the title from HTML content."""
+        return self.as_document(self.base_url, html_content).title
+
+    def as_document(
+        self, url: str, html_content: Union[str, PageDocument]
+    ) -> PageDocument:
+        """Return the page as a PageDocument, parsing raw HTML if necessary."""
+        if isinstance(html_content, PageDocument):
+            return html_content
+        return PageDocument(url, html_content, self.parser)
+
+    def fetch(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> FetchedResponse:
+        """
+        Fetch a single page and report the outcome to the rate limiter.
+
+        The request slot was already claimed by next_request(). This runs
+        on crawl worker threads and must not touch shared state.
+
+        Args:
+            url: The URL to fetch
+            headers: Extra request headers, e.g. conditional request validators
+
+        Returns:
+            The HTTP response (status 200 or 304)
+
+        Raises:
+            ResponseRejected: If the page is not HTML or exceeds max_page_bytes
+            TransientError: If the request failed in a way worth retrying
+        """
+        status_code, ttfb, retry_after = None, None, None
+        try:
+            start = time.perf_counter()
+            with self.session.get(url, headers=headers, stream=True) as response:
+                status_code, ttfb = (
+                    response.status_code,
+                    response.elapsed.total_seconds(),
+                )
+                text, size = "", 0
+                if response.ok and response.status_code != 304:
+                    reader = HtmlBodyReader(response.headers, self.max_page_bytes)
+                    for chunk in response.iter_content(chunk_size=65536):
+                        reader.feed(chunk)
+                    text, size = reader.text(), reader.size
+                if self.metrics.enabled:
+                    # elapsed stops once the headers are parsed; the body is read after
+                    self.record_fetch(
+                        status_code, ttfb, time.perf_counter() - start, size
+                    )
+                if status_code in RETRY_STATUSES:
+                    retry_after = retry_after_seconds(
+                        response.headers.get("Retry-After")
+                    )
+                    raise TransientError(
+                        f"{status_code} {response.reason} for url: {url}",
+                        status_code,
+                        retry_after,
+                    )
+                response.raise_for_status()
+                return FetchedResponse(
+                    status_code, response.headers, text, response.url
+                )
+        except TRANSIENT_ERRORS as e:
+            raise TransientError(str(e)) from e
+        finally:
+            self.rate_limiter.record(url, status_code, ttfb, retry_after)
+
+    def record_fetch(
+        self, status_code: int, ttfb: float, total: float, size: int
+    ) -> None:
+        """
+        Record the statistics of one page fetch.
+
+        Args:
+            status_code: HTTP status of the response
+            ttfb: Seconds until the response headers arrived
+            total: Seconds until the whole body was read
+            size: Body size in bytes (after content decoding)
+        """
+        self.metrics.inc("responses_total", status=str(status_code))
+        self.metrics.observe("ttfb_seconds", ttfb)
+        self.metrics.observe("download_seconds", max(0.0, total - ttfb))
+        self.metrics.inc("bytes_in_total", size, kind="page")
+
+    def build_page(self, url: str, depth: int, response: FetchedResponse) -> Dict:
+        """
+        Turn a fetch response into a crawl result.
+
+        Pages the server reports as not modified, or whose HTML hashes to the
+        value stored from the previous run, are marked ``unchanged`` and carry
+        their stored title and links instead of content.
+
+        Args:
+            url: The page URL
+            depth: Link depth of the page
+            response: The HTTP response for the page
+
+        Returns:
+            Dictionary with the page's content, document, title, links and
+            cache validators
+        """
+        state = self.state_store.get(url) if self.state_store else None
+        page = {
+            "etag": response.headers.get("ETag") or (state and state["etag"]),
+            "last_modified": response.headers.get("Last-Modified")
+            or (state and state["last_modified"]),
+            "unchanged": False,
+        }
+
+        if response.status_code != 304:
+            html_content = response.text
+            page["content_hash"] = hashlib.sha256(
+                html_content.encode("utf-8")
+            ).hexdigest()
+            if not (
+                state
+                and state["content_hash"] == page["content_hash"]
+                and self.state_store.has_output(state)
+            ):
+                document = PageDocument(url, html_content, self.parser)
+                with self.metrics.time("parse_seconds"):
+                    page.update(
+                        {
+                            "content": html_content,
+                            "document": document,
+                            "title": self.extract_title(document),
+                            # The state store keeps links of every page so unchanged
+                            # pages can still be expanded on later runs
+                            "links": (
+                                self.extract_links(url, document)
+                                if depth < self.max_depth or self.state_store
+                                else []
+                            ),
+                        }
+                    )
+                return page
+        else:
+            page["content_hash"] = state["content_hash"]
+
+        page.update(
+            {
+                "content": None,
+                "document": None,
+                "title": state["title"],
+                "links": state["links"],
+                "filename": state["filename"],
+                "unchanged": True,
+            }
+        )
+        return page
+
+    def enqueue(self, url: str, depth: int) -> None:
+        """Add a URL to the frontier, journaling it if checkpointing is on."""
+        if self.frontier.add(url, depth) and self.checkpoint is not None:
+            self.checkpoint.record_enqueue(url, depth)
+
+    def restore_checkpoint(self) -> Iterator[Tuple[str, Dict]]:
+        """
+        Restore crawl progress from the checkpoint journal.
+
+        Rebuilds the frontier and visited set, then yields every page that
+        was fetched before the interruption without fetching it again.
+
+        Yields:
+            Tuples of (url, page), as iter_crawl does
+        """
+        state = self.checkpoint.load()
+        for url, depth in state["pending"]:
+            self.frontier.add(url, depth)
+        for url in state["seen"]:
+            self.frontier.seen.add(url)
+
+        print(
+            f"Resuming crawl: {len(state['pages'])} pages already fetched, "
+            f"{len(state['pending'])} URLs queued"
+        )
+
+        for offset in state["pages"]:
+            url, depth, page = self.checkpoint.read_page(offset)
+            page["document"] = (
+                PageDocument(url, page["content"], self.parser)
+                if page["content"] is not None
+                else None
+            )
+            self.visited_urls.add(url)
+            page.setdefault("duplicate_of", None)
+            page.setdefault("aliases", [])
+            if page["duplicate_of"] is not None:
+                self.duplicate_of[url] = page["duplicate_of"]
+            else:
+                self.url_titles[url] = page["title"]
+                for alias in page["aliases"]:
+                    self.add_alias(alias, url)
+                if self.duplicates is not None:
+                    self.duplicates.add(url, page["content_hash"])
+            yield url, page
+
+    def start_crawl(self) -> Iterator[Tuple[str, Dict]]:
+        """
+        Prepare the frontier for a crawl.
+
+        Seeds the frontier with the base URL, or restores it from the
+        checkpoint when resuming, in which case the pages fetched before the
+        interruption are yielded.
+
+        Yields:
+            Tuples of (url, page) restored from the checkpoint
+        """
+        if not self.respect_robots_txt:
+            print("Warning: robots.txt is being ignored.")
+        self.load_robots_txt()
+        self.apply_robots_delay()
+
+        if self.resume and self.checkpoint is not None and self.checkpoint.exists():
+            yield from self.restore_checkpoint()
+            self.checkpoint.open(resume=True)
+        else:
+            if self.checkpoint is not None:
+                self.checkpoint.open()
+            self.enqueue(self.base_url, 0)
+
+    def sitemap_urls(self) -> List[str]:
+        """Return the sitemaps listed in robots.txt, falling back to /sitemap.xml."""
+        site_maps = None
+        if self.robot_parser is not None and hasattr(self.robot_parser, "site_maps"):
+            site_maps = self.robot_parser.site_maps()
+        return site_maps or [urljoin(self.base_domain, "/sitemap.xml")]
+
+    def seed_from_sitemaps(self) -> int:
+        """
+        Queue every same-site page listed in the site's sitemaps at depth 0.
+
+        Sitemaps are streamed, so large ones are never held in memory. Their
+        ``<lastmod>`` dates are kept to skip unchanged pages in incremental
+        crawls.
+
+        Returns:
+            Number of pages added to the frontier
+        """
+        reader = SitemapReader(self.session)
+        listed = added = 0
+
+        for url, lastmod in reader.iter_urls(self.sitemap_urls()):
+            url = self.normalize_url(url)
+            if urlparse(url).netloc != self.base_netloc:
+                continue
+            listed += 1
+            if lastmod is not None:
+                self.sitemap_lastmod[url] = lastmod
+            if url not in self.frontier:
+                self.enqueue(url, 0)
+                added += 1
+
+        print(f"Sitemap: {listed} pages listed, {added} added to the queue")
+        return added
+
+    def unchanged_since_lastmod(self, url: str) -> bool:
+        """Check whether a stored page is at least as new as its sitemap <lastmod>."""
+        lastmod = self.sitemap_lastmod.get(url)
+        if lastmod is None or self.state_store is None:
+            return False
+        state = self.state_store.get(url)
+        return self.state_store.has_output(state) and state["updated_at"] >= lastmod
+
+    def next_request(self) -> Optional[Tuple[str, int, Optional[Dict[str, str]]]]:
+        """
+        Take the next crawlable URL off the frontier and mark it visited.
+
+        Failed fetches that are due for a retry come first. URLs disallowed
+        by robots.txt are skipped, and pages the sitemap reports as
+        unchanged are completed without a fetch and queued on ``ready``.
+        A URL is only handed out once the site's rate limit lets its request
+        start, and that request slot is claimed for it.
+
+        Returns:
+            Tuple of (url, depth, request headers), or None if the frontier
+            is empty or the next request may not start yet (see idle_time())
+        """
+        # Every crawled URL is on the base site, so they share one rate limit
+        if self.rate_limiter.ready_in(self.base_url) > 0:
+            return None
+
+        if self.retries and self.retries[0][0] <= time.monotonic():
+            _, _, url, depth = heapq.heappop(self.retries)
+            print(f"Crawling {url} (depth {depth}, retry {self.retry_counts[url]})")
+            return self.request(url, depth)
+
+        while self.frontier:
+            url, depth = self.frontier.pop()
+
+            # Skip if not allowed by robots.txt
+            if not self.is_allowed(url):
+                print(f"Skipping {url} (disallowed by robots.txt)")
+                self.metrics.inc("pages_skipped_total", reason="robots")
+                self.record_done(url)
+                continue
+
+            self.visited_urls.add(url)
+            # The sitemap says the stored copy is current; skip the fetch
+            if self.unchanged_since_lastmod(url):
+                page = self.handle_response(url, depth, not_modified_response)
+                if page is not None:
+                    self.ready.append((url, page))
+                continue
+
+            print(f"Crawling {url} (depth {depth})")
+            return self.request(url, depth)
+
+        return None
+
+    def request(
+        self, url: str, depth: int
+    ) -> Tuple[str, int, Optional[Dict[str, str]]]:
+        """Claim the request slot for a URL; returns (url, depth, request headers)."""
+        # next_request() found the slot free, but in a distributed crawl
+        # another shard may have claimed it since
+        wait = self.rate_limiter.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        headers = (
+            self.state_store.conditional_headers(url) if self.state_store else None
+        )
+        return url, depth, headers
+
+    def idle_time(self) -> Optional[float]:
+        """
+        Return how long until next_request() can hand out another URL.
+
+        Returns:
+            Seconds until a queued URL or the earliest retry may start;
+            None if nothing is queued or waiting to be retried
+        """
+        waits = []
+        slot = self.rate_limiter.ready_in(self.base_url)
+        if self.frontier:
+            waits.append(slot)
+        if self.retries:
+            waits.append(max(slot, self.retries[0][0] - time.monotonic()))
+        return max(0.0, min(waits)) if waits else None
+
+    def schedule_retry(self, url: str, depth: int, error: TransientError) -> bool:
+        """
+        Queue a failed fetch to be retried after a jittered exponential backoff.
+
+        The wait is between half and all of ``retry_backoff`` doubled per
+        earlier attempt, so pages that failed together are not retried
+        together, and at least the error's Retry-After.
+
+        Args:
+            url: The page URL
+            depth: Link depth of the page
+            error: The failure
+
+        Returns:
+            False if the URL has used up its retries
+        """
+        attempt = self.retry_counts.get(url, 0) + 1
+        if attempt > self.max_retries:
+            self.retry_counts.pop(url, None)
+            return False
+        self.retry_counts[url] = attempt
+
+        backoff = min(self.MAX_RETRY_BACKOFF, self.retry_backoff * 2 ** (attempt - 1))
+        wait_time = backoff / 2 + random.uniform(0, backoff / 2)
+        if error.retry_after is not None:
+            wait_time = max(
+                wait_time, min(error.retry_after, self.rate_limiter.max_retry_after)
+            )
+        heapq.heappush(
+            self.retries,
+            (time.monotonic() + wait_time, next(self._retry_sequence), url, depth),
+        )
+
+        print(f"Retrying {url} in {wait_time:.1f}s ({error})")
+        self.metrics.inc(
+            "retries_total",
+            reason=str(error.status_code or type(error.__cause__).__name__),
+        )
+        return True
+
+    def handle_response(
+        self, url: str, depth: int, fetch: Callable[[], FetchedResponse]
+    ) -> Optional[Dict]:
+        """
+        Build the page for a finished fetch and queue the links it contains.
+
+        Args:
+            url: The page URL
+            depth: Link depth of the page
+            fetch: Returns the fetch's response, or raises its error
+
+        Returns:
+            The page dictionary, or None if the fetch or processing failed
+        """
+        try:
+            response = fetch()
+            page = self.build_page(url, depth, response)
+            kind = self.detect_duplicate(url, page, response.url)
+            if kind is None:
+                self.url_titles[url] = page["title"]
+            else:
+                self.metrics.inc("duplicates_total", kind=kind)
+                # Only the original is converted
+                page["content"] = page["document"] = None
+
+            # If we haven't reached max depth, add links to crawl queue; copies
+            # of a page link to the same pages as the original
+            if depth < self.max_depth and kind in (None, "canonical", "near"):
+                for link in page["links"]:
+                    self.enqueue(link, depth + 1)
+
+        except ResponseRejected as e:
+            print(f"Skipping {url} ({e})")
+            self.metrics.inc("pages_skipped_total", reason="rejected")
+            self.record_done(url)
+            return None
+
+        except Exception as e:
+            if isinstance(e, TransientError) and self.schedule_retry(url, depth, e):
+                return None
+            print(f"Error crawling {url}: {e}")
+            self.metrics.inc("errors_total", stage="crawl", type=type(e).__name__)
+            self.record_done(url)
+            return None
+
+        if self.retry_counts:
+            self.retry_counts.pop(url, None)
+        if self.checkpoint is not None:
+            self.checkpoint.record_page(url, depth, page)
+        self.metrics.inc("pages_total", unchanged=str(page["unchanged"]).lower())
+        return page
+
+    def detect_duplicate(
+        self, url: str, page: Dict, final_url: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Check whether a page repeats one crawled earlier under another URL.
+
+        A page is a duplicate if it was redirected to, or names as canonical,
+        a page that was already crawled, or if its HTML (or with
+        near_duplicates, its text) matches an earlier page. Otherwise the
+        URL it was redirected to becomes an alias of it: the alias is not
+        fetched, and links to it lead to this page. A canonical URL that was
+        not crawled yet is left alone, as sites get these wrong often enough
+        that it is not safe to skip the page it names.
+
+        Sets ``page['duplicate_of']`` (the original's URL or None) and
+        ``page['aliases']``.
+
+        Args:
+            url: The page URL
+            page: The page built by build_page
+            final_url: URL the response came from after redirects
+
+        Returns:
+            The reason the page is a duplicate ('alias', 'redirect',
+            'canonical', 'content' or 'near'), or None for a new page
+        """
+        page["duplicate_of"], page["aliases"] = None, []
+        if self.duplicates is None:
+            return None
+        if page["unchanged"]:
+            self.duplicates.add(url, page["content_hash"])
+            return None
+
+        # Another page claimed this URL as an alias while it was being fetched
+        original = self.duplicate_of.get(url)
+        if original is not None:
+            page["duplicate_of"] = original
+            return "alias"
+
+        candidates = [
+            ("redirect", final_url),
+            ("canonical", page["document"].canonical_url),
+        ]
+        aliases = []
+        for kind, target in candidates:
+            if not target:
+                continue
+            target = self.normalize_url(target)
+            if target == url or urlparse(target).netloc != self.base_netloc:
+                continue
+            original = self.original_of(target)
+            if original is not None:
+                page["duplicate_of"] = self.duplicate_of[url] = original
+                return kind
+            if kind == "redirect":
+                aliases.append(target)
+
+        exact = page["content_hash"] in self.duplicates.hashes
+        text = (
+            page["document"].text if self.duplicates.near_distance is not None else None
+        )
+        original = self.duplicates.find(url, page["content_hash"], text)
+        if original is not None:
+            page["duplicate_of"] = self.duplicate_of[url] = original
+            return "content" if exact else "near"
+
+        page["aliases"] = aliases
+        for alias in page["aliases"]:
+            self.add_alias(alias, url)
+        return None
+
+    def original_of(self, url: str) -> Optional[str]:
+        """Return the crawled page that stands for a URL, or None if there is none."""
+        original = self.duplicate_of.get(url)
+        if original is None and url in self.url_titles:
+            original = url
+        return original
+
+    def add_alias(self, alias: str, url: str) -> None:
+        """Record that a URL serves the same page as ``url``, so it is not fetched."""
+        self.duplicate_of[alias] = url
+        self.frontier.seen.add(alias)
+
+    def record_done(self, url: str) -> None:
+        """Record that a URL finished without producing a page (skipped or failed)."""
+        if self.checkpoint is not None:
+            self.checkpoint.record_done(url)
+
+    def more_work(self) -> bool:
+        """
+        Check whether URLs are left to crawl (or retry) once no fetch is in flight.
+        """
+        return bool(self.frontier or self.retries)
+
+    def finish_crawl(self) -> None:
+        """Flush the checkpoint and report frontier statistics."""
+        if self.checkpoint is not None:
+            self.checkpoint.flush()
+
+        stats = self.frontier.stats()
+        print(
+            f"Frontier: {stats['unique_urls']} unique URLs, "
+            f"{stats['duplicates_suppressed']} duplicate links suppressed, "
+            f"peak queue size {stats['max_queued']}"
+        )
+
+    def iter_crawl(self) -> Iterator[Tuple[str, Dict]]:
+        """
+        Crawl the website, yielding each page as soon as it has been fetched.
+
+        Up to ``concurrency`` pages are fetched in parallel on worker threads;
+        all bookkeeping (visited set, queue) happens on the consuming thread.
+        Requests are started as the rate limit allows; in between, the
+        consuming thread handles finished fetches instead of sleeping.
+        Page content is not retained, so memory stays bounded by the pages in
+        flight plus whatever the consumer keeps.
+
+        Yields:
+            Tuples of (url, page) where page is the dictionary built by
+            build_page
+        """
+        yield from self.start_crawl()
+        if self.use_sitemaps:
+            self.seed_from_sitemaps()
+        in_flight = {}  # future -> (url, depth)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while in_flight or self.more_work():
+                # Keep every worker busy while there is work queued
+                while len(in_flight) < self.concurrency:
+                    request = self.next_request()
+                    if request is None:
+                        break
+                    url, depth, headers = request
+                    in_flight[executor.submit(self.fetch, url, headers)] = (url, depth)
+
+                while self.ready:
+                    yield self.ready.popleft()
+                if not in_flight:
+                    # Nothing to handle until the next request slot or retry
+                    pause = self.idle_time()
+                    if pause:
+                        time.sleep(pause)
+                    continue
+
+                # Wake up for the next request slot if a worker is free for it
+                timeout = (
+                    self.idle_time() if len(in_flight) < self.concurrency else None
+                )
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    page = self.handle_response(url, depth, future.result)
+                    if page is not None:
+                        yield url, page
+
+        self.finish_crawl()
+
+    def crawl(self) -> Dict[str, Dict]:
+        """
+        Crawl the website starting from the base URL up to the specified depth.
+
+        Returns:
+            Dictionary mapping URLs to their content, title, and other metadata
+        """
+        results = {}
+        for url, page in self.iter_crawl():
+            if page["document"] is not None:
+                self.url_contents[url] = page["document"]
+            results[url] = page
+
+        return results
@@ -0,0 +1,136 @@
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple
+
+SIMHASH_BITS = 64
+# Width of each per-bit counter when all features are summed at once
+_FIELD_BITS = 32
+_FIELD_MASK = (1 << _FIELD_BITS) - 1
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def _spread_table() -> List[int]:
+    """For every byte, spread its 8 bits into 8 counter fields (bit i -> field i)."""
+    table = []
+    for byte in range(256):
+        spread = 0
+        for bit in range(8):
+            if byte >> bit & 1:
+                spread |= 1 << (bit * _FIELD_BITS)
+        table.append(spread)
+    return table
+
+
+_SPREAD = _spread_table()
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """
+    Compute the 64-bit SimHash of a text.
+
+    The features are the overlapping runs of ``shingle`` words. Similar
+    texts get fingerprints that differ in only a few bits. The bit counts of
+    all features are accumulated in one big integer, with one counter field
+    per bit, rather than bit by bit.
+
+    Args:
+        text: Visible text of a page
+        shingle: Number of words per feature
+
+    Returns:
+        The fingerprint (0 for a text without words)
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < shingle:
+        features = [" ".join(words)] if words else []
+    else:
+        features = [
+            " ".join(words[i : i + shingle]) for i in range(len(words) - shingle + 1)
+        ]
+    if not features:
+        return 0
+
+    totals = 0
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        for position, byte in enumerate(digest):
+            totals += _SPREAD[byte] << (position * 8 * _FIELD_BITS)
+
+    # A bit is set when it was set in more than half of the features
+    half = len(features) / 2
+    fingerprint = 0
+    for bit in range(SIMHASH_BITS):
+        if (totals >> (bit * _FIELD_BITS)) & _FIELD_MASK > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class DuplicateIndex:
+    def __init__(self, near_distance: Optional[int] = None):
+        """
+        Recognise pages whose content was already seen under another URL.
+
+        Exact duplicates are found by content hash. With ``near_distance``,
+        pages whose SimHash differs from an earlier page's in at most that
+        many bits count as duplicates too. Fingerprints are split into
+        ``near_distance + 1`` bands and indexed by band, so only pages that
+        share a band are compared: two fingerprints within the distance
+        always agree on at least one band.
+
+        Args:
+            near_distance: Maximum number of differing SimHash bits for a
+                near duplicate (e.g. 3); None to only detect exact copies
+        """
+        self.near_distance = near_distance
+        self.hashes: Dict[str, str] = {}
+        self.bands: List[Dict[int, List[Tuple[int, str]]]] = []
+        if near_distance is not None:
+            count = near_distance + 1
+            width = SIMHASH_BITS // count
+            # (shift, mask) of each band; the last band takes the leftover bits
+            self._band_masks = [
+                (
+                    i * width,
+                    (1 << (width if i < count - 1 else SIMHASH_BITS - i * width)) - 1,
+                )
+                for i in range(count)
+            ]
+            self.bands = [{} for _ in range(count)]
+
+    def add(self, url: str, content_hash: str) -> None:
+        """Remember the content hash of a page without checking it."""
+        self.hashes.setdefault(content_hash, url)
+
+    def find(
+        self, url: str, content_hash: str, text: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Look for an earlier page with the same content and remember this one.
+
+        Args:
+            url: The page URL
+            content_hash: Hash of the page HTML
+            text: Visible text of the page, for near-duplicate detection
+
+        Returns:
+            URL of the earlier page, or None if the page is new
+        """
+        original = self.hashes.get(content_hash)
+        if original is None and self.near_distance is not None and text is not None:
+            original = self._find_near(url, simhash(text))
+        # Later exact copies point straight at the first page
+        self.hashes.setdefault(content_hash, original or url)
+        return original
+
+    def _find_near(self, url: str, fingerprint: int) -> Optional[str]:
+        """Return an indexed page within near_distance bits, else index this one."""
+        keys = [(fingerprint >> shift) & mask for shift, mask in self._band_masks]
+        for band, key in zip(self.bands, keys):
+            for candidate, candidate_url in band.get(key, ()):
+                if bin(candidate ^ fingerprint).count("1") <= self.near_distance:
+                    return candidate_url
+
+        for band, key in zip(self.bands, keys):
+            band.setdefault(key, []).append((fingerprint, url))
+        return None
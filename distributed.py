@@ -0,0 +1,649 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from crawler import Crawler, HostRateLimiter
+from file_handler import FilenameAllocator, hashed_filename
+from http_client import FetchedResponse
+
+# Row states in the shared queue
+QUEUED, CLAIMED, DONE, SKIPPED = 0, 1, 2, 3
+
+SHARD_KEYS = ("url", "host")
+
+
+def shard_for(url: str, shards: int, shard_by: str = "url") -> int:
+    """
+    Return the shard that owns a URL.
+
+    Args:
+        url: The normalized URL
+        shards: Total number of shards
+        shard_by: 'host' keeps every URL of a host on one shard; 'url'
+            spreads the pages of a single host across all shards
+
+    Returns:
+        Shard number in range(shards)
+    """
+    key = urlparse(url).netloc if shard_by == "host" else url
+    return int(hashlib.sha1(key.encode("utf-8")).hexdigest()[:8], 16) % shards
+
+
+class CrawlQueue:
+    QUEUE_FILENAME = ".docrepo_queue.sqlite"
+
+    def __init__(
+        self, path: str, shards: int, shard_by: str = "url", reset: bool = False
+    ):
+        """
+        Open (or create) the queue shared by the shards of a distributed crawl.
+
+        A SQLite file stands in for a message broker: every process working
+        on the crawl opens the same file. Each URL is stored once with the
+        shard that owns it, so links discovered by one shard are routed to
+        their owner simply by adding them. The queue also hands out output
+        filenames, keeps page titles and duplicate URLs and records the links
+        and images each shard could not rewrite, which together are everything the final
+        merge needs. It also holds each host's next request slot, so the
+        shards together keep to the politeness delay.
+
+        Args:
+            path: SQLite file of the queue (on a shared filesystem when
+                workers run on several machines)
+            shards: Total number of shards; must match for all workers
+            shard_by: How URLs are assigned to shards, 'url' or 'host'
+            reset: Start from an empty queue, discarding an earlier run
+
+        Raises:
+            ValueError: If the queue belongs to a run with different settings
+        """
+        if shard_by not in SHARD_KEYS:
+            raise ValueError(f"Unknown shard key: {shard_by} (use 'url' or 'host')")
+        self.path = path
+        self.shards = shards
+        self.shard_by = shard_by
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Transactions are managed explicitly; writers wait for each other
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.transaction() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS urls (
+                    url TEXT PRIMARY KEY,
+                    shard INTEGER,
+                    depth INTEGER,
+                    status INTEGER,
+                    title TEXT,
+                    pending TEXT
+                )""")
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS urls_claim ON urls (shard, status, depth)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS urls_status ON urls (status)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS files"
+                " (filename TEXT PRIMARY KEY, url TEXT UNIQUE)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS name_counters"
+                " (filename TEXT PRIMARY KEY, next INTEGER)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS aliases (url TEXT PRIMARY KEY, target TEXT)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS hosts"
+                " (host TEXT PRIMARY KEY, next_slot REAL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            if reset:
+                for table in (
+                    "urls",
+                    "files",
+                    "name_counters",
+                    "aliases",
+                    "hosts",
+                    "meta",
+                ):
+                    db.execute(f"DELETE FROM {table}")
+
+            settings = {"shards": str(shards), "shard_by": shard_by}
+            for key, value in settings.items():
+                row = db.execute(
+                    "SELECT value FROM meta WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    db.execute("INSERT INTO meta VALUES (?, ?)", (key, value))
+                elif row[0] != value:
+                    raise ValueError(
+                        f"Queue {path} was created with {key}={row[0]}, not {value}"
+                    )
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block as one write transaction, taking the write lock up front."""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def _insert(
+        self, db: sqlite3.Connection, entries: Iterable[Tuple[str, int]]
+    ) -> None:
+        """Queue URLs that are not known yet, each on the shard that owns it."""
+        db.executemany(
+            "INSERT OR IGNORE INTO urls (url, shard, depth, status)"
+            " VALUES (?, ?, ?, ?)",
+            (
+                (url, shard_for(url, self.shards, self.shard_by), depth, QUEUED)
+                for url, depth in entries
+            ),
+        )
+
+    def add(self, entries: Iterable[Tuple[str, int]]) -> None:
+        """
+        Queue URLs on their owning shards; URLs already known are ignored.
+
+        Args:
+            entries: (url, depth) pairs
+        """
+        with self.transaction() as db:
+            self._insert(db, entries)
+
+    def requeue_unfinished(self, shard: int, output_dir: str) -> int:
+        """
+        Put back the work a shard's previous worker left unfinished, e.g.
+        because it was killed: URLs it claimed, and crawled pages whose file
+        never reached the disk. Call this before the shard's worker starts.
+
+        Args:
+            shard: The shard
+            output_dir: Directory the pages are saved to
+
+        Returns:
+            Number of URLs put back
+        """
+        with self.transaction() as db:
+            missing = [
+                (QUEUED, url)
+                for url, filename in db.execute(
+                    "SELECT urls.url, files.filename FROM urls"
+                    " JOIN files ON files.url = urls.url "
+                    "WHERE urls.shard = ? AND urls.status = ?",
+                    (shard, DONE),
+                ).fetchall()
+                if not os.path.exists(os.path.join(output_dir, filename))
+            ]
+            db.executemany("UPDATE urls SET status = ? WHERE url = ?", missing)
+            claimed = db.execute(
+                "UPDATE urls SET status = ? WHERE shard = ? AND status = ?",
+                (QUEUED, shard, CLAIMED),
+            ).rowcount
+        return claimed + len(missing)
+
+    def claim(self, shard: int, limit: int) -> List[Tuple[str, int]]:
+        """
+        Take up to ``limit`` queued URLs of a shard, shallowest first.
+
+        Returns:
+            (url, depth) pairs now claimed by the caller
+        """
+        with self.transaction() as db:
+            rows = db.execute(
+                "SELECT url, depth FROM urls WHERE shard = ? AND status = ?"
+                " ORDER BY depth LIMIT ?",
+                (shard, QUEUED, limit),
+            ).fetchall()
+            db.executemany(
+                "UPDATE urls SET status = ? WHERE url = ?",
+                ((CLAIMED, url) for url, _ in rows),
+            )
+        return rows
+
+    def finish(
+        self,
+        url: str,
+        title: Optional[str],
+        links: Iterable[Tuple[str, int]] = (),
+        aliases: Dict[str, str] = None,
+    ) -> None:
+        """
+        Mark a page as crawled and queue the links found on it.
+
+        Both happen in one transaction, so other shards never see the page
+        finished without its links.
+
+        Args:
+            url: The page URL
+            title: Page title, used for the index; None for a duplicate page,
+                which is left out of the index
+            links: (url, depth) pairs discovered on the page
+            aliases: Map of duplicate or alias URL to the page that stands
+                for it; aliases not crawled yet are never crawled
+        """
+        with self.transaction() as db:
+            self._insert(db, links)
+            db.execute(
+                "UPDATE urls SET status = ?, title = ? WHERE url = ?",
+                (DONE, title, url),
+            )
+            if aliases:
+                db.executemany(
+                    "INSERT OR IGNORE INTO urls (url, shard, depth, status)"
+                    " VALUES (?, ?, ?, ?)",
+                    (
+                        (
+                            alias,
+                            shard_for(alias, self.shards, self.shard_by),
+                            0,
+                            SKIPPED,
+                        )
+                        for alias in aliases
+                    ),
+                )
+                db.executemany(
+                    "UPDATE urls SET status = ? WHERE url = ? AND status = ?",
+                    ((SKIPPED, alias, QUEUED) for alias in aliases),
+                )
+                db.executemany(
+                    "INSERT OR REPLACE INTO aliases VALUES (?, ?)", aliases.items()
+                )
+
+    def skip(self, url: str) -> None:
+        """Mark a URL as finished without a page (disallowed, rejected or failed)."""
+        with self.transaction() as db:
+            db.execute("UPDATE urls SET status = ? WHERE url = ?", (SKIPPED, url))
+
+    def unfinished(self) -> int:
+        """Return the number of URLs queued or being crawled on any shard."""
+        row = self.connection.execute(
+            "SELECT COUNT(*) FROM urls WHERE status IN (?, ?)", (QUEUED, CLAIMED)
+        ).fetchone()
+        return row[0]
+
+    def allocate_filename(
+        self,
+        filename: str,
+        url: str,
+        hash_suffix: bool = False,
+        ambiguous: bool = False,
+    ) -> str:
+        """
+        Allocate an output filename that is unique across all shards.
+
+        Follows FilenameAllocator: a taken name gets a short hash of the URL
+        (with ``hash_suffix``, which ambiguous URLs always get) or the next
+        number kept for that name. A URL keeps the name it was given first.
+
+        Args:
+            filename: The preferred filename
+            url: URL of the page the file belongs to
+            hash_suffix: Disambiguate with a stable hash of the URL
+            ambiguous: Other URLs may map to the same filename
+
+        Returns:
+            The allocated filename
+        """
+        with self.transaction() as db:
+            row = db.execute(
+                "SELECT filename FROM files WHERE url = ?", (url,)
+            ).fetchone()
+            if row is not None:
+                return row[0]
+
+            def taken(name: str) -> bool:
+                return (
+                    db.execute(
+                        "SELECT 1 FROM files WHERE filename = ?", (name,)
+                    ).fetchone()
+                    is not None
+                )
+
+            candidate = filename
+            if taken(candidate) or (hash_suffix and ambiguous):
+                stem, ext = os.path.splitext(filename)
+                candidate = None
+                if hash_suffix:
+                    candidate = hashed_filename(filename, url)
+                    if taken(candidate):
+                        candidate = None
+                if candidate is None:
+                    row = db.execute(
+                        "SELECT next FROM name_counters WHERE filename = ?", (filename,)
+                    ).fetchone()
+                    counter = row[0] if row else 1
+                    candidate = f"{stem}_{counter}{ext}"
+                    while taken(candidate):
+                        counter += 1
+                        candidate = f"{stem}_{counter}{ext}"
+                    db.execute(
+                        "INSERT OR REPLACE INTO name_counters VALUES (?, ?)",
+                        (filename, counter + 1),
+                    )
+
+            db.execute("INSERT INTO files VALUES (?, ?)", (candidate, url))
+            return candidate
+
+    def next_slot(self, host: str) -> float:
+        """
+        Return the time (``time.time()``) before which no shard may request a host.
+        """
+        row = self.connection.execute(
+            "SELECT next_slot FROM hosts WHERE host = ?", (host,)
+        ).fetchone()
+        return row[0] if row else 0.0
+
+    def reserve_slot(self, host: str, interval: float, earliest: float = 0.0) -> float:
+        """
+        Claim the next request slot for a host on behalf of one shard.
+
+        Args:
+            host: Host (netloc) of the request
+            interval: Seconds until the slot after this one
+            earliest: Time (``time.time()``) the slot may not start before
+
+        Returns:
+            Start time of the claimed slot
+        """
+        with self.transaction() as db:
+            row = db.execute(
+                "SELECT next_slot FROM hosts WHERE host = ?", (host,)
+            ).fetchone()
+            slot = max(time.time(), earliest, row[0] if row else 0.0)
+            db.execute(
+                "INSERT OR REPLACE INTO hosts VALUES (?, ?)", (host, slot + interval)
+            )
+        return slot
+
+    def hold_host(self, host: str, until: float) -> None:
+        """
+        Keep every shard from requesting a host before ``until`` (e.g. Retry-After).
+        """
+        with self.transaction() as db:
+            db.execute("INSERT OR IGNORE INTO hosts VALUES (?, 0)", (host,))
+            db.execute(
+                "UPDATE hosts SET next_slot = MAX(next_slot, ?) WHERE host = ?",
+                (until, host),
+            )
+
+    def record_pending(
+        self, pages: Dict[str, Tuple[Iterable[str], Iterable[str]]]
+    ) -> None:
+        """
+        Record the links and images that saved pages could not rewrite yet.
+
+        Args:
+            pages: Map of page URL to (links, images) still to rewrite; a
+                page with neither has nothing left to fix up
+        """
+
+        def encode(links, images):
+            links, images = sorted(links), sorted(images)
+            return (
+                json.dumps({"links": links, "images": images})
+                if links or images
+                else None
+            )
+
+        with self.transaction() as db:
+            db.executemany(
+                "UPDATE urls SET pending = ? WHERE url = ?",
+                ((encode(*targets), url) for url, targets in pages.items()),
+            )
+
+    def filenames(self) -> Dict[str, str]:
+        """Return the output filename of every page saved by any shard."""
+        return {
+            url: filename
+            for filename, url in self.connection.execute(
+                "SELECT filename, url FROM files"
+            )
+        }
+
+    def titles(self) -> Dict[str, str]:
+        """Return the title of every crawled page that is not a duplicate."""
+        return dict(
+            self.connection.execute(
+                "SELECT url, title FROM urls WHERE status = ? AND title IS NOT NULL",
+                (DONE,),
+            )
+        )
+
+    def aliases(self) -> Dict[str, str]:
+        """Return every duplicate or alias URL with the page that stands for it."""
+        return dict(self.connection.execute("SELECT url, target FROM aliases"))
+
+    def pending(self) -> Tuple[Dict[str, Set[str]], Dict[str, Set[str]]]:
+        """
+        Return what record_pending() recorded.
+
+        Returns:
+            Tuple of (links, images), each a map of page URL to the targets
+            still to rewrite
+        """
+        links, images = {}, {}
+        for url, targets in self.connection.execute(
+            "SELECT url, pending FROM urls WHERE pending IS NOT NULL"
+        ):
+            targets = json.loads(targets)
+            if targets["links"]:
+                links[url] = set(targets["links"])
+            if targets["images"]:
+                images[url] = set(targets["images"])
+        return links, images
+
+    def close(self) -> None:
+        """Close the database."""
+        self.connection.close()
+
+
+class SharedFilenameAllocator(FilenameAllocator):
+    def __init__(self, queue: CrawlQueue, hash_suffix: bool = False):
+        """
+        Filename allocator backed by the shared queue, so names are unique
+        across all shards writing into the same output directory.
+
+        Args:
+            queue: The distributed crawl's queue
+            hash_suffix: Disambiguate with a stable hash of the URL
+        """
+        super().__init__(hash_suffix)
+        self.queue = queue
+
+    def allocate(self, filename: str, key: str, ambiguous: bool = False) -> str:
+        """Take a filename no shard has used yet (see FilenameAllocator.allocate)."""
+        filename = self.queue.allocate_filename(
+            filename, key, self.hash_suffix, ambiguous
+        )
+        self.taken.add(filename)
+        return filename
+
+
+class SharedHostRateLimiter(HostRateLimiter):
+    def __init__(self, queue: CrawlQueue, *args, **kwargs):
+        """
+        Host rate limiter whose request slots are shared by all shards.
+
+        Takes the same arguments as HostRateLimiter. Each shard still adapts
+        the interval to the responses it sees, but request slots are claimed
+        in the shared queue, so N shards crawling one host start requests no
+        faster than a single crawler would, whatever the shard key.
+
+        Args:
+            queue: The distributed crawl's queue
+        """
+        super().__init__(*args, **kwargs)
+        self.queue = queue
+        # Retry-After holds reported by fetch workers, by host; the queue's
+        # connection belongs to the crawl thread, which writes them
+        self._holds: Dict[str, float] = {}
+
+    def _write_holds(self) -> None:
+        """Pass the Retry-After holds seen since the last call to the other shards."""
+        with self._lock:
+            holds, self._holds = self._holds, {}
+        for host, until in holds.items():
+            self.queue.hold_host(host, until)
+
+    def ready_in(self, url: str) -> float:
+        """Return the seconds until this shard and every other may request the host."""
+        self._write_holds()
+        shared = self.queue.next_slot(urlparse(url).netloc) - time.time()
+        return max(super().ready_in(url), shared)
+
+    def reserve(self, url: str) -> float:
+        """
+        Claim the host's next request slot in the shared queue.
+
+        Returns:
+            Seconds the caller must wait before starting the request
+        """
+        self._write_holds()
+        with self._lock:
+            pace = self._host(url)
+            interval = pace.interval
+            earliest = time.time() + max(0.0, pace.next_slot - time.monotonic())
+        # Other processes may hold the queue's write lock; fetch workers
+        # recording responses must not wait for it
+        slot = self.queue.reserve_slot(urlparse(url).netloc, interval, earliest)
+        wait = max(0.0, slot - time.time())
+        with self._lock:
+            pace.next_slot = max(pace.next_slot, time.monotonic() + wait + interval)
+        return wait
+
+    def record(
+        self,
+        url: str,
+        status_code: Optional[int],
+        latency: Optional[float] = None,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """
+        Like HostRateLimiter.record(), also holding back other shards on Retry-After.
+        """
+        super().record(url, status_code, latency, retry_after)
+        if retry_after is not None:
+            until = time.time() + min(retry_after, self.max_retry_after)
+            host = urlparse(url).netloc
+            with self._lock:
+                self._holds[host] = max(self._holds.get(host, 0.0), until)
+
+
+class ShardCrawler(Crawler):
+    # Number of URLs taken off the shared queue at a time
+    CLAIM_BATCH = 100
+
+    def __init__(
+        self, *args, queue: CrawlQueue, shard: int, poll_interval: float = 0.5, **kwargs
+    ):
+        """
+        Crawler for one shard of a distributed crawl.
+
+        Takes the same arguments as Crawler. Pages are claimed from the
+        shared queue instead of a private frontier, and every link found is
+        added to the queue, where it lands on whichever shard owns it.
+        Request slots are shared too (see SharedHostRateLimiter), so the
+        delay between requests to a host holds across shards. The crawl ends
+        once no shard has queued or unfinished URLs left.
+
+        Args:
+            queue: The distributed crawl's queue
+            shard: Number of the shard this crawler works on
+            poll_interval: Seconds to wait before checking the queue again
+                while other shards are still busy
+        """
+        super().__init__(*args, **kwargs)
+        self.queue = queue
+        self.shard = shard
+        self.rate_limiter = SharedHostRateLimiter(
+            queue, self.rate_limiter.delay, self.rate_limiter.min_delay
+        )
+        self.poll_interval = poll_interval
+        # Links and aliases found since the queue was last written to
+        self.outbox: List[Tuple[str, int]] = []
+        self.alias_outbox: Dict[str, str] = {}
+
+    def enqueue(self, url: str, depth: int) -> None:
+        """Hold a discovered URL for the shared queue, which routes it to its shard."""
+        self.outbox.append((url, depth))
+
+    def claim(self) -> bool:
+        """
+        Send held links to the shared queue and refill the local frontier.
+
+        Returns:
+            True if URLs were claimed
+        """
+        if self.outbox:
+            self.queue.add(self.outbox)
+            self.outbox = []
+        claimed = self.queue.claim(self.shard, self.CLAIM_BATCH)
+        for url, depth in claimed:
+            self.frontier.add(url, depth)
+        return bool(claimed)
+
+    def next_request(self) -> Optional[Tuple[str, int, Optional[Dict[str, str]]]]:
+        """
+        Like Crawler.next_request(), claiming more URLs when the frontier runs dry.
+        """
+        if not self.frontier:
+            self.claim()
+        return super().next_request()
+
+    def more_work(self) -> bool:
+        """
+        Wait until this shard has URLs to crawl or retry, or the whole crawl is done.
+
+        Returns:
+            False once no shard has queued or unfinished URLs left
+        """
+        while not (self.frontier or self.retries or self.claim()):
+            if not self.queue.unfinished():
+                return False
+            time.sleep(self.poll_interval)
+        return True
+
+    def handle_response(
+        self, url: str, depth: int, fetch: Callable[[], FetchedResponse]
+    ) -> Optional[Dict]:
+        """
+        Like Crawler.handle_response(), then report the page and links to the queue.
+        """
+        page = super().handle_response(url, depth, fetch)
+        if page is not None:
+            if page["duplicate_of"] is not None:
+                self.alias_outbox[url] = page["duplicate_of"]
+            # The page and the links found on it reach the queue together
+            self.queue.finish(
+                url,
+                None if page["duplicate_of"] else page["title"],
+                self.outbox,
+                self.alias_outbox,
+            )
+            self.outbox = []
+            self.alias_outbox = {}
+        return page
+
+    def add_alias(self, alias: str, url: str) -> None:
+        """
+        Hold an alias for the shared queue, which keeps all shards from crawling it.
+        """
+        self.duplicate_of[alias] = url
+        self.alias_outbox[alias] = url
+
+    def record_done(self, url: str) -> None:
+        """Mark a URL that produced no page as finished in the queue as well."""
+        super().record_done(url)
+        self.queue.skip(url)
@@ -1,209 +1,1410 @@
-#!/usr/bin/env python3
-
-import argparse
-import sys
-import re
-from typing import Dict, List, Set
-from tqdm import tqdm
-from urllib.parse import urlparse, urljoin
-
-from crawler import Crawler
-from markdown_converter import MarkdownConverter
-from file_handler import FileHandler
-
-
-class DocRepo:
-    def __init__(self, base_url: str, output_dir: str = "docrepo", max_depth: int = 3, 
-                 delay: float = 0.5, download_images: bool = True, respect_robots_txt: bool = True):
-        """
-        Initialize the documentation repository generator.
-        
-        Args:
-            base_url: The starting URL to crawl
-            output_dir: Directory to save documentation
-            max_depth: Maximum depth of links to follow
-            delay: Delay between requests in seconds
-            download_images: Whether to download images
-            respect_robots_txt: Whether to respect robots.txt rules
-        """
-        self.base_url = base_url
-        self.output_dir = output_dir
-        self.max_depth = max_depth
-        self.delay = delay
-        self.should_download_images = download_images
-        self.respect_robots_txt = respect_robots_txt
-        
-        print(f"Initializing DocRepo with base URL: {base_url}")
-        print(f"Output directory: {output_dir}")
-        print(f"Max crawl depth: {max_depth}")
-        print(f"Download images: {download_images}")
-        print(f"Respect robots.txt: {respect_robots_txt}")
-        
-        # Initialize components
-        self.crawler = Crawler(base_url, max_depth, delay, self.respect_robots_txt)
-        self.file_handler = FileHandler(output_dir)
-        self.converter = None  # Will be initialized after crawling
-        
-        # URL to local file map (for link rewriting)
-        self.url_to_file_map: Dict[str, str] = {}
-        
-        # Image URL to local file map
-        self.image_map: Dict[str, str] = {}
-    
-    def extract_images_from_markdown(self, markdown: str, base_url: str) -> List[str]:
-        """
-        Extract image URLs from markdown content.
-        
-        Args:
-            markdown: Markdown content
-            base_url: Base URL for resolving relative image paths
-            
-        Returns:
-            List of image URLs
-        """
-        # Regular expression for markdown image syntax
-        image_pattern = r'!\[.*?\]\(([^)]+)\)'
-        image_urls = []
-        
-        for match in re.finditer(image_pattern, markdown):
-            image_url = match.group(1)
-            # Resolve relative URLs
-            absolute_url = urljoin(base_url, image_url)
-            image_urls.append(absolute_url)
-        
-        return image_urls
-    
-    def download_images(self, markdown: str, base_url: str) -> str:
-        """
-        Download images from markdown content and replace URLs.
-        
-        Args:
-            markdown: Markdown content
-            base_url: Base URL for resolving relative image paths
-            
-        Returns:
-            Markdown with updated image URLs
-        """
-        if not self.should_download_images:
-            return markdown
-        
-        image_urls = self.extract_images_from_markdown(markdown, base_url)
-        
-        # Regular expression for markdown image syntax
-        image_pattern = r'(!\[.*?\]\()([^)]+)(\))'
-        
-        def replace_image_url(match):
-            alt_text_part = match.group(1)
-            image_url = match.group(2)
-            closing_part = match.group(3)
-            
-            # Resolve relative URLs
-            absolute_url = urljoin(base_url, image_url)
-            
-            # Check if image already downloaded
-            if absolute_url in self.image_map:
-                local_path = self.image_map[absolute_url]
-            else:
-                # Download the image
-                try:
-                    local_path = self.file_handler.download_image(absolute_url)
-                    self.image_map[absolute_url] = local_path
-                except Exception as e:
-                    print(f"Error downloading image {absolute_url}: {e}")
-                    local_path = image_url  # Keep original URL if download fails
-            
-            return f"{alt_text_part}{local_path}{closing_part}"
-        
-        # Replace image URLs in markdown
-        return re.sub(image_pattern, replace_image_url, markdown)
-    
-    def run(self) -> None:
-        """Run the full documentation generation process."""
-        # Step 1: Crawl the website
-        print("Step 1: Crawling website...")
-        crawl_results = self.crawler.crawl()
-        
-        if not crawl_results:
-            print("Error: No content was crawled. Check the URL and try again.")
-            return
-        
-        print(f"Crawled {len(crawl_results)} pages.")
-        
-        # Step 2: Generate filenames and build URL to file mapping
-        print("Step 2: Generating filenames...")
-        for url in tqdm(crawl_results.keys()):
-            filename = self.file_handler.generate_unique_filename(url)
-            self.url_to_file_map[url] = filename
-        
-        # Step 3: Initialize converter with URL mapping
-        self.converter = MarkdownConverter(self.url_to_file_map)
-        
-        # Step 4: Convert HTML to Markdown and save files
-        print("Step 3: Converting to Markdown and saving files...")
-        for url, data in tqdm(crawl_results.items()):
-            html_content = data['content']
-            title = data['title']
-            
-            # Convert to markdown
-            markdown = self.converter.convert_html_to_markdown(html_content, url)
-            
-            # Download images and update markdown
-            if self.should_download_images:
-                markdown = self.download_images(markdown, url)
-            
-            # Add front matter
-            markdown_with_frontmatter = self.converter.add_front_matter(markdown, title, url)
-            
-            # Save to file
-            self.file_handler.save_markdown(url, markdown_with_frontmatter)
-        
-        # Step 5: Create index file
-        print("Step 4: Creating index file...")
-        url_title_map = {url: data['title'] for url, data in crawl_results.items()}
-        index_file = self.file_handler.create_index(url_title_map)
-        
-        print(f"Documentation repository created successfully in {self.output_dir}")
-        print(f"Open {self.output_dir}/{index_file} to view the documentation")
-
-
-def main():
-    parser = argparse.ArgumentParser(description='Generate a documentation repository from a website.')
-    parser.add_argument('url', help='The base URL to crawl')
-    parser.add_argument('-o', '--output', default='docrepo', help='Output directory (default: docrepo)')
-    parser.add_argument('-d', '--depth', type=int, default=3, help='Maximum depth to crawl (default: 3)')
-    parser.add_argument('--delay', type=float, default=0.5, help='Delay between requests in seconds (default: 0.5)')
-    parser.add_argument('--no-images', action='store_true', help='Do not download images')
-    parser.add_argument('--ignore-robots', action='store_true', help='Ignore robots.txt restrictions')
-    
-    args = parser.parse_args()
-    
-    # Validate URL
-    try:
-        result = urlparse(args.url)
-        if not all([result.scheme, result.netloc]):
-            print("Error: Invalid URL. Please provide a complete URL with scheme (e.g., http:// or https://).")
-            sys.exit(1)
-    except ValueError:
-        print("Error: Invalid URL format.")
-        sys.exit(1)
-    
-    try:
-        doc_repo = DocRepo(
-            base_url=args.url,
-            output_dir=args.output,
-            max_depth=args.depth,
-            delay=args.delay,
-            download_images=not args.no_images,
-            respect_robots_txt=not args.ignore_robots
-        )
-        doc_repo.run()
-    except KeyboardInterrupt:
-        print("\nOperation cancelled by user.")
-        sys.exit(1)
-    except Exception as e:
-        print(f"Error: {e}")
-        sys.exit(1)
-
-
-if __name__ == "__main__":
-    main() 
\ No newline at end of file
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+from tqdm import tqdm
+from urllib.parse import urlparse
+
+from async_crawler import AsyncCrawler
+from canonical import UrlCanonicalizer, parse_alias
+from content_extractor import ContentExtractor, parse_selectors
+from crawl_checkpoint import CrawlCheckpoint
+from crawl_state import CrawlStateStore
+from crawler import Crawler
+from distributed import CrawlQueue, ShardCrawler, SharedFilenameAllocator
+from markdown_backends import BACKENDS, DEFAULT_BACKEND
+from markdown_converter import ConversionPool, MarkdownConverter
+from file_handler import FileHandler
+from http_client import DEFAULT_MAX_PAGE_BYTES, create_async_session, create_session
+from metrics import NULL_METRICS, Metrics
+from image_downloader import AsyncImageDownloader, ImageDownloader
+from output_writer import archive_mode
+from url_registry import UrlMap, UrlRegistry
+
+
+def check_sharding(
+    shards: int, shard: Optional[int], incremental: bool, checkpoint: bool
+) -> None:
+    """
+    Reject option combinations a distributed crawl does not support.
+
+    Raises:
+        ValueError: If the options cannot be used together
+    """
+    if shards > 1 and (incremental or checkpoint):
+        raise ValueError(
+            "Incremental and checkpointed crawls cannot be sharded; "
+            "the shared queue already records progress"
+        )
+    if shard is not None and not 0 <= shard < shards:
+        raise ValueError(f"Shard must be between 0 and {shards - 1}")
+
+
+def check_write_errors(write_errors: List[Tuple[str, Exception]]) -> None:
+    """
+    Fail a run that finished with output files missing.
+
+    Raises:
+        RuntimeError: If any file could not be written
+    """
+    if write_errors:
+        filename, error = write_errors[0]
+        raise RuntimeError(
+            f"{len(write_errors)} files could not be written "
+            f"(first: {filename}: {error})"
+        )
+
+
+class DocRepo:
+    def __init__(
+        self,
+        base_url: str,
+        output_dir: str = "docrepo",
+        max_depth: int = 3,
+        delay: float = 0.5,
+        download_images: bool = True,
+        respect_robots_txt: bool = True,
+        concurrency: int = 1,
+        parser: str = None,
+        stream: bool = False,
+        incremental: bool = False,
+        timeout: float = None,
+        workers: int = 1,
+        image_workers: int = 4,
+        max_image_bytes: int = None,
+        image_types: List[str] = None,
+        checkpoint: bool = False,
+        resume: bool = False,
+        sitemap: bool = False,
+        metrics_file: str = None,
+        metrics_port: int = None,
+        max_page_bytes: Optional[int] = DEFAULT_MAX_PAGE_BYTES,
+        archive: str = None,
+        hash_filenames: bool = False,
+        shards: int = 1,
+        shard: Optional[int] = None,
+        shard_by: str = "url",
+        queue_path: str = None,
+        index_depth: int = 2,
+        index_json: bool = False,
+        url_aliases: Dict[str, str] = None,
+        dedupe: bool = True,
+        near_duplicates: Optional[int] = None,
+        markdown_backend: str = DEFAULT_BACKEND,
+        content_selectors: List[str] = None,
+        strip_boilerplate: bool = False,
+        boilerplate_sample: int = 20,
+        min_delay: Optional[float] = None,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+    ):
+        """
+        Initialize the documentation repository generator.
+
+        Args:
+            base_url: The starting URL to crawl
+            output_dir: Directory to save documentation
+            max_depth: Maximum depth of links to follow
+            delay: Delay between requests to the same host in seconds
+            download_images: Whether to download images
+            respect_robots_txt: Whether to respect robots.txt rules
+            concurrency: Number of pages fetched in parallel
+            parser: BeautifulSoup parser backend (defaults to lxml when installed)
+            stream: Convert and save each page as soon as it is fetched
+            incremental: Keep crawl state in the output directory and skip
+                pages that have not changed since the previous run
+            timeout: Read timeout for HTTP requests in seconds
+            workers: Number of processes converting HTML to Markdown
+            image_workers: Number of concurrent image downloads
+            max_image_bytes: Skip images larger than this many bytes
+            image_types: Only keep images whose Content-Type starts with one
+                of these prefixes (e.g. ["image/"])
+            checkpoint: Journal crawl progress to the output directory so an
+                interrupted run can be resumed
+            resume: Continue an interrupted run from its checkpoint (implies
+                checkpoint)
+            sitemap: Queue every page listed in the site's sitemaps up front
+                instead of discovering pages only through links
+            metrics_file: Write per-stage counters and latency histograms to
+                this JSON file at the end of the run
+            metrics_port: Serve the metrics in Prometheus text format on
+                http://127.0.0.1:<port>/metrics while the run is going
+            max_page_bytes: Skip pages larger than this many bytes (None for
+                no limit); non-HTML responses are always skipped
+            archive: Also pack the finished repository into this zip or tar
+                file (format chosen by suffix)
+            hash_filenames: Give URLs that may map to the same filename as
+                another URL a short stable hash of the URL instead of a
+                counter, so names do not depend on crawl order
+            shards: Split the crawl into this many shards sharing one queue
+                (see run_distributed); with shards > 1 and no ``shard``,
+                run() merges the output of the finished shards
+            shard: Crawl only this shard (0 to shards - 1) of a distributed
+                crawl
+            shard_by: Assign URLs to shards by hash of the whole 'url' or of
+                its 'host'
+            queue_path: SQLite file shared by the shards (default:
+                .docrepo_queue.sqlite in the output directory)
+            index_depth: Number of URL path levels that get their own index
+                file under index/; 0 for a single flat index.md
+            index_json: Also write a machine-readable index.json
+            url_aliases: Map of URL prefix to canonical prefix, e.g.
+                {"/latest/": "/v3/"}; prefixes starting with "/" apply to
+                the URL path
+            dedupe: Save pages served under several URLs (by redirect,
+                <link rel="canonical"> or identical HTML) once, and point
+                every URL at that one file
+            near_duplicates: Also deduplicate pages whose text SimHash
+                differs in at most this many bits (e.g. 3)
+            markdown_backend: How HTML is converted to Markdown: 'html2text',
+                or 'tree' to walk the parsed page directly (faster with lxml)
+            content_selectors: CSS selectors of the main content (e.g.
+                ["main", "div.document"]); the first one that matches a
+                page decides what of it is converted
+            strip_boilerplate: Remove blocks, such as sidebars, headers and
+                footers, that repeat across pages before converting
+            boilerplate_sample: Number of pages repeated blocks are learned
+                from; in streaming runs these pages are converted only once
+                all of them have arrived
+            min_delay: Shortest delay the crawl may speed up to while the
+                server answers quickly (default: ``delay``)
+            max_retries: Times a fetch that failed with a connection error,
+                timeout or 429/5xx status is retried
+            retry_backoff: Wait before the first retry in seconds, doubled
+                for every further attempt
+        """
+        self.base_url = base_url
+        self.output_dir = output_dir
+        self.max_depth = max_depth
+        self.delay = delay
+        self.min_delay = min_delay
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.should_download_images = download_images
+        self.respect_robots_txt = respect_robots_txt
+        self.concurrency = concurrency
+        self.parser = parser
+        self.stream = stream
+        self.incremental = incremental
+        self.timeout = timeout
+        self.workers = workers
+        self.resume = resume
+        self.sitemap = sitemap
+        self.metrics_file = metrics_file
+        self.max_page_bytes = max_page_bytes
+        self.archive = archive
+        self.shards = shards
+        self.shard = shard
+        self.canonicalizer = UrlCanonicalizer(url_aliases)
+        self.dedupe = dedupe
+        self.near_duplicates = near_duplicates
+        if markdown_backend not in BACKENDS:
+            raise ValueError(
+                f"Unknown Markdown backend: {markdown_backend} "
+                f"(use one of {', '.join(BACKENDS)})"
+            )
+        self.markdown_backend = markdown_backend
+        self.content_extractor = None
+        if content_selectors or strip_boilerplate:
+            self.content_extractor = ContentExtractor(
+                content_selectors,
+                auto=strip_boilerplate,
+                sample_pages=boilerplate_sample,
+            )
+        if archive:
+            # Fail before crawling rather than after
+            archive_mode(archive)
+        check_sharding(shards, shard, incremental, checkpoint)
+
+        print(f"Initializing DocRepo with base URL: {base_url}")
+        print(f"Output directory: {output_dir}")
+        print(f"Max crawl depth: {max_depth}")
+        print(
+            f"Request delay: {delay}s"
+            + (
+                f" (may speed up to {min_delay}s)"
+                if min_delay is not None and min_delay < delay
+                else ""
+            )
+        )
+        print(f"Retries: {max_retries}")
+        print(f"Download images: {download_images}")
+        print(f"Respect robots.txt: {respect_robots_txt}")
+        print(f"Concurrency: {concurrency}")
+        print(f"Streaming: {stream}")
+        print(f"Incremental: {incremental}")
+        print(f"Conversion workers: {workers}")
+        print(f"Markdown backend: {markdown_backend}")
+        if content_selectors:
+            print(f"Content selectors: {', '.join(content_selectors)}")
+        if strip_boilerplate:
+            print(
+                "Strip boilerplate: repeated blocks learned from "
+                f"{boilerplate_sample} pages"
+            )
+        print(f"Sitemap seeding: {sitemap}")
+        print(
+            f"Deduplication: {dedupe}"
+            + (
+                f" (near duplicates within {near_duplicates} bits)"
+                if dedupe and near_duplicates is not None
+                else ""
+            )
+        )
+        if shards > 1:
+            print(
+                f"Shards: {shards}"
+                + (f" (crawling shard {shard})" if shard is not None else "")
+            )
+
+        # Metrics cost nothing unless they are exported somewhere
+        self.metrics = Metrics() if metrics_file or metrics_port else NULL_METRICS
+        if metrics_port:
+            self.metrics.serve(metrics_port)
+
+        # Initialize components; page fetches and image downloads share one
+        # pooled keep-alive session
+        self.session = create_session(concurrency, timeout, self.metrics)
+        # Every component refers to URLs through one registry, so each URL
+        # string is stored once however many maps it appears in
+        self.registry = UrlRegistry()
+
+        # Queue shared with the other shards of a distributed crawl; shards
+        # also take their filenames from it so they never clash
+        self.queue = None
+        filenames = None
+        if shards > 1:
+            self.queue = CrawlQueue(
+                queue_path or os.path.join(output_dir, CrawlQueue.QUEUE_FILENAME),
+                shards,
+                shard_by,
+            )
+            if shard is not None:
+                filenames = SharedFilenameAllocator(self.queue, hash_filenames)
+        self.file_handler = FileHandler(
+            output_dir,
+            session=self.session,
+            registry=self.registry,
+            metrics=self.metrics,
+            hash_suffix=hash_filenames,
+            filenames=filenames,
+            index_depth=index_depth,
+            index_manifest=index_json,
+        )
+        self.image_options = {
+            "workers": image_workers,
+            "max_bytes": max_image_bytes,
+            "allowed_types": image_types,
+            "metrics": self.metrics,
+        }
+        self.image_downloader = None
+        if self.should_download_images:
+            self.image_downloader = ImageDownloader(
+                output_dir, session=self.session, **self.image_options
+            )
+
+        # Journal of crawl progress for resuming interrupted runs
+        self.checkpoint = None
+        if (checkpoint or resume) and self.queue is None:
+            self.checkpoint = CrawlCheckpoint(output_dir)
+            if resume and not self.checkpoint.exists():
+                print("No checkpoint found; starting a new crawl.")
+
+        # Crawl state from previous runs (incremental mode only)
+        self.state_store = None
+        if self.incremental:
+            self.state_store = CrawlStateStore(output_dir)
+            # Keep every known page on its previous filename
+            for url, filename in self.state_store.filenames().items():
+                self.file_handler.reserve_filename(url, filename)
+
+        if shard is not None:
+            self.crawler = self.create_crawler(
+                ShardCrawler, queue=self.queue, shard=shard
+            )
+        else:
+            self.crawler = self.create_crawler()
+        self.converter = None  # Will be initialized after crawling
+
+        # URL to local file map (for link rewriting)
+        self.url_to_file_map = UrlMap(self.registry)
+
+        # Image URL to local file map
+        self.image_map = UrlMap(self.registry)
+
+    def create_crawler(self, crawler_class: type = Crawler, **kwargs) -> Crawler:
+        """
+        Create a crawler wired to this run's session, registry, state and checkpoint.
+
+        Args:
+            crawler_class: Crawler or a subclass such as AsyncCrawler
+            **kwargs: Extra arguments for the crawler class
+
+        Returns:
+            The crawler
+        """
+        return crawler_class(
+            self.base_url,
+            self.max_depth,
+            self.delay,
+            self.respect_robots_txt,
+            concurrency=self.concurrency,
+            parser=self.parser,
+            state_store=self.state_store,
+            session=self.session,
+            checkpoint=self.checkpoint,
+            resume=self.resume,
+            registry=self.registry,
+            use_sitemaps=self.sitemap,
+            metrics=self.metrics,
+            max_page_bytes=self.max_page_bytes,
+            canonicalizer=self.canonicalizer,
+            dedupe=self.dedupe,
+            near_duplicates=self.near_duplicates,
+            min_delay=self.min_delay,
+            max_retries=self.max_retries,
+            retry_backoff=self.retry_backoff,
+            **kwargs,
+        )
+
+    def resolve_image(self, image_url: str) -> Optional[str]:
+        """
+        Return the local path of an image, queueing it for download if needed.
+
+        Downloads run in the background, so an image seen for the first time
+        has no local path yet; pages referencing it are fixed up once the
+        downloads have finished.
+
+        Args:
+            image_url: Absolute URL of the image
+
+        Returns:
+            Path relative to the output directory, or None if not stored yet
+        """
+        local_path = self.image_map.get(image_url)
+        if local_path is None:
+            local_path = self.image_downloader.lookup(image_url)
+            if local_path is None:
+                self.image_downloader.submit(image_url)
+                return None
+            self.image_map[image_url] = local_path
+        return local_path
+
+    def create_converter(self) -> MarkdownConverter:
+        """
+        Create a converter that rewrites links via url_to_file_map and images via
+        resolve_image.
+        """
+        image_handler = self.resolve_image if self.should_download_images else None
+        return MarkdownConverter(
+            self.url_to_file_map,
+            image_handler=image_handler,
+            metrics=self.metrics,
+            canonicalize=self.canonicalizer.canonicalize,
+            backend=self.markdown_backend,
+            content_extractor=self.content_extractor,
+        )
+
+    def learn_boilerplate(self, pages: Iterable[Dict]) -> None:
+        """
+        Learn repeated blocks from crawled pages until the extractor has enough.
+
+        Args:
+            pages: Crawl results, in crawl order
+        """
+        extractor = self.content_extractor
+        if extractor is None or extractor.ready:
+            return
+        with self.metrics.time("stage_seconds", stage="learn_boilerplate"):
+            for data in pages:
+                if data["document"] is not None:
+                    extractor.learn(data["document"])
+                    if extractor.ready:
+                        break
+
+    def assign_filename(self, url: str, data: Dict) -> Optional[str]:
+        """
+        Map a page, and every alias URL it stands for, to its output file.
+
+        A duplicate page gets the file of the page it repeats.
+
+        Args:
+            url: The page URL
+            data: Crawl result for the page
+
+        Returns:
+            The filename, or None for a duplicate whose original has no file
+        """
+        if data["duplicate_of"] is not None:
+            filename = self.url_to_file_map.get(data["duplicate_of"])
+        else:
+            filename = self.file_handler.generate_unique_filename(url)
+        if filename is not None:
+            self.url_to_file_map[url] = filename
+            for alias in data["aliases"]:
+                self.url_to_file_map[alias] = filename
+        return filename
+
+    def convert_page(
+        self,
+        url: str,
+        data: Dict,
+        unresolved: Set[str] = None,
+        markdown: str = None,
+        pending_images: Set[str] = None,
+    ) -> None:
+        """
+        Convert a crawled page to Markdown and save it.
+
+        Unchanged pages from an incremental run are left as they are on
+        disk, and duplicates are not saved at all.
+
+        Args:
+            url: The page URL
+            data: Crawl result for the page (content, document and title)
+            unresolved: Optional set that collects same-site links which could
+                not be rewritten yet
+            markdown: The page's Markdown if it was already converted
+                elsewhere (e.g. by a ConversionPool)
+            pending_images: Optional set that collects image URLs that were
+                still downloading when the page was saved
+        """
+        if data["duplicate_of"] is not None:
+            return
+        if data["unchanged"]:
+            self.record_state(url, data)
+            return
+
+        title = data["title"]
+
+        # Convert to markdown, reusing the tree if one was parsed during the
+        # crawl; links and images are rewritten in the same pass
+        if markdown is None:
+            if not self.should_download_images:
+                pending_images = None
+            markdown = self.converter.convert_html_to_markdown(
+                data["document"], url, unresolved, pending_images
+            )
+            # Crawl results stay in memory until the run ends; their trees need not
+            data["document"].discard_soup()
+
+        # Add front matter
+        markdown_with_frontmatter = self.converter.add_front_matter(
+            markdown, title, url
+        )
+
+        # Save to file
+        self.file_handler.save_markdown(url, markdown_with_frontmatter)
+        self.record_state(url, data)
+
+    def record_state(self, url: str, data: Dict) -> None:
+        """Remember a page whose output file is now up to date (incremental mode)."""
+        if self.state_store is None:
+            return
+        self.state_store.record(
+            url,
+            data["etag"],
+            data["last_modified"],
+            data["content_hash"],
+            data["title"],
+            data["links"],
+            self.url_to_file_map[url],
+        )
+
+    def fix_up_pages(
+        self, pending_links: Dict[str, Set[str]], pending_images: Dict[str, Set[str]]
+    ) -> int:
+        """
+        Rewrite saved pages whose links or images could not be resolved yet.
+
+        Waits for outstanding image downloads first, then rewrites links to
+        pages that were crawled after the linking page was saved and image
+        URLs that now have a local copy.
+
+        Args:
+            pending_links: Map of page URL to the links it could not resolve
+            pending_images: Map of page URL to images that were downloading
+
+        Returns:
+            Number of files rewritten
+        """
+        with self.metrics.time("stage_seconds", stage="images"):
+            if self.image_downloader is not None:
+                self.image_map.update(self.image_downloader.wait())
+
+        rewritten = 0
+        for url in tqdm(set(pending_links) | set(pending_images)):
+            resolvable = {
+                link
+                for link in pending_links.get(url, ())
+                if link in self.url_to_file_map
+            }
+            images = {
+                image
+                for image in pending_images.get(url, ())
+                if image in self.image_map
+            }
+            if not resolvable and not images:
+                continue
+
+            markdown = self.file_handler.read_markdown(url)
+            markdown = self.converter.rewrite_links(
+                markdown, url, only=resolvable | images
+            )
+            self.file_handler.save_markdown(url, markdown)
+            rewritten += 1
+
+        return rewritten
+
+    def run(self) -> None:
+        """Run the full documentation generation process."""
+        try:
+            if self.shard is not None:
+                self.run_shard()
+            elif self.queue is not None:
+                self.merge_shards()
+            elif self.stream:
+                self.run_streaming()
+            else:
+                self.run_batch()
+            # The run completed, so there is nothing left to resume
+            if self.checkpoint is not None:
+                self.checkpoint.remove()
+        finally:
+            write_errors = self.close()
+        check_write_errors(write_errors)
+
+    def close(self) -> List[Tuple[str, Exception]]:
+        """
+        Finish writing files and release the checkpoint, image downloads and crawl
+        state.
+
+        Files that could not be written are reported, and their pages are
+        dropped from the crawl state so the next incremental run redoes them.
+
+        Returns:
+            (filename, exception) for every file that could not be written
+        """
+        write_errors = self.file_handler.close()
+        if write_errors:
+            print(f"Error: {len(write_errors)} files could not be written:")
+            for filename, error in write_errors:
+                print(f"  {filename}: {error}")
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+        if self.image_downloader is not None:
+            self.image_downloader.close()
+        if self.state_store is not None:
+            for filename, _ in write_errors:
+                self.state_store.forget(filename)
+            self.state_store.commit()
+        if self.queue is not None:
+            self.queue.close()
+        self.metrics.close()
+        if self.metrics_file:
+            self.metrics.write_json(self.metrics_file)
+            print(f"Metrics written to {self.metrics_file}")
+        return write_errors
+
+    def run_batch(self) -> None:
+        """Run the generation process, converting pages after the whole crawl."""
+        # Step 1: Crawl the website
+        print("Step 1: Crawling website...")
+        with self.metrics.time("stage_seconds", stage="crawl"):
+            crawl_results = self.crawler.crawl()
+
+        if not crawl_results:
+            print("Error: No content was crawled. Check the URL and try again.")
+            return
+
+        print(f"Crawled {len(crawl_results)} pages.")
+        if self.incremental:
+            unchanged = sum(1 for data in crawl_results.values() if data["unchanged"])
+            print(f"{unchanged} pages unchanged since the last run.")
+        duplicates = sum(
+            1 for data in crawl_results.values() if data["duplicate_of"] is not None
+        )
+        if duplicates:
+            print(f"{duplicates} duplicate pages share the file of their original.")
+
+        # Step 2: Generate filenames and build URL to file mapping
+        print("Step 2: Generating filenames...")
+        for url, data in tqdm(crawl_results.items()):
+            self.assign_filename(url, data)
+
+        # Step 3: Initialize converter with URL mapping, once repeated
+        # blocks are known
+        self.learn_boilerplate(crawl_results.values())
+        self.converter = self.create_converter()
+
+        # Step 4: Convert HTML to Markdown and save files
+        print("Step 3: Converting to Markdown and saving files...")
+        pending_images: Dict[str, Set[str]] = {}
+        convert_start = time.perf_counter()
+        if self.workers > 1:
+            # Pages are converted in parallel but saved here, in crawl order
+            with ConversionPool(
+                self.url_to_file_map,
+                self.workers,
+                canonicalize=self.canonicalizer.canonicalize,
+                backend=self.markdown_backend,
+                content_extractor=self.content_extractor,
+            ) as pool:
+                converted = pool.convert(
+                    (url, data["content"])
+                    for url, data in crawl_results.items()
+                    if data["content"] is not None
+                )
+                for url, data in tqdm(crawl_results.items()):
+                    if data["content"] is None:
+                        self.convert_page(url, data)
+                        continue
+                    markdown, images = next(converted)
+                    self.convert_page(url, data, markdown=markdown)
+                    # Workers leave images alone; queue them and fix up later
+                    if images and self.should_download_images:
+                        for image_url in images:
+                            self.resolve_image(image_url)
+                        pending_images[url] = images
+        else:
+            for url, data in tqdm(crawl_results.items()):
+                images = set()
+                self.convert_page(url, data, pending_images=images)
+                if images:
+                    pending_images[url] = images
+        self.metrics.observe(
+            "stage_seconds", time.perf_counter() - convert_start, stage="convert"
+        )
+
+        # Step 5: Point pages at images downloaded in the background
+        if pending_images:
+            print("Step 4: Waiting for images and updating pages...")
+            self.fix_up_pages({}, pending_images)
+
+        # Step 6: Create index file
+        print("Step 5: Creating index file...")
+        url_title_map = {
+            url: data["title"]
+            for url, data in crawl_results.items()
+            if data["duplicate_of"] is None
+        }
+        with self.metrics.time("stage_seconds", stage="index"):
+            index_file = self.file_handler.create_index(url_title_map)
+        self.write_archive()
+
+        print(f"Documentation repository created successfully in {self.output_dir}")
+        print(f"Open {self.output_dir}/{index_file} to view the documentation")
+
+    def run_streaming(self) -> None:
+        """
+        Run the generation process, writing each page as soon as it is fetched.
+
+        Only the pages in flight are held in memory. Links to pages that had
+        not been crawled when a page was written are fixed up in a final pass.
+        """
+        if self.workers > 1:
+            print("Note: conversion workers are not used in streaming mode.")
+
+        # The converter shares url_to_file_map, so it sees pages as they arrive
+        self.converter = self.create_converter()
+        progress = StreamProgress()
+
+        print("Step 1: Crawling, converting and saving pages...")
+        for url, data in tqdm(self.crawler.iter_crawl()):
+            self.save_streamed_page(url, data, progress)
+
+        self.finish_streaming(progress)
+
+    def save_streamed_page(
+        self, url: str, data: Dict, progress: "StreamProgress"
+    ) -> None:
+        """
+        Name, convert and save one page of a streaming run.
+
+        Args:
+            url: The page URL
+            data: Crawl result for the page
+            progress: Bookkeeping of the run, updated in place
+        """
+        self.assign_filename(url, data)
+        if data["duplicate_of"] is not None:
+            progress.duplicates += 1
+            return
+        progress.url_title_map[url] = data["title"]
+        progress.unchanged += data["unchanged"]
+
+        extractor = self.content_extractor
+        if (
+            extractor is not None
+            and not extractor.ready
+            and data["document"] is not None
+        ):
+            # Hold pages back until repeated blocks are learned from enough of them
+            extractor.learn(data["document"])
+            progress.held.append((url, data))
+            if extractor.ready:
+                self.convert_held_pages(progress)
+            return
+        self.convert_streamed_page(url, data, progress)
+
+    def convert_streamed_page(
+        self, url: str, data: Dict, progress: "StreamProgress"
+    ) -> None:
+        """Convert and save one page of a streaming run, noting what needs fixing up."""
+        unresolved: Set[str] = set()
+        images: Set[str] = set()
+        self.convert_page(url, data, unresolved, pending_images=images)
+        if unresolved:
+            progress.pending_links[url] = unresolved
+        if images:
+            progress.pending_images[url] = images
+
+    def convert_held_pages(self, progress: "StreamProgress") -> None:
+        """
+        Convert the pages of a streaming run held back while repeated blocks were
+        learned.
+        """
+        held, progress.held = progress.held, []
+        for url, data in held:
+            self.convert_streamed_page(url, data, progress)
+
+    def finish_streaming(self, progress: "StreamProgress") -> Optional[str]:
+        """
+        Fix up links and images of a streaming run and write the index.
+
+        Args:
+            progress: Bookkeeping of the run
+
+        Returns:
+            The index filename, or None if nothing was crawled
+        """
+        # The site had fewer pages than the boilerplate sample
+        self.convert_held_pages(progress)
+        if not progress.url_title_map:
+            print("Error: No content was crawled. Check the URL and try again.")
+            return None
+
+        print(f"Crawled {len(progress.url_title_map)} pages.")
+        if self.incremental:
+            print(f"{progress.unchanged} pages unchanged since the last run.")
+        if progress.duplicates:
+            print(
+                f"{progress.duplicates} duplicate pages share the file of their "
+                "original."
+            )
+
+        # Step 2: Rewrite links to pages discovered after the linking page was
+        # saved, and images downloaded in the background
+        print("Step 2: Fixing up links and images...")
+        rewritten = self.fix_up_pages(progress.pending_links, progress.pending_images)
+        print(f"Updated {rewritten} files.")
+
+        # Step 3: Create index file
+        print("Step 3: Creating index file...")
+        with self.metrics.time("stage_seconds", stage="index"):
+            index_file = self.file_handler.create_index(progress.url_title_map)
+        self.write_archive()
+
+        print(f"Documentation repository created successfully in {self.output_dir}")
+        print(f"Open {self.output_dir}/{index_file} to view the documentation")
+        return index_file
+
+    def run_shard(self) -> None:
+        """
+        Crawl, convert and save the pages of one shard of a distributed crawl.
+
+        Links between this shard's own pages and downloaded images are fixed
+        up at the end. Whatever a page still cannot resolve (mostly links to
+        pages of other shards) is recorded in the shared queue as soon as
+        the page is saved, and rewritten by merge_shards() once every shard
+        has finished.
+        """
+        requeued = self.queue.requeue_unfinished(self.shard, self.output_dir)
+        if requeued:
+            print(
+                f"Put back {requeued} URLs left unfinished by an earlier run of shard "
+                f"{self.shard}."
+            )
+        self.converter = self.create_converter()
+        progress = StreamProgress()
+
+        print(f"Step 1: Crawling, converting and saving pages of shard {self.shard}...")
+        for url, data in tqdm(self.crawler.iter_crawl()):
+            self.save_streamed_page(url, data, progress)
+            if url in progress.pending_links or url in progress.pending_images:
+                self.queue.record_pending(
+                    {
+                        url: (
+                            progress.pending_links.get(url, ()),
+                            progress.pending_images.get(url, ()),
+                        )
+                    }
+                )
+
+        self.convert_held_pages(progress)
+        print("Step 2: Fixing up links and images...")
+        rewritten = self.fix_up_pages(progress.pending_links, progress.pending_images)
+        print(f"Updated {rewritten} files.")
+
+        # Leave the merge only what this shard could not resolve itself
+        leftovers = {}
+        for url in set(progress.pending_links) | set(progress.pending_images):
+            links = {
+                link
+                for link in progress.pending_links.get(url, ())
+                if link not in self.url_to_file_map
+            }
+            images = {
+                image
+                for image in progress.pending_images.get(url, ())
+                if image not in self.image_map
+            }
+            leftovers[url] = (links, images)
+        self.queue.record_pending(leftovers)
+        left = sum(1 for links, images in leftovers.values() if links or images)
+        print(
+            f"Shard {self.shard} saved {len(progress.url_title_map)} pages; "
+            f"{left} have links left for the merge."
+        )
+
+    def merge_shards(self) -> Optional[str]:
+        """
+        Combine the output of the shards of a finished distributed crawl.
+
+        Builds the global link map from the filenames handed out by the
+        shared queue, rewrites the links and images the shards left
+        unresolved and writes the index.
+
+        Returns:
+            The index filename, or None if nothing was crawled
+        """
+        print("Merging shards...")
+        for url, filename in self.queue.filenames().items():
+            self.file_handler.reserve_filename(url, filename)
+            self.url_to_file_map[url] = filename
+        # Duplicates and aliases share the file of the page they stand for
+        for url, original in self.queue.aliases().items():
+            filename = self.url_to_file_map.get(original)
+            if filename is not None:
+                self.url_to_file_map[url] = filename
+
+        self.converter = self.create_converter()
+        progress = StreamProgress()
+        progress.url_title_map = self.queue.titles()
+        progress.pending_links, pending_images = self.queue.pending()
+        if self.should_download_images:
+            # Images a shard did not get to are downloaded now
+            for images in pending_images.values():
+                for image_url in images:
+                    self.resolve_image(image_url)
+            progress.pending_images = pending_images
+        return self.finish_streaming(progress)
+
+    def write_archive(self) -> None:
+        """Pack the output directory into the requested archive, if any."""
+        if not self.archive:
+            return
+        with self.metrics.time("stage_seconds", stage="archive"):
+            count = self.file_handler.create_archive(self.archive)
+        print(f"Archived {count} files to {self.archive}")
+
+    async def arun(self) -> None:
+        """Run the streaming generation process on the running event loop."""
+        async for _ in self.aiter_events():
+            pass
+
+    async def aiter_events(self) -> AsyncIterator[Dict]:
+        """
+        Run the streaming generation process, yielding progress events.
+
+        Pages are fetched (and images downloaded) with aiohttp when it is
+        installed, otherwise on the loop's default executor. Conversion,
+        link rewriting and the final fix-up and index run on the default
+        executor too, so the event loop stays free for other work; the
+        crawl waits while a page is saved, as in the synchronous run.
+
+        Yields:
+            ``{'event': 'page', 'url', 'title', 'filename', 'unchanged',
+            'duplicate_of', 'pages', 'queued'}`` for every saved page, then
+            ``{'event': 'done', 'pages', 'unchanged', 'index'}``
+        """
+        client_session = create_async_session(
+            self.concurrency, self.timeout, self.metrics
+        )
+        if client_session is None:
+            print("Note: aiohttp is not installed; fetching on worker threads.")
+        self.crawler = self.create_crawler(AsyncCrawler, client_session=client_session)
+        if self.image_downloader is not None and client_session is not None:
+            self.image_downloader.close()
+            self.image_downloader = AsyncImageDownloader(
+                self.output_dir,
+                client_session,
+                session=self.session,
+                **self.image_options,
+            )
+
+        loop = asyncio.get_running_loop()
+        try:
+            self.converter = self.create_converter()
+            progress = StreamProgress()
+
+            print("Step 1: Crawling, converting and saving pages...")
+            async for url, data in self.crawler.aiter_crawl():
+                await loop.run_in_executor(
+                    None, self.save_streamed_page, url, data, progress
+                )
+                yield {
+                    "event": "page",
+                    "url": url,
+                    "title": data["title"],
+                    "filename": self.url_to_file_map.get(url),
+                    "unchanged": data["unchanged"],
+                    "duplicate_of": data["duplicate_of"],
+                    "pages": len(progress.url_title_map),
+                    "queued": len(self.crawler.frontier),
+                }
+
+            # The site had fewer pages than the boilerplate sample; their
+            # images are queued before the downloads are awaited
+            await loop.run_in_executor(None, self.convert_held_pages, progress)
+            if self.image_downloader is not None:
+                self.image_map.update(await self.image_downloader.await_all())
+            index_file = await loop.run_in_executor(
+                None, self.finish_streaming, progress
+            )
+            # The run completed, so there is nothing left to resume
+            if self.checkpoint is not None:
+                self.checkpoint.remove()
+            yield {
+                "event": "done",
+                "pages": len(progress.url_title_map),
+                "unchanged": progress.unchanged,
+                "index": index_file,
+            }
+        finally:
+            write_errors = self.close()
+            if client_session is not None:
+                await client_session.close()
+        check_write_errors(write_errors)
+
+
+class StreamProgress:
+    def __init__(self):
+        """Pages saved so far in a streaming run and what still needs fixing up."""
+        self.url_title_map: Dict[str, str] = {}
+        self.pending_links: Dict[str, Set[str]] = {}
+        self.pending_images: Dict[str, Set[str]] = {}
+        self.unchanged = 0
+        self.duplicates = 0
+        # Pages waiting for the boilerplate sample to be complete
+        self.held: List[Tuple[str, Dict]] = []
+
+
+def run_shard_process(options: Dict, shard: int) -> None:
+    """
+    Worker process entry point: crawl one shard of a distributed crawl.
+
+    Each shard exports its metrics separately: to the metrics file with a
+    ``.shard<N>`` suffix, and on the metrics port plus 1 + N.
+
+    Args:
+        options: DocRepo arguments of the distributed crawl
+        shard: The shard to crawl
+    """
+    options = dict(options, shard=shard, archive=None)
+    if options.get("metrics_file"):
+        root, ext = os.path.splitext(options["metrics_file"])
+        options["metrics_file"] = f"{root}.shard{shard}{ext}"
+    if options.get("metrics_port"):
+        options["metrics_port"] += 1 + shard
+    DocRepo(**options).run()
+
+
+def run_distributed(options: Dict) -> None:
+    """
+    Run a distributed crawl on this machine: one worker process per shard,
+    then the merge.
+
+    The shared queue starts empty unless ``resume`` is set, in which case an
+    interrupted crawl continues where its shards stopped. Workers on other
+    machines can join by running DocRepo(shard=N) against the same queue
+    and output directory.
+
+    Args:
+        options: DocRepo arguments, including ``shards``
+
+    Raises:
+        RuntimeError: If a shard's worker process fails
+    """
+    shards = options["shards"]
+    check_sharding(
+        shards,
+        None,
+        options.get("incremental", False),
+        options.get("checkpoint", False),
+    )
+    output_dir = options.get("output_dir", "docrepo")
+    queue_path = options.get("queue_path") or os.path.join(
+        output_dir, CrawlQueue.QUEUE_FILENAME
+    )
+
+    # Seed the queue before any worker starts, so none of them finds it
+    # empty and stops straight away
+    queue = CrawlQueue(
+        queue_path,
+        shards,
+        options.get("shard_by", "url"),
+        reset=not options.get("resume"),
+    )
+    canonicalizer = UrlCanonicalizer(options.get("url_aliases"))
+    queue.add([(canonicalizer.canonicalize(options["base_url"]), 0)])
+    queue.close()
+
+    print(f"Starting {shards} shard workers...")
+    processes = [
+        multiprocessing.Process(
+            target=run_shard_process,
+            args=(options, shard),
+            name=f"docrepo-shard-{shard}",
+        )
+        for shard in range(shards)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    failed = [shard for shard, process in enumerate(processes) if process.exitcode != 0]
+    if failed:
+        raise RuntimeError(
+            f"Shards {failed} did not finish; run again with --resume to continue"
+        )
+
+    DocRepo(**options).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a documentation repository from a website."
+    )
+    parser.add_argument("url", help="The base URL to crawl")
+    parser.add_argument(
+        "-o", "--output", default="docrepo", help="Output directory (default: docrepo)"
+    )
+    parser.add_argument(
+        "-d", "--depth", type=int, default=3, help="Maximum depth to crawl (default: 3)"
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=0.5,
+        help="Delay between requests in seconds; grows while the server is slow or "
+        "failing (default: 0.5)",
+    )
+    parser.add_argument(
+        "--min-delay",
+        type=float,
+        default=None,
+        help="Shortest delay to speed up to while the server answers quickly "
+        "(default: --delay)",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=3,
+        help="Retries of pages that failed with a connection error, timeout or "
+        "429/5xx (default: 3)",
+    )
+    parser.add_argument(
+        "--retry-backoff",
+        type=float,
+        default=1.0,
+        help="Seconds before the first retry, doubled for each further one "
+        "(default: 1.0)",
+    )
+    parser.add_argument(
+        "--no-images", action="store_true", help="Do not download images"
+    )
+    parser.add_argument(
+        "--ignore-robots", action="store_true", help="Ignore robots.txt restrictions"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of pages to fetch in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=["html.parser", "lxml", "html5lib"],
+        default=None,
+        help="HTML parser backend (default: lxml if installed, else html.parser)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Convert and save pages as they are fetched instead of after the crawl",
+    )
+    parser.add_argument(
+        "--markdown-backend",
+        choices=list(BACKENDS),
+        default=DEFAULT_BACKEND,
+        help="HTML to Markdown converter: html2text, or tree to walk the parsed page "
+        "(faster with lxml installed) (default: html2text)",
+    )
+    parser.add_argument(
+        "--content-selector",
+        action="append",
+        default=[],
+        metavar="CSS",
+        help='CSS selector of the main content, e.g. "main" or "div.document"; '
+        "comma-separated or repeated, the first that matches a page is used",
+    )
+    parser.add_argument(
+        "--strip-boilerplate",
+        action="store_true",
+        help="Remove blocks (sidebars, headers, footers) that repeat across pages "
+        "before converting",
+    )
+    parser.add_argument(
+        "--boilerplate-sample",
+        type=int,
+        default=20,
+        metavar="N",
+        help="Number of pages repeated blocks are learned from (default: 20)",
+    )
+    parser.add_argument(
+        "--max-page-bytes",
+        type=int,
+        default=DEFAULT_MAX_PAGE_BYTES,
+        help="Skip pages larger than this many bytes; 0 for no limit (default: 10 MiB)",
+    )
+    parser.add_argument(
+        "--image-workers",
+        type=int,
+        default=4,
+        help="Number of concurrent image downloads (default: 4)",
+    )
+    parser.add_argument(
+        "--max-image-bytes",
+        type=int,
+        default=None,
+        help="Skip images larger than this many bytes",
+    )
+    parser.add_argument(
+        "--image-types",
+        default=None,
+        help="Comma-separated Content-Type prefixes of images to keep "
+        "(e.g. image/png,image/svg)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help="Journal crawl progress so an interrupted run can be resumed with "
+        "--resume",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from its checkpoint in the output directory",
+    )
+    parser.add_argument(
+        "--sitemap",
+        action="store_true",
+        help="Queue all pages listed in the site's sitemap.xml (found via robots.txt) "
+        "up front",
+    )
+    parser.add_argument(
+        "--metrics",
+        default=None,
+        metavar="FILE",
+        help="Write per-stage counters and latency histograms to FILE as JSON at the "
+        "end of the run",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        metavar="PORT",
+        help="Serve metrics in Prometheus text format on "
+        "http://127.0.0.1:PORT/metrics during the run",
+    )
+    parser.add_argument(
+        "--hash-filenames",
+        action="store_true",
+        help="Name pages whose URL may share a filename with another page by a "
+        "stable hash of the URL instead of a counter, independent of crawl order",
+    )
+    parser.add_argument(
+        "--index-depth",
+        type=int,
+        default=2,
+        help="URL path levels that get their own index file under index/; 0 for one "
+        "flat index.md (default: 2)",
+    )
+    parser.add_argument(
+        "--index-json",
+        action="store_true",
+        help="Also write index.json listing every page and index section",
+    )
+    parser.add_argument(
+        "--alias",
+        action="append",
+        default=[],
+        metavar="FROM=TO",
+        help="Treat URLs starting with FROM as starting with TO, e.g. /latest/=/v3/ "
+        "(repeatable)",
+    )
+    parser.add_argument(
+        "--no-dedupe",
+        action="store_true",
+        help="Save every URL separately, even redirects, canonical aliases and "
+        "identical pages",
+    )
+    parser.add_argument(
+        "--near-duplicates",
+        type=int,
+        default=None,
+        metavar="BITS",
+        help="Also treat pages whose text SimHash differs in at most BITS bits as "
+        "duplicates (e.g. 3)",
+    )
+    parser.add_argument(
+        "--archive",
+        default=None,
+        metavar="PATH",
+        help="Also pack the finished repository into PATH (.zip, .tar, .tar.gz, "
+        ".tar.bz2 or .tar.xz)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Read timeout for HTTP requests in seconds (default: 30)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes converting HTML to Markdown (default: 1)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only regenerate pages that changed since the previous run into the same "
+        "output directory",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Split the crawl into N shards, each crawled by its own worker process "
+        "(default: 1)",
+    )
+    parser.add_argument(
+        "--shard",
+        type=int,
+        default=None,
+        help="Only run the worker for this shard, e.g. on one of several machines "
+        "sharing --queue",
+    )
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="Only merge the output of finished shards (fix up cross-shard links, "
+        "write the index)",
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=["url", "host"],
+        default="url",
+        help="Assign URLs to shards by hash of the whole URL or of its host "
+        "(default: url)",
+    )
+    parser.add_argument(
+        "--queue",
+        default=None,
+        metavar="PATH",
+        help="SQLite queue shared by the shards (default: .docrepo_queue.sqlite in "
+        "the output directory)",
+    )
+
+    args = parser.parse_args()
+
+    # Validate URL
+    try:
+        result = urlparse(args.url)
+        if not all([result.scheme, result.netloc]):
+            print(
+                "Error: Invalid URL. Please provide a complete URL with scheme "
+                "(e.g., http:// or https://)."
+            )
+            sys.exit(1)
+    except ValueError:
+        print("Error: Invalid URL format.")
+        sys.exit(1)
+
+    try:
+        options = dict(
+            base_url=args.url,
+            output_dir=args.output,
+            max_depth=args.depth,
+            delay=args.delay,
+            min_delay=args.min_delay,
+            max_retries=args.max_retries,
+            retry_backoff=args.retry_backoff,
+            download_images=not args.no_images,
+            respect_robots_txt=not args.ignore_robots,
+            concurrency=args.concurrency,
+            parser=args.parser,
+            stream=args.stream,
+            incremental=args.incremental,
+            timeout=args.timeout,
+            workers=args.workers,
+            image_workers=args.image_workers,
+            max_image_bytes=args.max_image_bytes,
+            image_types=args.image_types.split(",") if args.image_types else None,
+            checkpoint=args.checkpoint,
+            resume=args.resume,
+            sitemap=args.sitemap,
+            metrics_file=args.metrics,
+            metrics_port=args.metrics_port,
+            max_page_bytes=args.max_page_bytes or None,
+            archive=args.archive,
+            hash_filenames=args.hash_filenames,
+            shards=args.shards,
+            shard_by=args.shard_by,
+            queue_path=args.queue,
+            index_depth=args.index_depth,
+            index_json=args.index_json,
+            url_aliases=dict(parse_alias(alias) for alias in args.alias),
+            dedupe=not args.no_dedupe,
+            near_duplicates=args.near_duplicates,
+            markdown_backend=args.markdown_backend,
+            content_selectors=[
+                selector
+                for value in args.content_selector
+                for selector in parse_selectors(value)
+            ],
+            strip_boilerplate=args.strip_boilerplate,
+            boilerplate_sample=args.boilerplate_sample,
+        )
+        if args.shards > 1 and args.shard is None and not args.merge:
+            run_distributed(options)
+        else:
+            DocRepo(**options, shard=args.shard).run()
+    except KeyboardInterrupt:
+        print("\nOperation cancelled by user.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,201 +1,382 @@
-import os
-import re
-import unicodedata
-import requests
-from urllib.parse import urlparse
-from typing import Dict, List, Set
-
-
-class FileHandler:
-    def __init__(self, output_dir: str = "docrepo"):
-        """
-        Initialize the file handler.
-        
-        Args:
-            output_dir: Directory where the Markdown files will be saved
-        """
-        self.output_dir = output_dir
-        self.ensure_directory(self.output_dir)
-        
-        # For tracking created files and avoiding duplicates
-        self.created_files: Set[str] = set()
-        self.url_to_file_map: Dict[str, str] = {}
-    
-    def ensure_directory(self, directory: str) -> None:
-        """Create directory if it doesn't exist."""
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-    
-    def sanitize_filename(self, url: str) -> str:
-        """
-        Convert a URL into a valid filename.
-        
-        Args:
-            url: The URL to convert
-            
-        Returns:
-            A sanitized filename
-        """
-        # Parse the URL
-        parsed_url = urlparse(url)
-        
-        # Start with the hostname
-        filename = parsed_url.netloc
-        
-        # Add the path, but remove trailing slashes
-        path = parsed_url.path.rstrip('/')
-        if path:
-            # Replace slashes with underscores
-            path = path.replace('/', '_')
-            filename += path
-        
-        # If the URL has no path, add an underscore to avoid filename collision
-        if not path and not parsed_url.query:
-            filename += '_index'
-        
-        # Add query parameters if present
-        if parsed_url.query:
-            filename += '_' + parsed_url.query.replace('&', '_').replace('=', '-')
-        
-        # Remove invalid filename characters
-        filename = re.sub(r'[^\w\-\.]', '_', filename)
-        
-        # Normalize unicode characters
-        filename = unicodedata.normalize('NFKD', filename).encode('ASCII', 'ignore').decode('ASCII')
-        
-        # Ensure filename isn't too long
-        if len(filename) > 200:
-            # Keep the first 100 and last 95 characters
-            filename = filename[:100] + '_' + filename[-95:]
-        
-        # Add markdown extension
-        if not filename.endswith('.md'):
-            filename += '.md'
-        
-        return filename
-    
-    def generate_unique_filename(self, url: str) -> str:
-        """
-        Generate a unique filename based on the URL.
-        
-        Args:
-            url: The URL to convert to a filename
-            
-        Returns:
-            A unique filename for the URL
-        """
-        base_filename = self.sanitize_filename(url)
-        filename = base_filename
-        counter = 1
-        
-        # If the filename already exists, append a counter
-        while filename in self.created_files:
-            # Split the name and extension
-            name, ext = os.path.splitext(base_filename)
-            filename = f"{name}_{counter}{ext}"
-            counter += 1
-        
-        self.created_files.add(filename)
-        self.url_to_file_map[url] = filename
-        return filename
-    
-    def save_markdown(self, url: str, markdown_content: str) -> str:
-        """
-        Save markdown content to a file.
-        
-        Args:
-            url: Original URL
-            markdown_content: Markdown content to save
-            
-        Returns:
-            Path to the saved file
-        """
-        filename = self.generate_unique_filename(url)
-        filepath = os.path.join(self.output_dir, filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
-        
-        return filename
-    
-    def download_image(self, image_url: str, dirname: str = "images") -> str:
-        """
-        Download an image and save it locally.
-        
-        Args:
-            image_url: URL of the image
-            dirname: Directory to save images
-            
-        Returns:
-            Local path to the image
-        """
-        images_dir = os.path.join(self.output_dir, dirname)
-        self.ensure_directory(images_dir)
-        
-        # Generate filename from URL
-        parsed_url = urlparse(image_url)
-        path = parsed_url.path
-        
-        # Get the original filename from the URL
-        original_filename = os.path.basename(path)
-        
-        # Remove query parameters
-        original_filename = original_filename.split('?')[0]
-        
-        # If no filename was found, use a default
-        if not original_filename:
-            original_filename = f"image_{len(self.created_files)}.jpg"
-        
-        # Sanitize the filename
-        filename = re.sub(r'[^\w\-\.]', '_', original_filename)
-        
-        # Ensure unique filename
-        counter = 1
-        unique_filename = filename
-        while os.path.join(images_dir, unique_filename) in self.created_files:
-            name, ext = os.path.splitext(filename)
-            unique_filename = f"{name}_{counter}{ext}"
-            counter += 1
-        
-        filepath = os.path.join(images_dir, unique_filename)
-        self.created_files.add(filepath)
-        
-        try:
-            response = requests.get(image_url, stream=True)
-            response.raise_for_status()
-            
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            return os.path.join(dirname, unique_filename)
-        
-        except Exception as e:
-            print(f"Error downloading image {image_url}: {e}")
-            return image_url  # Return original URL on failure
-    
-    def create_index(self, url_title_map: Dict[str, str]) -> str:
-        """
-        Create an index file with links to all downloaded pages.
-        
-        Args:
-            url_title_map: Dictionary mapping URLs to page titles
-            
-        Returns:
-            Path to the index file
-        """
-        index_content = "# Documentation Repository Index\n\n"
-        
-        # Sort by title for better organization
-        sorted_urls = sorted(url_title_map.items(), key=lambda x: x[1])
-        
-        for url, title in sorted_urls:
-            if url in self.url_to_file_map:
-                filename = self.url_to_file_map[url]
-                index_content += f"- [{title}]({filename})\n"
-        
-        # Save the index file
-        with open(os.path.join(self.output_dir, "index.md"), 'w', encoding='utf-8') as f:
-            f.write(index_content)
-        
-        return "index.md" 
\ No newline at end of file
+import hashlib
+import os
+import re
+import unicodedata
+from urllib.parse import urlparse
+from typing import Dict, List, Optional, Set, Tuple
+
+from http_client import HttpSession, create_session
+from index_builder import IndexBuilder
+from metrics import NULL_METRICS, Metrics
+from output_writer import OutputWriter, write_archive
+from url_registry import UrlMap, UrlRegistry
+
+# URL parts that are copied into a page's filename unchanged
+_EXACT_HOST = re.compile(r"[A-Za-z0-9.\-]+")
+_EXACT_PATH = re.compile(r"/?|(/[A-Za-z0-9.\-]+)+")
+
+
+def hashed_filename(filename: str, key: str) -> str:
+    """Add a short stable hash of ``key`` to a filename (``name_1a2b3c4d.md``)."""
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}{ext}"
+
+
+class FilenameAllocator:
+    def __init__(self, hash_suffix: bool = False):
+        """
+        Hand out unique filenames in one directory.
+
+        A name that is already taken gets a suffix. By default the suffix is
+        the next number for that name (``page_1.md``, ``page_2.md``, ...),
+        kept per name so allocation does not slow down as collisions pile up.
+        With ``hash_suffix`` it is a short hash of the key instead, and keys
+        whose name other keys may share always get the hashed name, so a URL
+        keeps the same name whatever order pages are crawled in.
+
+        Args:
+            hash_suffix: Disambiguate with a stable 8-character hash of the key
+        """
+        self.hash_suffix = hash_suffix
+        self.taken: Set[str] = set()
+        # Next numeric suffix to try per colliding name
+        self._counters: Dict[str, int] = {}
+
+    def reserve(self, filename: str) -> None:
+        """Mark a filename as taken."""
+        self.taken.add(filename)
+
+    def allocate(self, filename: str, key: str, ambiguous: bool = False) -> str:
+        """
+        Take ``filename``, or a suffixed variant if it is already taken.
+
+        With ``hash_suffix``, an ambiguous key gets the hashed name even when
+        ``filename`` is free, so the first of several keys sharing a name
+        does not keep the plain one.
+
+        Args:
+            filename: The preferred filename
+            key: Identifies the owner (e.g. its URL); used for hash suffixes
+            ambiguous: Other keys may map to the same filename
+
+        Returns:
+            The allocated filename
+        """
+        if filename not in self.taken and not (self.hash_suffix and ambiguous):
+            self.taken.add(filename)
+            return filename
+
+        if self.hash_suffix:
+            candidate = hashed_filename(filename, key)
+            if candidate not in self.taken:
+                self.taken.add(candidate)
+                return candidate
+
+        # Only names taken some other way (reserved, or natively ending in a
+        # number) are probed past
+        stem, ext = os.path.splitext(filename)
+        counter = self._counters.get(filename, 1)
+        candidate = f"{stem}_{counter}{ext}"
+        while candidate in self.taken:
+            counter += 1
+            candidate = f"{stem}_{counter}{ext}"
+        self._counters[filename] = counter + 1
+        self.taken.add(candidate)
+        return candidate
+
+
+class FileHandler:
+    def __init__(
+        self,
+        output_dir: str = "docrepo",
+        session: Optional[HttpSession] = None,
+        registry: Optional[UrlRegistry] = None,
+        metrics: Optional[Metrics] = None,
+        hash_suffix: bool = False,
+        filenames: Optional[FilenameAllocator] = None,
+        index_depth: int = 2,
+        index_manifest: bool = False,
+    ):
+        """
+        Initialize the file handler.
+
+        Args:
+            output_dir: Directory where the Markdown files will be saved
+            session: HTTP session used for image downloads (a new pooled
+                session is created if omitted)
+            registry: URL registry shared with other components (a private
+                one is created if omitted)
+            metrics: Metrics that file write times and sizes are recorded into
+            hash_suffix: Disambiguate colliding filenames with a stable hash of
+                the URL instead of a counter (see FilenameAllocator)
+            filenames: Allocator for Markdown filenames, e.g. one shared with
+                other processes (a private one is created if omitted)
+            index_depth: Number of URL path levels that get their own index
+                file; 0 for a single flat index.md
+            index_manifest: Also write the index as JSON to index.json
+        """
+        self.output_dir = output_dir
+        self.metrics = metrics or NULL_METRICS
+        self.index_depth = index_depth
+        self.index_manifest = index_manifest
+        self.session = session or create_session()
+        self.ensure_directory(self.output_dir)
+        # Markdown files are written in the background
+        self.writer = OutputWriter(output_dir, metrics=self.metrics)
+
+        # For tracking created files and avoiding duplicates
+        self.filenames = filenames or FilenameAllocator(hash_suffix)
+        self.created_files = self.filenames.taken
+        self.image_filenames = FilenameAllocator(hash_suffix)
+        if registry is None:
+            registry = UrlRegistry()
+        self.url_to_file_map = UrlMap(registry)
+
+    def ensure_directory(self, directory: str) -> None:
+        """Create directory if it doesn't exist."""
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def sanitize_filename(self, url: str) -> str:
+        """
+        Convert a URL into a valid filename.
+
+        Args:
+            url: The URL to convert
+
+        Returns:
+            A sanitized filename
+        """
+        # Parse the URL
+        parsed_url = urlparse(url)
+
+        # Start with the hostname
+        filename = parsed_url.netloc
+
+        # Add the path, but remove trailing slashes
+        path = parsed_url.path.rstrip("/")
+        if path:
+            # Replace slashes with underscores
+            path = path.replace("/", "_")
+            filename += path
+
+        # If the URL has no path, add an underscore to avoid filename collision
+        if not path and not parsed_url.query:
+            filename += "_index"
+
+        # Add query parameters if present
+        if parsed_url.query:
+            filename += "_" + parsed_url.query.replace("&", "_").replace("=", "-")
+
+        # Remove invalid filename characters
+        filename = re.sub(r"[^\w\-\.]", "_", filename)
+
+        # Normalize unicode characters
+        filename = (
+            unicodedata.normalize("NFKD", filename)
+            .encode("ASCII", "ignore")
+            .decode("ASCII")
+        )
+
+        # Ensure filename isn't too long
+        if len(filename) > 200:
+            # Keep the first 100 and last 95 characters
+            filename = filename[:100] + "_" + filename[-95:]
+
+        # Add markdown extension
+        if not filename.endswith(".md"):
+            filename += ".md"
+
+        return filename
+
+    def filename_may_collide(self, url: str) -> bool:
+        """
+        Check whether another URL could get the same name from sanitize_filename.
+
+        Names are exact when the host and path only hold letters, digits,
+        dots and dashes: no two such URLs share a name (an empty path and
+        ``/`` are the same page). Anything that is
+        dropped or replaced on the way to the name (a query, underscores,
+        other characters, a trailing or doubled slash, a long name) makes it
+        ambiguous, as do paths that end in ``.md`` or are ``/index`` (the
+        name of the site root). The scheme is not part of the name.
+
+        Args:
+            url: The URL to check
+
+        Returns:
+            True if the URL's filename is ambiguous
+        """
+        parsed_url = urlparse(url)
+        netloc, path = parsed_url.netloc, parsed_url.path
+        # An empty query or fragment is dropped from the name too
+        if "?" in url or "#" in url or parsed_url.params:
+            return True
+        if not (_EXACT_HOST.fullmatch(netloc) and _EXACT_PATH.fullmatch(path)):
+            return True
+        # Longer names are shortened (see sanitize_filename)
+        return len(netloc + path) > 200 or path.endswith(".md") or path == "/index"
+
+    def generate_unique_filename(self, url: str) -> str:
+        """
+        Generate a unique filename based on the URL.
+
+        Args:
+            url: The URL to convert to a filename
+
+        Returns:
+            A unique filename for the URL
+        """
+        # A URL keeps the name it was given first
+        if url in self.url_to_file_map:
+            return self.url_to_file_map[url]
+
+        filename = self.filenames.allocate(
+            self.sanitize_filename(url), url, self.filename_may_collide(url)
+        )
+        self.url_to_file_map[url] = filename
+        return filename
+
+    def reserve_filename(self, url: str, filename: str) -> None:
+        """
+        Assign a known filename to a URL, e.g. one recorded by a previous run.
+
+        Args:
+            url: The URL the file belongs to
+            filename: The filename to keep for it
+        """
+        self.filenames.reserve(filename)
+        self.url_to_file_map[url] = filename
+
+    def save_markdown(self, url: str, markdown_content: str) -> str:
+        """
+        Save markdown content to a file.
+
+        The file is written in the background; read_markdown() already sees
+        the new content.
+
+        Args:
+            url: Original URL
+            markdown_content: Markdown content to save
+
+        Returns:
+            Path to the saved file
+        """
+        # Reuse the name allocated earlier so links to this page stay valid
+        filename = self.url_to_file_map.get(url) or self.generate_unique_filename(url)
+        self.writer.write(filename, markdown_content)
+        return filename
+
+    def read_markdown(self, url: str) -> str:
+        """
+        Read back the markdown file previously saved for a URL.
+
+        Args:
+            url: Original URL
+
+        Returns:
+            The file's markdown content
+        """
+        return self.writer.read(self.url_to_file_map[url])
+
+    def flush(self) -> None:
+        """Wait until every saved file is on disk."""
+        self.writer.flush()
+
+    def close(self) -> List[Tuple[str, Exception]]:
+        """
+        Finish writing saved files and stop the writer thread.
+
+        Returns:
+            (filename, exception) for every file that could not be written
+        """
+        return self.writer.close()
+
+    def create_archive(self, path: str) -> int:
+        """
+        Pack the output directory into a zip or tar archive.
+
+        Args:
+            path: Archive to create; the format follows the suffix (.zip,
+                .tar, .tar.gz, .tar.bz2 or .tar.xz)
+
+        Returns:
+            Number of files archived
+        """
+        self.flush()
+        return write_archive(self.output_dir, path)
+
+    def download_image(self, image_url: str, dirname: str = "images") -> str:
+        """
+        Download an image and save it locally.
+
+        Args:
+            image_url: URL of the image
+            dirname: Directory to save images
+
+        Returns:
+            Local path to the image
+        """
+        images_dir = os.path.join(self.output_dir, dirname)
+        self.ensure_directory(images_dir)
+
+        # Generate filename from URL
+        parsed_url = urlparse(image_url)
+        path = parsed_url.path
+
+        # Get the original filename from the URL
+        original_filename = os.path.basename(path)
+
+        # Remove query parameters
+        original_filename = original_filename.split("?")[0]
+
+        # If no filename was found, use a default
+        if not original_filename:
+            original_filename = f"image_{len(self.image_filenames.taken)}.jpg"
+
+        # Sanitize the filename
+        filename = re.sub(r"[^\w\-\.]", "_", original_filename)
+
+        # Ensure unique filename
+        # Images in different directories can share a basename
+        unique_filename = self.image_filenames.allocate(
+            filename, image_url, ambiguous=True
+        )
+        filepath = os.path.join(images_dir, unique_filename)
+
+        try:
+            response = self.session.get(image_url, stream=True)
+            response.raise_for_status()
+
+            with open(filepath, "wb") as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    f.write(chunk)
+
+            return os.path.join(dirname, unique_filename)
+
+        except Exception as e:
+            print(f"Error downloading image {image_url}: {e}")
+            return image_url  # Return original URL on failure
+
+    def create_index(self, url_title_map: Dict[str, str]) -> str:
+        """
+        Create the index files with links to all downloaded pages.
+
+        Pages are grouped into one index file per URL path section (see
+        IndexBuilder) and listed by title within each section.
+
+        Args:
+            url_title_map: Dictionary mapping URLs to page titles
+
+        Returns:
+            Path to the root index file
+        """
+        builder = IndexBuilder(self.output_dir, self.index_depth, self.index_manifest)
+
+        # Sort by title for better organization
+        for url, title in sorted(url_title_map.items(), key=lambda x: x[1]):
+            filename = self.url_to_file_map.get(url)
+            if filename is not None:
+                builder.add(url, title, filename)
+
+        return builder.close()
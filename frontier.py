@@ -0,0 +1,74 @@
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from url_registry import SEEN, UrlRegistry, UrlSet
+
+
+class Frontier:
+    def __init__(self, registry: Optional[UrlRegistry] = None):
+        """
+        Initialize an empty crawl frontier.
+
+        The frontier is a FIFO queue of (url id, depth) pairs backed by a
+        "seen-or-enqueued" set, so every URL is queued at most once and
+        memory grows with the number of unique URLs rather than the number
+        of links discovered.
+
+        Args:
+            registry: URL registry to intern URLs in (a private one is
+                created if omitted)
+        """
+        self.registry = registry if registry is not None else UrlRegistry()
+        self.queue: Deque[Tuple[int, int]] = deque()
+        self.seen = UrlSet(self.registry, SEEN)
+        self.depth_counts: Dict[int, int] = {}
+        self.duplicates_suppressed = 0
+        self.max_queue_size = 0
+
+    def add(self, url: str, depth: int) -> bool:
+        """
+        Queue a URL unless it has already been seen.
+
+        Args:
+            url: The normalized URL to queue
+            depth: Link depth at which the URL was discovered
+
+        Returns:
+            True if the URL was queued, False if it was a duplicate
+        """
+        if url in self.seen:
+            self.duplicates_suppressed += 1
+            return False
+
+        self.seen.add(url)
+        self.queue.append((self.registry.lookup(url), depth))
+        self.depth_counts[depth] = self.depth_counts.get(depth, 0) + 1
+        if len(self.queue) > self.max_queue_size:
+            self.max_queue_size = len(self.queue)
+        return True
+
+    def pop(self) -> Tuple[str, int]:
+        """Remove and return the next (url, depth) pair in FIFO order."""
+        url_id, depth = self.queue.popleft()
+        return self.registry.url(url_id), depth
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.seen
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report frontier statistics.
+
+        Returns:
+            Dictionary with the current queue size, peak queue size, number
+            of unique URLs seen and number of duplicate links suppressed
+        """
+        return {
+            "queued": len(self.queue),
+            "max_queued": self.max_queue_size,
+            "unique_urls": len(self.seen),
+            "duplicates_suppressed": self.duplicates_suppressed,
+        }
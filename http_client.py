@@ -0,0 +1,414 @@
+import asyncio
+import codecs
+import re
+import requests
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import List, Mapping, Optional, Tuple, Union
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from metrics import Metrics
+
+# aiohttp is only needed for the asyncio API (DocRepo.arun)
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Statuses that mean the server is overloaded or briefly unavailable; the
+# request is worth retrying later
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+# Exceptions of failed requests that may succeed when retried
+TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+if aiohttp is not None:
+    ASYNC_TRANSIENT_ERRORS = (
+        aiohttp.ClientConnectionError,
+        aiohttp.ClientPayloadError,
+        asyncio.TimeoutError,
+    )
+else:
+    ASYNC_TRANSIENT_ERRORS = (asyncio.TimeoutError,)
+
+# urllib3 decodes brotli transparently when one of these is installed
+try:
+    import brotli  # noqa: F401
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+USER_AGENT = "DocRepo Crawler"
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT: Tuple[float, float] = (10.0, 30.0)
+
+# Largest page body that is read into memory
+DEFAULT_MAX_PAGE_BYTES = 10 * 1024 * 1024
+
+# Media types crawled as HTML, and those whose body is sniffed to decide
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+SNIFFED_CONTENT_TYPES = ("", "text/plain", "application/octet-stream")
+
+# Bytes inspected for an HTML signature and a <meta> charset
+SNIFF_BYTES = 1024
+HTML_SIGNATURES = (b"<!doctype html", b"<html", b"<head", b"<body", b"<title")
+META_CHARSET_PATTERN = re.compile(
+    rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE
+)
+UTF8_BOM = b"\xef\xbb\xbf"
+
+
+class ResponseRejected(Exception):
+    """Raised when a response is not crawled because of its type or size."""
+
+
+class TransientError(Exception):
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ):
+        """
+        Raised when a fetch failed in a way that may not happen again.
+
+        Covers connection errors, timeouts and RETRY_STATUSES responses.
+
+        Args:
+            message: Description of the failure
+            status_code: HTTP status of the response, None if there was none
+            retry_after: Seconds the server asked to wait (Retry-After), if any
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header, given either in seconds or as an HTTP date.
+
+    Args:
+        value: The header value
+
+    Returns:
+        Seconds to wait from now (0 for a date in the past), or None if the
+        header is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at is None:
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class FetchedResponse:
+    def __init__(
+        self,
+        status_code: int,
+        headers: Mapping[str, str],
+        text: str,
+        url: Optional[str] = None,
+    ):
+        """
+        The parts of an HTTP response that the crawler keeps.
+
+        The body is read (and its connection released) before the response
+        is handed on, so only the decoded text is held.
+
+        Args:
+            status_code: HTTP status code
+            headers: Response headers (case-insensitive mapping)
+            text: Decoded response body
+            url: URL the response came from after redirects, if known
+        """
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+        self.url = url
+
+
+class HtmlBodyReader:
+    def __init__(
+        self,
+        headers: Mapping[str, str],
+        max_bytes: Optional[int] = DEFAULT_MAX_PAGE_BYTES,
+    ):
+        """
+        Decode an HTML response body incrementally, within a size limit.
+
+        The headers are checked straight away, so a response that is not HTML
+        or announces more than ``max_bytes`` is rejected before any of its
+        body is read. Responses without a useful Content-Type are sniffed on
+        their first bytes. The body is then decoded chunk by chunk with the
+        charset from the headers, a <meta> tag or UTF-8, in that order.
+
+        Args:
+            headers: Response headers
+            max_bytes: Largest accepted body in bytes; None for no limit
+
+        Raises:
+            ResponseRejected: If the headers rule the response out
+        """
+        content_type = headers.get("Content-Type", "")
+        media_type, _, params = content_type.partition(";")
+        media_type = media_type.strip().lower()
+        if (
+            media_type not in HTML_CONTENT_TYPES
+            and media_type not in SNIFFED_CONTENT_TYPES
+        ):
+            raise ResponseRejected(f"content type {media_type}")
+
+        content_length = headers.get("Content-Length", "")
+        if max_bytes and content_length.isdigit() and int(content_length) > max_bytes:
+            raise ResponseRejected(f"{content_length} bytes")
+
+        self.max_bytes = max_bytes
+        self.sniff = media_type in SNIFFED_CONTENT_TYPES
+        match = re.search(r'charset\s*=\s*["\']?([\w.:-]+)', params, re.IGNORECASE)
+        self.charset = match.group(1) if match else None
+        self.size = 0
+        self._head = b""
+        self._decoder = None
+        self._parts: List[str] = []
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Decode the next chunk of the body.
+
+        Raises:
+            ResponseRejected: If the body grows past the size limit or turns
+                out not to be HTML
+        """
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise ResponseRejected(f"larger than {self.max_bytes} bytes")
+
+        if self._decoder is None:
+            # Hold the first bytes back until there are enough to sniff
+            self._head += chunk
+            if len(self._head) < SNIFF_BYTES:
+                return
+            chunk, self._head = self._head, b""
+            self._start(chunk)
+        self._parts.append(self._decoder.decode(chunk))
+
+    def text(self) -> str:
+        """Finish decoding and return the body."""
+        if self._decoder is None:
+            head, self._head = self._head, b""
+            self._start(head)
+            self._parts.append(self._decoder.decode(head))
+        self._parts.append(self._decoder.decode(b"", final=True))
+        return "".join(self._parts)
+
+    def _start(self, head: bytes) -> None:
+        """Check the first bytes of the body and set up the decoder."""
+        if self.sniff:
+            start = head[:SNIFF_BYTES].lower()
+            if not any(signature in start for signature in HTML_SIGNATURES):
+                raise ResponseRejected("body does not look like HTML")
+
+        encoding = self.charset
+        if encoding is None:
+            match = META_CHARSET_PATTERN.search(head[:SNIFF_BYTES])
+            encoding = match.group(1).decode("ascii") if match else "utf-8"
+        try:
+            encoding = codecs.lookup(encoding).name
+        except LookupError:
+            encoding = "utf-8"
+        if encoding == "utf-8" and head.startswith(UTF8_BOM):
+            encoding = "utf-8-sig"
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+
+def _timed_pool_class(
+    pool_class: type, connection_class: type, metrics: Metrics
+) -> type:
+    """Subclass a urllib3 pool so its new connections record their connect time."""
+
+    class TimedConnection(connection_class):
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            metrics.observe("connect_seconds", time.perf_counter() - start)
+            metrics.inc("connections_total")
+
+    return type(pool_class.__name__, (pool_class,), {"ConnectionCls": TimedConnection})
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    def __init__(self, metrics: Metrics, **kwargs):
+        """
+        HTTPAdapter that records connection setup time (DNS, TCP and TLS).
+
+        Args:
+            metrics: Metrics to record into
+            **kwargs: Passed on to HTTPAdapter
+        """
+        self.metrics = metrics
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _timed_pool_class(HTTPConnectionPool, HTTPConnection, self.metrics),
+            "https": _timed_pool_class(
+                HTTPSConnectionPool, HTTPSConnection, self.metrics
+            ),
+        }
+
+
+class HttpSession(requests.Session):
+    def __init__(
+        self,
+        pool_size: int = 10,
+        max_hosts: int = 10,
+        timeout: Union[float, Tuple[float, float], None] = DEFAULT_TIMEOUT,
+        user_agent: str = USER_AGENT,
+        metrics: Optional[Metrics] = None,
+    ):
+        """
+        Shared HTTP session used for page fetches and image downloads.
+
+        Connections are kept alive and pooled per host, responses may be
+        gzip/deflate (and brotli, when installed) compressed, and every
+        request gets a timeout unless the caller passes one explicitly.
+
+        Args:
+            pool_size: Maximum number of pooled connections per host
+            max_hosts: Number of hosts to keep connection pools for
+            timeout: Default timeout in seconds, either one value or a
+                (connect, read) tuple; None disables the timeout
+            user_agent: User-Agent header sent with every request
+            metrics: Metrics that connection setup times are recorded into
+        """
+        super().__init__()
+        self.timeout = timeout
+
+        if metrics is not None and metrics.enabled:
+            adapter = TimedHTTPAdapter(
+                metrics, pool_connections=max_hosts, pool_maxsize=pool_size
+            )
+        else:
+            adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+        self.headers.update(
+            {
+                "User-Agent": user_agent,
+                "Accept-Encoding": ACCEPT_ENCODING,
+                "Connection": "keep-alive",
+            }
+        )
+
+    def request(self, method: str, url: str, *args, **kwargs) -> requests.Response:
+        """Send a request, applying the session's default timeout."""
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, *args, **kwargs)
+
+
+def create_session(
+    concurrency: int = 1,
+    timeout: Optional[float] = None,
+    metrics: Optional[Metrics] = None,
+) -> HttpSession:
+    """
+    Create an HttpSession sized for the given number of parallel workers.
+
+    Args:
+        concurrency: Number of requests that may be in flight at once
+        timeout: Read timeout in seconds (defaults to DEFAULT_TIMEOUT)
+        metrics: Metrics that connection setup times are recorded into
+
+    Returns:
+        A configured HttpSession
+    """
+    session_timeout = (
+        DEFAULT_TIMEOUT if timeout is None else (DEFAULT_TIMEOUT[0], timeout)
+    )
+    return HttpSession(
+        pool_size=max(10, concurrency), timeout=session_timeout, metrics=metrics
+    )
+
+
+def _trace_config(metrics: Metrics) -> "aiohttp.TraceConfig":
+    """Build an aiohttp trace config recording DNS and connection setup times."""
+
+    async def on_dns_start(session, context, params):
+        context.dns_start = time.perf_counter()
+
+    async def on_dns_end(session, context, params):
+        metrics.observe("dns_seconds", time.perf_counter() - context.dns_start)
+
+    async def on_connect_start(session, context, params):
+        context.connect_start = time.perf_counter()
+
+    async def on_connect_end(session, context, params):
+        metrics.observe("connect_seconds", time.perf_counter() - context.connect_start)
+        metrics.inc("connections_total")
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_connect_start)
+    trace_config.on_connection_create_end.append(on_connect_end)
+    return trace_config
+
+
+def create_async_session(
+    concurrency: int = 1,
+    timeout: Optional[float] = None,
+    metrics: Optional[Metrics] = None,
+) -> Optional["aiohttp.ClientSession"]:
+    """
+    Create an aiohttp session configured like create_session().
+
+    Must be called with an event loop running.
+
+    Args:
+        concurrency: Number of requests that may be in flight at once
+        timeout: Read timeout in seconds (defaults to DEFAULT_TIMEOUT)
+        metrics: Metrics that DNS and connection setup times are recorded into
+
+    Returns:
+        A ClientSession, or None if aiohttp is not installed
+    """
+    if aiohttp is None:
+        return None
+    read_timeout = DEFAULT_TIMEOUT[1] if timeout is None else timeout
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=max(10, concurrency)),
+        timeout=aiohttp.ClientTimeout(
+            sock_connect=DEFAULT_TIMEOUT[0], sock_read=read_timeout
+        ),
+        headers={"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING},
+        trace_configs=(
+            [_trace_config(metrics)]
+            if metrics is not None and metrics.enabled
+            else None
+        ),
+    )
@@ -0,0 +1,321 @@
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+from typing import Dict, Optional, Sequence
+
+from http_client import HttpSession, create_session
+from metrics import NULL_METRICS, Metrics
+
+
+class ImageDownloader:
+    MANIFEST_FILENAME = ".manifest.json"
+
+    def __init__(
+        self,
+        output_dir: str,
+        session: Optional[HttpSession] = None,
+        dirname: str = "images",
+        workers: int = 4,
+        max_bytes: Optional[int] = None,
+        allowed_types: Optional[Sequence[str]] = None,
+        metrics: Optional[Metrics] = None,
+    ):
+        """
+        Download images in the background into content-addressed storage.
+
+        Each image is stored once under the SHA-256 of its bytes, so the same
+        file served from several URLs is kept only once. A manifest mapping
+        image URLs to stored files is kept next to the images, and URLs found
+        there are not downloaded again on later runs.
+
+        Args:
+            output_dir: Directory where the Markdown files are saved
+            session: HTTP session used for downloads
+            dirname: Subdirectory of output_dir holding the images
+            workers: Number of concurrent downloads
+            max_bytes: Reject images larger than this many bytes
+            allowed_types: Accepted Content-Type prefixes (e.g. "image/");
+                None accepts any type
+            metrics: Metrics that download times and sizes are recorded into
+        """
+        self.output_dir = output_dir
+        self.dirname = dirname
+        self.images_dir = os.path.join(output_dir, dirname)
+        os.makedirs(self.images_dir, exist_ok=True)
+
+        self.session = session or create_session(workers)
+        self.max_bytes = max_bytes
+        self.allowed_types = tuple(allowed_types) if allowed_types else None
+        self.metrics = metrics or NULL_METRICS
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        # Images stored by earlier runs (relative path per URL)
+        self.manifest_path = os.path.join(self.images_dir, self.MANIFEST_FILENAME)
+        self.manifest: Dict[str, str] = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+
+    def lookup(self, image_url: str) -> Optional[str]:
+        """
+        Return the local path of an image that is already stored, if any.
+
+        Args:
+            image_url: Absolute URL of the image
+
+        Returns:
+            Path relative to the output directory, or None
+        """
+        local_path = self.manifest.get(image_url)
+        if local_path and os.path.exists(os.path.join(self.output_dir, local_path)):
+            return local_path
+        return None
+
+    def submit(self, image_url: str) -> None:
+        """
+        Queue an image for download unless it is stored or already queued.
+
+        Args:
+            image_url: Absolute URL of the image
+        """
+        if image_url in self.futures or self.lookup(image_url):
+            return
+        self.futures[image_url] = self.executor.submit(self._timed_download, image_url)
+
+    def wait(self) -> Dict[str, str]:
+        """
+        Wait for all queued downloads and update the manifest.
+
+        Returns:
+            Dictionary mapping every successfully stored image URL to its path
+            relative to the output directory
+        """
+        for image_url, future in self.futures.items():
+            try:
+                local_path = future.result()
+            except Exception as e:
+                print(f"Error downloading image {image_url}: {e}")
+                self.metrics.inc("errors_total", stage="image", type=type(e).__name__)
+                continue
+            if local_path:
+                self.manifest[image_url] = local_path
+        self.futures.clear()
+        self.save_manifest()
+
+        return dict(self.manifest)
+
+    async def await_all(self) -> Dict[str, str]:
+        """Like wait(), but waits on a worker thread so the event loop keeps running."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.wait)
+
+    def save_manifest(self) -> None:
+        """
+        Write the URL to stored file manifest.
+
+        Entries saved meanwhile by other processes sharing the images
+        directory (the shards of a distributed crawl) are kept, and the file
+        is replaced atomically so they never read a partial manifest.
+        """
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = {**json.load(f), **self.manifest}
+        temp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=0, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def close(self) -> None:
+        """Stop the download threads."""
+        self.executor.shutdown()
+
+    def _extension(self, image_url: str, content_type: str) -> str:
+        """Pick a file extension from the URL path, falling back to the Content-Type."""
+        ext = os.path.splitext(urlparse(image_url).path)[1].lower()
+        if ext and len(ext) <= 6 and ext[1:].isalnum():
+            return ext
+        return mimetypes.guess_extension(content_type.split(";")[0].strip()) or ""
+
+    def _accept(self, image_url: str, headers) -> bool:
+        """Check the response headers against the allowed types and size limit."""
+        content_type = headers.get("Content-Type", "")
+        if self.allowed_types and not content_type.startswith(self.allowed_types):
+            print(f"Skipping image {image_url} (type {content_type or 'unknown'})")
+            return False
+
+        # A malformed Content-Length is ignored; the download's running size
+        # is still checked against the limit
+        content_length = headers.get("Content-Length", "").strip()
+        if (
+            self.max_bytes
+            and content_length.isdigit()
+            and int(content_length) > self.max_bytes
+        ):
+            print(f"Skipping image {image_url} ({content_length} bytes)")
+            return False
+        return True
+
+    def _too_large(self, image_url: str, size: int) -> bool:
+        """Check a download's running size against the size limit."""
+        if self.max_bytes and size > self.max_bytes:
+            print(f"Skipping image {image_url} (larger than {self.max_bytes} bytes)")
+            return True
+        return False
+
+    def _store(
+        self, image_url: str, content_type: str, digest, temp_path: str, size: int
+    ) -> str:
+        """Move a finished download to its content-addressed name; returns its path."""
+        filename = digest.hexdigest()[:32] + self._extension(image_url, content_type)
+        filepath = os.path.join(self.images_dir, filename)
+        with self._lock:
+            # Identical bytes are already stored under this name
+            stored = not os.path.exists(filepath)
+            if stored:
+                os.replace(temp_path, filepath)
+
+        self.metrics.inc("bytes_in_total", size, kind="image")
+        if stored:
+            self.metrics.inc("bytes_out_total", size, kind="image")
+        self.metrics.inc("images_total", result="stored" if stored else "duplicate")
+        return f"{self.dirname}/{filename}"
+
+    def _timed_download(self, image_url: str) -> Optional[str]:
+        """Run _download(), recording how long it took."""
+        with self.metrics.time("image_download_seconds"):
+            return self._download(image_url)
+
+    def _download(self, image_url: str) -> Optional[str]:
+        """Download one image on a worker thread; returns its relative path or None."""
+        response = self.session.get(image_url, stream=True)
+        try:
+            response.raise_for_status()
+            if not self._accept(image_url, response.headers):
+                return None
+
+            digest = hashlib.sha256()
+            size = 0
+            fd, temp_path = tempfile.mkstemp(dir=self.images_dir, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        size += len(chunk)
+                        if self._too_large(image_url, size):
+                            return None
+                        digest.update(chunk)
+                        f.write(chunk)
+
+                return self._store(
+                    image_url,
+                    response.headers.get("Content-Type", ""),
+                    digest,
+                    temp_path,
+                    size,
+                )
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        finally:
+            response.close()
+
+
+class AsyncImageDownloader(ImageDownloader):
+    def __init__(self, output_dir: str, client_session, **kwargs):
+        """
+        Image downloader whose downloads are asyncio tasks on an aiohttp session.
+
+        Takes the same keyword arguments as ImageDownloader; ``workers``
+        bounds the number of downloads in flight. Must be created on the
+        event loop; submit() may also be called from other threads.
+
+        Args:
+            output_dir: Directory where the Markdown files are saved
+            client_session: aiohttp.ClientSession used for downloads
+        """
+        super().__init__(output_dir, **kwargs)
+        self.client_session = client_session
+        self._loop = asyncio.get_event_loop()
+        self._slots = asyncio.Semaphore(kwargs.get("workers", 4))
+
+    def submit(self, image_url: str) -> None:
+        """
+        Queue an image for download unless it is stored or already queued.
+
+        Args:
+            image_url: Absolute URL of the image
+        """
+        if not self._on_loop():
+            # Pages are saved on a worker thread; tasks are created on the loop
+            self._loop.call_soon_threadsafe(self.submit, image_url)
+            return
+        if image_url in self.futures or self.lookup(image_url):
+            return
+        self.futures[image_url] = asyncio.ensure_future(self._adownload(image_url))
+
+    def _on_loop(self) -> bool:
+        """Check whether the caller runs on the downloader's event loop."""
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def await_all(self) -> Dict[str, str]:
+        """
+        Await all queued downloads and update the manifest.
+
+        Returns:
+            Dictionary mapping every successfully stored image URL to its path
+            relative to the output directory
+        """
+        if self.futures:
+            await asyncio.wait(list(self.futures.values()))
+        return self.wait()
+
+    def close(self) -> None:
+        """Cancel downloads that are still running."""
+        for task in self.futures.values():
+            task.cancel()
+        super().close()
+
+    async def _adownload(self, image_url: str) -> Optional[str]:
+        """Download one image; returns its relative path or None."""
+        async with self._slots:
+            with self.metrics.time("image_download_seconds"):
+                async with self.client_session.get(image_url) as response:
+                    response.raise_for_status()
+                    if not self._accept(image_url, response.headers):
+                        return None
+
+                    digest = hashlib.sha256()
+                    size = 0
+                    # Chunks are small, so writing them inline is cheaper than a
+                    # hop to a worker thread per chunk
+                    fd, temp_path = tempfile.mkstemp(
+                        dir=self.images_dir, suffix=".part"
+                    )
+                    try:
+                        with os.fdopen(fd, "wb") as f:
+                            async for chunk in response.content.iter_chunked(8192):
+                                size += len(chunk)
+                                if self._too_large(image_url, size):
+                                    return None
+                                digest.update(chunk)
+                                f.write(chunk)
+
+                        return self._store(
+                            image_url,
+                            response.headers.get("Content-Type", ""),
+                            digest,
+                            temp_path,
+                            size,
+                        )
+                    finally:
+                        if os.path.exists(temp_path):
+                            os.remove(temp_path)
@@ -0,0 +1,266 @@
+import json
+import os
+import posixpath
+import re
+import shutil
+from urllib.parse import urlsplit
+from typing import Dict, List, Optional, Set, Tuple
+
+INDEX_FILENAME = "index.md"
+SECTIONS_DIRNAME = "index"
+MANIFEST_FILENAME = "index.json"
+
+
+class Section:
+    def __init__(self, path: Tuple[str, ...], index_file: str):
+        """
+        One node of the index tree: the pages directly under a path prefix.
+
+        Entries are kept in a small buffer that is appended to a part file
+        whenever it fills up, so a section holds a bounded amount of memory
+        however many pages it lists.
+
+        Args:
+            path: Sanitized URL path segments of the section (empty for the root)
+            index_file: The section's index file, relative to the output directory
+        """
+        self.path = path
+        self.index_file = index_file
+        self.children: List[Tuple[str, ...]] = []
+        self.buffer: List[str] = []
+        self.pages = 0
+        # Pages in this section and all sections below it
+        self.total = 0
+        self.part_path: Optional[str] = None
+
+
+class IndexBuilder:
+    def __init__(
+        self,
+        output_dir: str,
+        depth: int = 2,
+        manifest: bool = False,
+        buffer_size: int = 256,
+    ):
+        """
+        Stream a hierarchical index of the generated pages.
+
+        Pages are grouped by the directories of their URL path, down to
+        ``depth`` levels. The root section is written to index.md and every
+        other section to its own file under index/, e.g. index/docs/api.md.
+        Each section file links to its parent, its subsections and its
+        pages. Entries are written out as they are added, so the index is
+        built in one pass with bounded memory per section.
+
+        Args:
+            output_dir: Directory holding the generated documentation
+            depth: Number of URL path levels that get their own section; 0
+                writes a single flat index.md
+            manifest: Also write index.json, listing every page and section
+            buffer_size: Entries a section buffers before appending them to
+                its part file
+        """
+        self.output_dir = output_dir
+        self.depth = max(0, depth)
+        self.buffer_size = buffer_size
+        self.sections_dir = os.path.join(output_dir, SECTIONS_DIRNAME)
+        self.sections: Dict[Tuple[str, ...], Section] = {
+            (): Section((), INDEX_FILENAME)
+        }
+        # Sanitized form of each directory name seen
+        self._segments: Dict[str, str] = {}
+
+        self._manifest = None
+        self._manifest_entries = 0
+        self._manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+        if manifest:
+            self._manifest = open(
+                self._temp_path(self._manifest_path), "w", encoding="utf-8"
+            )
+            self._manifest.write('{"pages": [')
+
+    def section_path(self, url: str) -> Tuple[str, ...]:
+        """
+        Return the section a page belongs to.
+
+        Args:
+            url: The page URL
+
+        Returns:
+            Sanitized directory segments of the URL path, at most ``depth`` long
+        """
+        directories = urlsplit(url).path.split("/")[1:-1]
+        path = []
+        for segment in directories[: self.depth]:
+            sanitized = self._segments.get(segment)
+            if sanitized is None:
+                sanitized = self._segments[segment] = re.sub(
+                    r"[^\w\-\.]", "_", segment
+                ).strip(".")
+            if sanitized:
+                path.append(sanitized)
+        return tuple(path)
+
+    def add(self, url: str, title: str, filename: str) -> None:
+        """
+        Add a page to the index.
+
+        Args:
+            url: The page URL
+            title: Page title
+            filename: The page's Markdown file, relative to the output directory
+        """
+        path = self.section_path(url)
+        section = self._section(path)
+        section.buffer.append(f"- [{title}]({self._link(path, filename)})\n")
+        section.pages += 1
+        if len(section.buffer) >= self.buffer_size:
+            self._spill(section)
+
+        if self._manifest is not None:
+            entry = {
+                "url": url,
+                "title": title,
+                "file": filename,
+                "section": section.index_file,
+            }
+            separator = "," if self._manifest_entries else ""
+            self._manifest.write(
+                f"{separator}\n{json.dumps(entry, ensure_ascii=False)}"
+            )
+            self._manifest_entries += 1
+
+    def close(self) -> str:
+        """
+        Write every section's index file (and the manifest, if enabled).
+
+        Section files left over from earlier runs whose sections no longer
+        exist are removed, as is an earlier index.json if no manifest was
+        requested this time.
+
+        Returns:
+            The root index filename
+        """
+        self._count(())
+        written = {self._write_section(section) for section in self.sections.values()}
+
+        if self._manifest is not None:
+            sections = [
+                {
+                    "path": "/".join(path),
+                    "file": self.index_file(path),
+                    "pages": section.pages,
+                    "total": section.total,
+                    "sections": [self.index_file(child) for child in section.children],
+                }
+                for path, section in sorted(self.sections.items())
+            ]
+            self._manifest.write(
+                f'\n], "sections": '
+                f"{json.dumps(sections, ensure_ascii=False, indent=1)}}}\n"
+            )
+            self._manifest.close()
+            os.replace(self._temp_path(self._manifest_path), self._manifest_path)
+        elif os.path.exists(self._manifest_path):
+            os.remove(self._manifest_path)
+
+        self._remove_stale(written)
+        return INDEX_FILENAME
+
+    def index_file(self, path: Tuple[str, ...]) -> str:
+        """Return the index file of a section, relative to the output directory."""
+        if not path:
+            return INDEX_FILENAME
+        return posixpath.join(SECTIONS_DIRNAME, *path[:-1], path[-1] + ".md")
+
+    def _section(self, path: Tuple[str, ...]) -> Section:
+        """Return a section, creating it and any missing parents."""
+        section = self.sections.get(path)
+        if section is None:
+            section = self.sections[path] = Section(path, self.index_file(path))
+            self._section(path[:-1]).children.append(path)
+        return section
+
+    def _link(self, from_path: Tuple[str, ...], target: str) -> str:
+        """Link from a section's index file to a path in the output directory."""
+        # A section's file is len(from_path) directories below the output directory
+        return "../" * len(from_path) + target
+
+    def _temp_path(self, path: str) -> str:
+        """Hidden temporary file next to ``path``, renamed over it once complete."""
+        directory, name = os.path.split(path)
+        return os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+
+    def _spill(self, section: Section) -> None:
+        """Append a section's buffered entries to its part file."""
+        if section.part_path is None:
+            section.part_path = (
+                self._temp_path(os.path.join(self.output_dir, section.index_file))
+                + ".part"
+            )
+            os.makedirs(os.path.dirname(section.part_path), exist_ok=True)
+            open(section.part_path, "w").close()
+        with open(section.part_path, "a", encoding="utf-8") as f:
+            f.writelines(section.buffer)
+        section.buffer = []
+
+    def _count(self, path: Tuple[str, ...]) -> int:
+        """Fill in the total page count of a section and everything below it."""
+        section = self.sections[path]
+        section.total = section.pages + sum(
+            self._count(child) for child in section.children
+        )
+        return section.total
+
+    def _write_section(self, section: Section) -> str:
+        """Write one section's index file; returns its path in the output directory."""
+        index_file = section.index_file
+        filepath = os.path.join(self.output_dir, index_file)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        temp_path = self._temp_path(filepath)
+
+        with open(temp_path, "w", encoding="utf-8") as f:
+            if section.path:
+                f.write(f"# {'/'.join(section.path)}\n\n")
+                f.write(
+                    f"Up: [{'/'.join(section.path[:-1]) or 'Index'}]"
+                    f"({self._link(section.path, self.index_file(section.path[:-1]))})"
+                    "\n\n"
+                )
+            else:
+                f.write("# Documentation Repository Index\n\n")
+
+            if section.children:
+                f.write("## Sections\n\n")
+                for child in sorted(section.children):
+                    total = self.sections[child].total
+                    f.write(
+                        f"- [{child[-1]}]"
+                        f"({self._link(section.path, self.index_file(child))})"
+                        f" ({total} page{'' if total == 1 else 's'})\n"
+                    )
+                if section.pages:
+                    f.write("\n## Pages\n\n")
+
+            if section.part_path is not None:
+                with open(section.part_path, "r", encoding="utf-8") as part:
+                    shutil.copyfileobj(part, f)
+                os.remove(section.part_path)
+            f.writelines(section.buffer)
+        os.replace(temp_path, filepath)
+        return index_file
+
+    def _remove_stale(self, written: Set[str]) -> None:
+        """Delete section files under index/ that this build did not write."""
+        if not os.path.isdir(self.sections_dir):
+            return
+        for dirpath, dirnames, filenames in os.walk(self.sections_dir, topdown=False):
+            for name in filenames:
+                filepath = os.path.join(dirpath, name)
+                relative = os.path.relpath(filepath, self.output_dir).replace(
+                    os.sep, "/"
+                )
+                if relative not in written:
+                    os.remove(filepath)
+            if not os.listdir(dirpath):
+                os.rmdir(dirpath)
@@ -0,0 +1,387 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Type
+
+import html2text
+from bs4 import NavigableString, Tag
+from bs4.element import Comment, Declaration, Doctype, ProcessingInstruction
+
+from page_document import PageDocument
+
+DEFAULT_BACKEND = "html2text"
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# Languages of code blocks, from e.g. class="language-python" or "highlight-python"
+CODE_LANGUAGE_PATTERN = re.compile(r"^(?:language|lang|highlight)-([\w+#.-]+)$")
+
+
+class MarkdownBackend(ABC):
+    # Name used to select the backend (e.g. --markdown-backend)
+    name = ""
+
+    @abstractmethod
+    def convert(self, document: PageDocument) -> str:
+        """
+        Convert a page to Markdown.
+
+        Link and image targets are left as they appear in the page (resolved
+        or not); MarkdownConverter rewrites them afterwards.
+
+        Args:
+            document: The page
+
+        Returns:
+            Markdown content
+        """
+
+
+class Html2TextBackend(MarkdownBackend):
+    name = "html2text"
+
+    def __init__(self):
+        """Convert pages with html2text, which tokenizes the raw HTML itself."""
+        self.h2t = html2text.HTML2Text()
+        self.configure_converter()
+
+    def configure_converter(self):
+        """Configure the HTML2Text converter with appropriate settings."""
+        self.h2t.ignore_links = False
+        self.h2t.ignore_images = False
+        self.h2t.ignore_tables = False
+        self.h2t.body_width = 0  # No wrapping
+        self.h2t.protect_links = True
+        self.h2t.unicode_snob = True
+        self.h2t.inline_links = True
+        self.h2t.wrap_links = False
+
+    def convert(self, document: PageDocument) -> str:
+        """Convert a page to Markdown (see MarkdownBackend.convert)."""
+        # html2text runs its own tokenizer over the raw HTML, so there is no
+        # need to build (or re-serialise) a tree here
+        return self.h2t.handle(document.html)
+
+
+class TreeBackend(MarkdownBackend):
+    name = "tree"
+
+    # Elements whose content is never shown
+    SKIPPED = frozenset(
+        {"head", "script", "style", "template", "noscript", "iframe", "object"}
+    )
+    HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+    # Elements that start a new block; anything else is rendered inline
+    BLOCKS = frozenset(
+        {
+            "address",
+            "article",
+            "aside",
+            "blockquote",
+            "body",
+            "center",
+            "dd",
+            "details",
+            "dialog",
+            "div",
+            "dl",
+            "dt",
+            "fieldset",
+            "figcaption",
+            "figure",
+            "footer",
+            "form",
+            "h1",
+            "h2",
+            "h3",
+            "h4",
+            "h5",
+            "h6",
+            "header",
+            "hgroup",
+            "hr",
+            "html",
+            "li",
+            "main",
+            "nav",
+            "ol",
+            "p",
+            "pre",
+            "section",
+            "summary",
+            "table",
+            "ul",
+        }
+    )
+    STRONG = frozenset({"b", "strong"})
+    EMPHASIS = frozenset({"em", "i", "cite", "dfn"})
+    CODE = frozenset({"code", "kbd", "samp", "tt", "var"})
+    # Strings that are markup rather than page text
+    NON_TEXT = (Comment, Declaration, Doctype, ProcessingInstruction)
+
+    def convert(self, document: PageDocument) -> str:
+        """
+        Convert a page to Markdown by walking its parsed tree.
+
+        The tree is the one PageDocument already built (or builds once) for
+        the page, so no second tokenizer runs over the HTML. The output
+        follows html2text's layout for headings, emphasis, links, lists and
+        block quotes; code blocks are fenced and tagged with their language,
+        and tables get leading and trailing pipes with escaped "|" in cells.
+
+        Args:
+            document: The page
+
+        Returns:
+            Markdown content
+        """
+        blocks = self._blocks(document.soup)
+        return "\n\n".join(blocks) + "\n" if blocks else ""
+
+    def _blocks(self, node: Tag) -> List[str]:
+        """Render the children of a block element as a list of Markdown blocks."""
+        blocks: List[str] = []
+        inline: List[str] = []
+
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                if not isinstance(child, self.NON_TEXT):
+                    inline.append(WHITESPACE_PATTERN.sub(" ", child))
+                continue
+            name = child.name
+            if name in self.SKIPPED:
+                continue
+            if name not in self.BLOCKS:
+                inline.append(self._inline(child))
+                continue
+
+            self._flush(inline, blocks)
+            block = self._block(child)
+            if isinstance(block, list):
+                blocks.extend(block)
+            elif block:
+                blocks.append(block)
+
+        self._flush(inline, blocks)
+        return blocks
+
+    def _flush(self, inline: List[str], blocks: List[str]) -> None:
+        """Turn collected inline content into a paragraph block."""
+        if inline:
+            text = _clean_lines("".join(inline))
+            if text:
+                blocks.append(text)
+            inline.clear()
+
+    def _block(self, node: Tag):
+        """Render one block element; returns a block, a list of blocks or ''."""
+        name = node.name
+        if name in self.HEADINGS:
+            text = _clean_lines(self._inline_children(node)).replace("\n", " ")
+            return f"{'#' * self.HEADINGS[name]} {text}" if text else ""
+        if name == "pre":
+            return self._code_block(node)
+        if name in ("ul", "ol"):
+            return self._list(node)
+        if name == "table":
+            return self._table(node)
+        if name == "blockquote":
+            inner = "\n\n".join(self._blocks(node))
+            return (
+                "\n".join(f"> {line}" if line else ">" for line in inner.split("\n"))
+                if inner
+                else ""
+            )
+        if name == "hr":
+            return "* * *"
+        if name == "dd":
+            inner = "\n\n".join(self._blocks(node))
+            return f": {_indent(inner, '  ')}" if inner else ""
+        return self._blocks(node)
+
+    def _inline(self, node: Tag) -> str:
+        """Render an element inside a paragraph."""
+        name = node.name
+        if name in self.SKIPPED:
+            return ""
+        if name == "br":
+            return "  \n"
+        if name == "img":
+            src = node.get("src")
+            if not src:
+                return ""
+            return f"![{_clean_inline(node.get('alt', ''))}]({_target(src)})"
+        if name in self.CODE:
+            text = WHITESPACE_PATTERN.sub(" ", node.get_text())
+            if not text.strip():
+                return text
+            fence = "``" if "`" in text else "`"
+            return f"{fence}{text}{fence}"
+
+        text = self._inline_children(node)
+        if name == "a":
+            href = node.get("href")
+            if href is None or not text.strip():
+                return text
+            return f"[{text.strip()}]({_target(href, protect=True)})"
+        if name in self.STRONG:
+            return _wrap(text, "**")
+        if name in self.EMPHASIS:
+            return _wrap(text, "_")
+        if name in self.BLOCKS:
+            # A block inside inline content, e.g. a <div> inside a link
+            return f" {text} "
+        return text
+
+    def _inline_children(self, node: Tag) -> str:
+        """Render the children of an element as inline content."""
+        parts = []
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                if not isinstance(child, self.NON_TEXT):
+                    parts.append(WHITESPACE_PATTERN.sub(" ", child))
+            else:
+                parts.append(self._inline(child))
+        return "".join(parts)
+
+    def _code_block(self, node: Tag) -> str:
+        """Render <pre> as a fenced code block."""
+        text = node.get_text()
+        if text.startswith("\n"):
+            text = text[1:]
+        text = text.rstrip("\n")
+        if not text.strip():
+            return ""
+
+        language = ""
+        code = node.find("code")
+        for element in (node, code):
+            for css_class in (
+                (element.get("class") or ()) if element is not None else ()
+            ):
+                match = CODE_LANGUAGE_PATTERN.match(css_class)
+                if match:
+                    language = match.group(1)
+                    break
+            if language:
+                break
+
+        fence = "```"
+        while fence in text:
+            fence += "`"
+        return f"{fence}{language}\n{text}\n{fence}"
+
+    def _list(self, node: Tag) -> str:
+        """Render <ul>/<ol> with one line per item and nested lists indented."""
+        ordered = node.name == "ol"
+        number = (
+            int(node.get("start", 1))
+            if ordered and str(node.get("start", "1")).isdigit()
+            else 1
+        )
+        items = []
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                continue
+            if child.name != "li":
+                # Stray content between items (e.g. a nested list not wrapped in <li>)
+                inner = (
+                    "\n".join(self._blocks(child))
+                    if child.name in self.BLOCKS
+                    else self._inline(child).strip()
+                )
+                if inner:
+                    items.append(_indent(inner, "  "))
+                continue
+
+            marker = f"{number}. " if ordered else "* "
+            number += 1
+            inner = "\n".join(self._blocks(child))
+            items.append(marker + _indent(inner, " " * len(marker)))
+        return "\n".join(items)
+
+    def _table(self, node: Tag) -> str:
+        """Render a table as a pipe table, the first row being the header."""
+        rows = []
+        for row in node.find_all("tr"):
+            # Rows of nested tables belong to the cell that holds them
+            if row.find_parent("table") is not node:
+                continue
+            cells = [
+                _clean_lines(self._inline_children(cell))
+                .replace("\n", " ")
+                .replace("|", "\\|")
+                for cell in row.find_all(("th", "td"), recursive=False)
+            ]
+            if cells:
+                rows.append(cells)
+        if not rows:
+            return ""
+
+        width = max(len(cells) for cells in rows)
+        lines = []
+        for index, cells in enumerate(rows):
+            cells = cells + [""] * (width - len(cells))
+            lines.append("| " + " | ".join(cells) + " |")
+            if index == 0:
+                lines.append("|" + "|".join(["---"] * width) + "|")
+        return "\n".join(lines)
+
+
+def _clean_lines(text: str) -> str:
+    """Trim collapsed inline text, keeping the hard line breaks from <br>."""
+    lines = [WHITESPACE_PATTERN.sub(" ", line).strip() for line in text.split("  \n")]
+    return "  \n".join(line for line in lines if line).strip()
+
+
+def _clean_inline(text: str) -> str:
+    """Collapse whitespace in text such as alt attributes."""
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def _wrap(text: str, marker: str) -> str:
+    """Wrap inline text in emphasis markers, keeping surrounding spaces outside."""
+    stripped = text.strip()
+    if not stripped:
+        return text
+    leading = " " if text[0].isspace() else ""
+    trailing = " " if text[-1].isspace() else ""
+    return f"{leading}{marker}{stripped}{marker}{trailing}"
+
+
+def _target(url: str, protect: bool = False) -> str:
+    """Format a link target, in <...> when protected or it would end the link early."""
+    url = url.strip()
+    if protect or any(char in url for char in " ()"):
+        return f"<{url}>"
+    return url
+
+
+def _indent(text: str, prefix: str) -> str:
+    """Indent every line but the first."""
+    return text.replace("\n", "\n" + prefix)
+
+
+BACKENDS: Dict[str, Type[MarkdownBackend]] = {
+    Html2TextBackend.name: Html2TextBackend,
+    TreeBackend.name: TreeBackend,
+}
+
+
+def create_backend(name: Optional[str] = None) -> MarkdownBackend:
+    """
+    Create a Markdown backend by name.
+
+    Args:
+        name: One of BACKENDS (default: html2text)
+
+    Returns:
+        The backend
+
+    Raises:
+        ValueError: If there is no backend of that name
+    """
+    backend_class = BACKENDS.get(name or DEFAULT_BACKEND)
+    if backend_class is None:
+        raise ValueError(
+            f"Unknown Markdown backend: {name} (use one of {', '.join(BACKENDS)})"
+        )
+    return backend_class()
@@ -1,126 +1,321 @@
-import html2text
-import re
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-from typing import Dict, List, Tuple
-
-
-class MarkdownConverter:
-    def __init__(self, link_map: Dict[str, str] = None):
-        """
-        Initialize the Markdown converter.
-        
-        Args:
-            link_map: A dictionary mapping original URLs to local file paths
-        """
-        self.link_map = link_map or {}
-        self.h2t = html2text.HTML2Text()
-        self.configure_converter()
-    
-    def configure_converter(self):
-        """Configure the HTML2Text converter with appropriate settings."""
-        self.h2t.ignore_links = False
-        self.h2t.ignore_images = False
-        self.h2t.ignore_tables = False
-        self.h2t.body_width = 0  # No wrapping
-        self.h2t.protect_links = True
-        self.h2t.unicode_snob = True
-        self.h2t.inline_links = True
-        self.h2t.wrap_links = False
-    
-    def extract_images(self, html_content: str, base_url: str) -> Tuple[str, List[Dict]]:
-        """
-        Extract image references from HTML content.
-        
-        Args:
-            html_content: Raw HTML content
-            base_url: Base URL for resolving relative paths
-            
-        Returns:
-            Tuple containing:
-            - Modified HTML with processed image tags
-            - List of dictionaries with image metadata
-        """
-        soup = BeautifulSoup(html_content, 'html.parser')
-        images = []
-        
-        for img in soup.find_all('img'):
-            if img.get('src'):
-                # Get image source URL
-                src = img['src']
-                alt = img.get('alt', '')
-                
-                # Resolve relative URLs
-                abs_src = urljoin(base_url, src)
-                
-                # Add to images list
-                images.append({
-                    'url': abs_src,
-                    'alt': alt,
-                    'src': src
-                })
-                
-                # We leave the URLs as they are for now
-                # They will be rewritten later by the link manager
-        
-        return str(soup), images
-    
-    def convert_html_to_markdown(self, html_content: str, url: str) -> str:
-        """
-        Convert HTML content to Markdown.
-        
-        Args:
-            html_content: Raw HTML content
-            url: Original URL for resolving relative links
-            
-        Returns:
-            Markdown content
-        """
-        # First, extract images
-        processed_html, images = self.extract_images(html_content, url)
-        
-        # Convert to markdown
-        markdown = self.h2t.handle(processed_html)
-        
-        # Rewrite links if a link map is provided
-        if self.link_map:
-            # Regular expression to find markdown links
-            link_pattern = r'\[([^\]]+)\]\(([^)]+)\)'
-            
-            def replace_link(match):
-                text, link = match.groups()
-                # Resolve relative URLs
-                absolute_link = urljoin(url, link)
-                
-                # Replace with local link if in the map
-                if absolute_link in self.link_map:
-                    return f'[{text}]({self.link_map[absolute_link]})'
-                return match.group(0)
-            
-            markdown = re.sub(link_pattern, replace_link, markdown)
-        
-        return markdown
-    
-    def add_front_matter(self, markdown: str, title: str, url: str) -> str:
-        """
-        Add front matter to the markdown file.
-        
-        Args:
-            markdown: Markdown content
-            title: Page title
-            url: Original URL
-            
-        Returns:
-            Markdown with front matter
-        """
-        front_matter = f"""---
-title: "{title.replace('"', '\\"')}"
-source_url: "{url}"
----
-
-# {title}
-
-[Source]({url})
-
-"""
-        return front_matter + markdown 
\ No newline at end of file
+import re
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin, urlparse
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from content_extractor import ContentExtractor
+from markdown_backends import DEFAULT_BACKEND, MarkdownBackend, create_backend
+from metrics import NULL_METRICS, Metrics
+from page_document import PageDocument
+
+# Inline Markdown links and images: an optional "!", [text] and (target). Link
+# text may contain images, as in the linked image [![alt](src)](href)
+MARKDOWN_LINK_PATTERN = re.compile(
+    r"(!?)\[([^\]!]*(?:(?:!\[[^\]]*\]\([^)]+\)|!(?!\[[^\]]*\]\())[^\]!]*)*)\]"
+    r"\(([^)]+)\)"
+)
+
+
+class MarkdownConverter:
+    def __init__(
+        self,
+        link_map: Dict[str, str] = None,
+        image_handler: Optional[Callable[[str], Optional[str]]] = None,
+        metrics: Optional[Metrics] = None,
+        canonicalize: Optional[Callable[[str], str]] = None,
+        backend: Union[str, MarkdownBackend] = DEFAULT_BACKEND,
+        content_extractor: Optional[ContentExtractor] = None,
+    ):
+        """
+        Initialize the Markdown converter.
+
+        Args:
+            link_map: A dictionary mapping original URLs to local file paths
+            image_handler: Called with each absolute image URL; returns the
+                local path to use, or None to keep the original URL for now
+            metrics: Metrics that conversion times are recorded into
+            canonicalize: Reduces link targets to the form used as keys of
+                ``link_map`` (e.g. UrlCanonicalizer.canonicalize)
+            backend: Markdown backend, or the name of one in
+                markdown_backends.BACKENDS ('html2text' or 'tree')
+            content_extractor: Cuts pages down to their main content before
+                they are converted
+        """
+        # Keep a reference to the caller's map so entries added later are seen
+        self.link_map = link_map if link_map is not None else {}
+        self.image_handler = image_handler
+        self.metrics = metrics or NULL_METRICS
+        self.canonicalize = canonicalize
+        self.backend = create_backend(backend) if isinstance(backend, str) else backend
+        self.content_extractor = content_extractor
+
+    def extract_images(
+        self, html_content: Union[str, PageDocument], base_url: str
+    ) -> Tuple[str, List[Dict]]:
+        """
+        Extract image references from HTML content.
+
+        Args:
+            html_content: Raw HTML content or an already parsed PageDocument
+            base_url: Base URL for resolving relative paths
+
+        Returns:
+            Tuple containing:
+            - The page HTML (unchanged; image URLs are rewritten later)
+            - List of dictionaries with image metadata
+        """
+        document = self.as_document(html_content, base_url)
+        return document.html, document.images
+
+    def as_document(
+        self, html_content: Union[str, PageDocument], url: str
+    ) -> PageDocument:
+        """Return the page as a PageDocument, wrapping raw HTML if necessary."""
+        if isinstance(html_content, PageDocument):
+            return html_content
+        return PageDocument(url, html_content)
+
+    def convert_html_to_markdown(
+        self,
+        html_content: Union[str, PageDocument],
+        url: str,
+        unresolved: Optional[Set[str]] = None,
+        pending_images: Optional[Set[str]] = None,
+    ) -> str:
+        """
+        Convert HTML content to Markdown.
+
+        Args:
+            html_content: Raw HTML content or an already parsed PageDocument
+            url: Original URL for resolving relative links
+            unresolved: Optional set that collects same-site links which are
+                not (yet) in the link map
+            pending_images: Optional set that collects image URLs the image
+                handler could not provide a local path for
+
+        Returns:
+            Markdown content
+        """
+        document = self.as_document(html_content, url)
+        if self.content_extractor is not None:
+            with self.metrics.time("extract_seconds"):
+                document = self.content_extractor.extract(document)
+
+        with self.metrics.time("markdown_seconds", backend=self.backend.name):
+            markdown = self.backend.convert(document)
+
+        with self.metrics.time("rewrite_seconds"):
+            return self.rewrite_links(
+                markdown, url, unresolved, pending_images=pending_images
+            )
+
+    def rewrite_links(
+        self,
+        markdown: str,
+        url: str,
+        unresolved: Optional[Set[str]] = None,
+        only: Optional[Set[str]] = None,
+        pending_images: Optional[Set[str]] = None,
+    ) -> str:
+        """
+        Rewrite links to mapped pages and images to local files in one pass.
+
+        Each distinct target is resolved against the page URL only once.
+        Links keep their #fragment when they are pointed at a local file.
+
+        Args:
+            markdown: Markdown content
+            url: URL of the page, for resolving relative links
+            unresolved: Optional set that collects same-site links which are
+                not in the link map
+            only: If given, only rewrite links and images whose absolute URL
+                (without fragment, canonicalized for links) is in this set
+            pending_images: Optional set that collects image URLs without a
+                local path
+
+        Returns:
+            Markdown with rewritten links
+        """
+        if (
+            not self.link_map
+            and self.image_handler is None
+            and unresolved is None
+            and pending_images is None
+        ):
+            return markdown
+
+        page_netloc = urlparse(url).netloc
+        # target -> (absolute URL without fragment, link map key, fragment, same site)
+        resolved: Dict[str, Tuple[str, str, str, bool]] = {}
+
+        def replace_link(match):
+            bang, text, target = match.groups()
+            # Links need text; images may have an empty alt
+            if not bang and not text:
+                return match.group(0)
+            if not bang and "![" in text:
+                # Rewrite the images inside a linked image's text as well
+                text = MARKDOWN_LINK_PATTERN.sub(replace_link, text)
+            original = f"{bang}[{text}]({target})"
+
+            target_info = resolved.get(target)
+            if target_info is None:
+                # Backends wrap targets in <...> (html2text does with protect_links)
+                link = (
+                    target[1:-1]
+                    if target.startswith("<") and target.endswith(">")
+                    else target
+                )
+                absolute_link, _, fragment = urljoin(url, link).partition("#")
+                key = (
+                    self.canonicalize(absolute_link)
+                    if self.canonicalize
+                    else absolute_link
+                )
+                target_info = (
+                    absolute_link,
+                    key,
+                    fragment,
+                    urlparse(absolute_link).netloc == page_netloc,
+                )
+                resolved[target] = target_info
+            absolute_link, key, fragment, same_site = target_info
+
+            if only is not None and (absolute_link if bang else key) not in only:
+                return original
+
+            if bang:
+                local_path = (
+                    self.image_handler(absolute_link) if self.image_handler else None
+                )
+                if local_path is None:
+                    if pending_images is not None:
+                        pending_images.add(absolute_link)
+                    return original
+                return f"![{text}]({local_path})"
+
+            # Replace with local link if in the map
+            local_path = self.link_map.get(key)
+            if local_path is not None:
+                if fragment:
+                    local_path = f"{local_path}#{fragment}"
+                return f"[{text}]({local_path})"
+            if unresolved is not None and same_site:
+                unresolved.add(key)
+            return original
+
+        return MARKDOWN_LINK_PATTERN.sub(replace_link, markdown)
+
+    def add_front_matter(self, markdown: str, title: str, url: str) -> str:
+        """
+        Add front matter to the markdown file.
+
+        Args:
+            markdown: Markdown content
+            title: Page title
+            url: Original URL
+
+        Returns:
+            Markdown with front matter
+        """
+        escaped_title = title.replace('"', '\\"')
+        front_matter = f"""---
+title: "{escaped_title}"
+source_url: "{url}"
+---
+
+# {title}
+
+[Source]({url})
+
+"""
+        return front_matter + markdown
+
+
+# Converter owned by each ConversionPool worker process, built once from the
+# link map passed to the pool initializer
+_worker_converter: Optional[MarkdownConverter] = None
+
+
+def _init_worker(
+    link_map: Dict[str, str],
+    canonicalize: Optional[Callable[[str], str]],
+    backend: str,
+    content_extractor: Optional[ContentExtractor],
+) -> None:
+    global _worker_converter
+    _worker_converter = MarkdownConverter(
+        link_map,
+        canonicalize=canonicalize,
+        backend=backend,
+        content_extractor=content_extractor,
+    )
+
+
+def _convert_in_worker(page: Tuple[str, str]) -> Tuple[str, Set[str]]:
+    url, html_content = page
+    images: Set[str] = set()
+    markdown = _worker_converter.convert_html_to_markdown(
+        html_content, url, pending_images=images
+    )
+    return markdown, images
+
+
+class ConversionPool:
+    def __init__(
+        self,
+        link_map: Dict[str, str],
+        workers: int,
+        chunksize: int = 8,
+        canonicalize: Optional[Callable[[str], str]] = None,
+        backend: str = DEFAULT_BACKEND,
+        content_extractor: Optional[ContentExtractor] = None,
+    ):
+        """
+        Convert HTML to Markdown on a pool of worker processes.
+
+        The link map is shipped to each worker once, when the worker starts,
+        rather than with every page. Workers have no image handler, so image
+        URLs are returned alongside the Markdown for the caller to resolve.
+
+        Args:
+            link_map: A dictionary mapping original URLs to local file paths
+            workers: Number of worker processes
+            chunksize: Number of pages handed to a worker at a time
+            canonicalize: Reduces link targets to link map keys (see
+                MarkdownConverter)
+            backend: Name of the Markdown backend the workers use
+            content_extractor: Main-content extractor for the workers; a
+                copy is sent to each, so it must have learned its repeated
+                blocks already
+        """
+        self.chunksize = chunksize
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(link_map, canonicalize, backend, content_extractor),
+        )
+
+    def convert(
+        self, pages: Iterable[Tuple[str, str]]
+    ) -> Iterator[Tuple[str, Set[str]]]:
+        """
+        Convert pages in parallel.
+
+        Args:
+            pages: (url, html_content) pairs
+
+        Returns:
+            Iterator over (markdown, image URLs) for each page, in input order
+        """
+        return self.executor.map(_convert_in_worker, pages, chunksize=self.chunksize)
+
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        self.executor.shutdown()
+
+    def __enter__(self) -> "ConversionPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
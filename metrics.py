@@ -0,0 +1,259 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS: Sequence[float] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+def metric_key(name: str, labels: Dict[str, str]) -> str:
+    """Build the Prometheus-style series name, e.g. errors_total{stage="fetch"}."""
+    if not labels:
+        return name
+    pairs = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return f"{name}{{{pairs}}}"
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Fixed-bucket histogram of observed values.
+
+        Args:
+            buckets: Sorted upper bounds of the buckets; values above the last
+                bound are only counted in the total
+        """
+        self.buckets = tuple(buckets)
+        self.counts: List[int] = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        """Record one value."""
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def snapshot(self) -> Dict:
+        """Return the histogram as a JSON-serialisable dict with cumulative buckets."""
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "min": self.min,
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+
+class _Timer:
+    def __init__(self, metrics: "Metrics", key: str):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.metrics.observe_key(self.key, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+class Metrics:
+    enabled = True
+
+    def __init__(self):
+        """
+        Counters and latency histograms for one run.
+
+        Series are named the Prometheus way (``*_total`` counters,
+        ``*_seconds`` histograms) and may carry labels. Updates are
+        thread-safe, so crawl and download workers can record directly.
+        """
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """
+        Add to a counter.
+
+        Args:
+            name: Counter name
+            value: Amount to add
+            **labels: Label values identifying the series
+        """
+        key = metric_key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Record a value (usually a duration in seconds) in a histogram.
+
+        Args:
+            name: Histogram name
+            value: Observed value
+            **labels: Label values identifying the series
+        """
+        self.observe_key(metric_key(name, labels), value)
+
+    def observe_key(self, key: str, value: float) -> None:
+        """Record a value in the histogram with an already built series name."""
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def time(self, name: str, **labels: str) -> _Timer:
+        """Return a context manager that records its duration in a histogram."""
+        return _Timer(self, metric_key(name, labels))
+
+    def snapshot(self) -> Dict:
+        """Return all series as a JSON-serialisable dictionary."""
+        with self._lock:
+            return {
+                "started": self.started,
+                "elapsed_seconds": time.time() - self.started,
+                "counters": dict(sorted(self.counters.items())),
+                "histograms": {
+                    key: histogram.snapshot()
+                    for key, histogram in sorted(self.histograms.items())
+                },
+            }
+
+    def write_json(self, path: str) -> None:
+        """Write the snapshot to a JSON file."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Render all series in the Prometheus text exposition format."""
+        lines = []
+        snapshot = self.snapshot()
+
+        declared = set()
+        for key, value in snapshot["counters"].items():
+            name = key.split("{", 1)[0]
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE docrepo_{name} counter")
+            lines.append(f"docrepo_{key} {value}")
+
+        for key, histogram in snapshot["histograms"].items():
+            name, _, labels = key.partition("{")
+            labels = labels.rstrip("}")
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE docrepo_{name} histogram")
+            prefix = labels + "," if labels else ""
+            suffix = "{" + labels + "}" if labels else ""
+            for bound, count in histogram["buckets"].items():
+                lines.append(f'docrepo_{name}_bucket{{{prefix}le="{bound}"}} {count}')
+            lines.append(
+                f'docrepo_{name}_bucket{{{prefix}le="+Inf"}} {histogram["count"]}'
+            )
+            lines.append(f"docrepo_{name}_sum{suffix} {histogram['sum']}")
+            lines.append(f"docrepo_{name}_count{suffix} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> None:
+        """
+        Serve the series for Prometheus at http://host:port/metrics on a background
+        thread.
+
+        Args:
+            port: Port to listen on
+            host: Address to bind to
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"Serving metrics on http://{host}:{port}/metrics")
+
+    def close(self) -> None:
+        """Stop the metrics server, if running."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class NullMetrics:
+    enabled = False
+    _timer = _NullTimer()
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        pass
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        pass
+
+    def time(self, name: str, **labels: str) -> _NullTimer:
+        return self._timer
+
+    def close(self) -> None:
+        pass
+
+
+# Shared stand-in used when metrics are disabled
+NULL_METRICS = NullMetrics()
@@ -0,0 +1,238 @@
+import hashlib
+import os
+import queue
+import tarfile
+import threading
+import zipfile
+from typing import Dict, List, Optional, Tuple
+
+from metrics import NULL_METRICS, Metrics
+
+# Archive formats by file suffix, as tarfile write modes (None for zip)
+ARCHIVE_FORMATS = (
+    (".zip", None),
+    (".tar.gz", "w:gz"),
+    (".tgz", "w:gz"),
+    (".tar.bz2", "w:bz2"),
+    (".tar.xz", "w:xz"),
+    (".tar", "w"),
+)
+
+
+class OutputWriter:
+    def __init__(
+        self,
+        output_dir: str,
+        batch_size: int = 64,
+        max_pending: int = 256,
+        metrics: Optional[Metrics] = None,
+    ):
+        """
+        Write output files on a background thread.
+
+        Writes are queued and handled in batches, so the crawl and conversion
+        never wait on the filesystem unless ``max_pending`` files are already
+        queued. A file queued several times in one batch is written only once.
+        Every file is written to a temporary file and renamed over the old
+        one, so readers never see a half-written file. Content that matches
+        what is already on disk is not rewritten.
+
+        Args:
+            output_dir: Directory the files are written to
+            batch_size: Maximum number of queued files handled at once
+            max_pending: Maximum number of queued files before write() blocks
+            metrics: Metrics that write times and sizes are recorded into
+        """
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.metrics = metrics or NULL_METRICS
+        self.errors: List[Tuple[str, Exception]] = []
+
+        # Content queued but not yet on disk, so it can be read back at once
+        self._pending: Dict[str, str] = {}
+        # Hash of each file as last written or checked by this writer
+        self._hashes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(
+            target=self._run, name="output-writer", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, filename: str, content: str) -> None:
+        """
+        Queue a file to be written.
+
+        Args:
+            filename: Path relative to the output directory
+            content: Text content of the file
+        """
+        with self._lock:
+            self._pending[filename] = content
+        self._queue.put(filename)
+
+    def read(self, filename: str) -> str:
+        """
+        Read a file, including content that is still queued.
+
+        Args:
+            filename: Path relative to the output directory
+
+        Returns:
+            The file's text content
+        """
+        with self._lock:
+            content = self._pending.get(filename)
+        if content is not None:
+            return content
+        with open(os.path.join(self.output_dir, filename), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def flush(self) -> None:
+        """Wait until every queued file has been written."""
+        self._queue.join()
+
+    def close(self) -> List[Tuple[str, Exception]]:
+        """
+        Write the remaining queued files and stop the writer thread.
+
+        Returns:
+            (filename, exception) for every file that could not be written
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        return list(self.errors)
+
+    def _run(self) -> None:
+        """Writer thread: take batches off the queue and write them."""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            # The latest content of a file supersedes earlier queued versions
+            for filename in dict.fromkeys(name for name in batch if name is not None):
+                with self._lock:
+                    content = self._pending.get(filename)
+                if content is not None:
+                    self._write_file(filename, content)
+
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_file(self, filename: str, content: str) -> None:
+        """Atomically replace one file unless its content is unchanged."""
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        filepath = os.path.join(self.output_dir, filename)
+
+        try:
+            if self._unchanged(filename, filepath, data, digest):
+                self.metrics.inc("writes_skipped_total")
+            else:
+                with self.metrics.time("write_seconds"):
+                    # Only this thread writes, so the name cannot clash; open()
+                    # (unlike mkstemp) keeps the usual umask-based permissions
+                    directory, name = os.path.split(filepath)
+                    temp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+                    try:
+                        with open(temp_path, "wb") as f:
+                            f.write(data)
+                        os.replace(temp_path, filepath)
+                    finally:
+                        if os.path.exists(temp_path):
+                            os.remove(temp_path)
+                self.metrics.inc("bytes_out_total", len(data), kind="markdown")
+            self._hashes[filename] = digest
+        except Exception as e:
+            print(f"Error writing {filename}: {e}")
+            self.metrics.inc("errors_total", stage="write", type=type(e).__name__)
+            self.errors.append((filename, e))
+        finally:
+            with self._lock:
+                # Drop the content unless a newer version was queued meanwhile
+                if self._pending.get(filename) is content:
+                    del self._pending[filename]
+
+    def _unchanged(
+        self, filename: str, filepath: str, data: bytes, digest: str
+    ) -> bool:
+        """Check whether a file already holds exactly these bytes."""
+        known = self._hashes.get(filename)
+        if known is not None:
+            return known == digest
+        try:
+            if os.path.getsize(filepath) != len(data):
+                return False
+            with open(filepath, "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest() == digest
+        except OSError:
+            return False
+
+
+def archive_mode(path: str) -> Tuple[bool, Optional[str]]:
+    """
+    Look up the archive format for a path from its suffix.
+
+    Returns:
+        Tuple of (is_zip, tarfile write mode)
+
+    Raises:
+        ValueError: If the suffix is not a supported archive format
+    """
+    lowered = path.lower()
+    for suffix, mode in ARCHIVE_FORMATS:
+        if lowered.endswith(suffix):
+            return mode is None, mode
+    raise ValueError(
+        f"Unsupported archive format: {path} "
+        "(use .zip, .tar, .tar.gz, .tar.bz2 or .tar.xz)"
+    )
+
+
+def write_archive(output_dir: str, path: str) -> int:
+    """
+    Pack the generated repository into one archive in a single pass.
+
+    Files are streamed into the archive one at a time. Hidden files (crawl
+    state, checkpoints, the image manifest) are left out.
+
+    Args:
+        output_dir: Directory holding the generated documentation
+        path: Archive to create; the format follows the suffix
+
+    Returns:
+        Number of files archived
+    """
+    is_zip, mode = archive_mode(path)
+    archive_path = os.path.abspath(path)
+    root_name = os.path.basename(os.path.normpath(output_dir))
+    count = 0
+
+    archive = (
+        zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        if is_zip
+        else tarfile.open(path, mode)
+    )
+    with archive:
+        for dirpath, dirnames, filenames in os.walk(output_dir):
+            dirnames[:] = sorted(name for name in dirnames if not name.startswith("."))
+            for name in sorted(filenames):
+                filepath = os.path.join(dirpath, name)
+                if name.startswith(".") or os.path.abspath(filepath) == archive_path:
+                    continue
+                arcname = os.path.join(root_name, os.path.relpath(filepath, output_dir))
+                if is_zip:
+                    archive.write(filepath, arcname)
+                else:
+                    archive.add(filepath, arcname, recursive=False)
+                count += 1
+
+    return count
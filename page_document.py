@@ -0,0 +1,168 @@
+from bs4 import BeautifulSoup
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import lxml  # noqa: F401
+
+    DEFAULT_PARSER = "lxml"
+except ImportError:
+    DEFAULT_PARSER = "html.parser"
+
+
+class PageScanner(HTMLParser):
+    def __init__(self):
+        """
+        One-pass reader of what the crawler needs from a page: the <a href>
+        targets, <base href>, the first <title> and <link rel="canonical">.
+
+        Only start tags, end tags and text are looked at as the tokenizer
+        reaches them; no tree is built. The results match BeautifulSoup's
+        html.parser backend, which uses the same tokenizer.
+        """
+        super().__init__(convert_charrefs=True)
+        self.hrefs: List[str] = []
+        self.base_href: Optional[str] = None
+        self.canonical_href: Optional[str] = None
+        self.title: Optional[str] = None
+        # Text of the <title> element while inside it
+        self._title_parts: Optional[List[str]] = None
+
+    def scan(self, html: str) -> "PageScanner":
+        """Feed a whole page through the scanner and return it."""
+        self.feed(html)
+        self.close()
+        return self
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == "a":
+            href = _last_value(attrs, "href")
+            if href is not None:
+                self.hrefs.append(href)
+        elif tag == "title":
+            if self.title is None and self._title_parts is None:
+                self._title_parts = []
+        elif tag == "base":
+            if self.base_href is None:
+                self.base_href = _last_value(attrs, "href")
+        elif tag == "link" and self.canonical_href is None:
+            href = _last_value(attrs, "href")
+            if (
+                href is not None
+                and "canonical" in (_last_value(attrs, "rel") or "").lower().split()
+            ):
+                self.canonical_href = href
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "title" and self._title_parts is not None:
+            self.title = "".join(self._title_parts)
+            self._title_parts = None
+
+    def handle_data(self, data: str) -> None:
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+
+    def close(self) -> None:
+        super().close()
+        # An unclosed <title> runs to the end of the page
+        if self._title_parts is not None:
+            self.handle_endtag("title")
+
+
+def _last_value(attrs: List[Tuple[str, Optional[str]]], name: str) -> Optional[str]:
+    """Attribute value (the last if repeated), '' if it has none, None if absent."""
+    value = None
+    for key, attr_value in attrs:
+        if key == name:
+            value = attr_value or ""
+    return value
+
+
+class PageDocument:
+    def __init__(self, url: str, html: str, parser: Optional[str] = None):
+        """
+        Wrap a fetched page so its HTML is parsed at most once.
+
+        The title, base URL, canonical URL and links come from a quick
+        PageScanner pass. The BeautifulSoup tree is only built when it is
+        first needed, by image extraction or Markdown conversion, and then
+        shared between them.
+
+        Args:
+            url: URL the page was fetched from
+            html: Raw HTML content
+            parser: BeautifulSoup parser backend (defaults to lxml when
+                installed, otherwise html.parser)
+        """
+        self.url = url
+        self.html = html
+        self.parser = parser or DEFAULT_PARSER
+        self._soup: Optional[BeautifulSoup] = None
+        self._scanner: Optional[PageScanner] = None
+        self._images: Optional[List[Dict]] = None
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        """The parsed tree, built on first access."""
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.html, self.parser)
+        return self._soup
+
+    def discard_soup(self) -> None:
+        """Free the parsed tree once nothing needs it; it is rebuilt on next access."""
+        self._soup = None
+
+    @property
+    def scanner(self) -> PageScanner:
+        """Scan of the title, base, canonical link and link targets, made when used."""
+        if self._scanner is None:
+            self._scanner = PageScanner().scan(self.html)
+        return self._scanner
+
+    @property
+    def base_url(self) -> str:
+        """URL for resolving relative references, honouring <base href>."""
+        base_href = self.scanner.base_href
+        return urljoin(self.url, base_href) if base_href is not None else self.url
+
+    @property
+    def title(self) -> str:
+        """The page title, or "Untitled Page" if there is none."""
+        title = self.scanner.title
+        return title if title is not None else "Untitled Page"
+
+    @property
+    def canonical_url(self) -> Optional[str]:
+        """Absolute target of <link rel="canonical">, or None if the page has none."""
+        canonical_href = self.scanner.canonical_href
+        return (
+            urljoin(self.base_url, canonical_href)
+            if canonical_href is not None
+            else None
+        )
+
+    @property
+    def text(self) -> str:
+        """The visible text of the page."""
+        return self.soup.get_text(" ")
+
+    def links(self) -> List[str]:
+        """Return the absolute targets of all <a href> links in document order."""
+        base_url = self.base_url
+        return [urljoin(base_url, href) for href in self.scanner.hrefs]
+
+    @property
+    def images(self) -> List[Dict]:
+        """Metadata (absolute url, alt text, original src) for every <img src>."""
+        if self._images is None:
+            base_url = self.base_url
+            self._images = [
+                {
+                    "url": urljoin(base_url, img["src"]),
+                    "alt": img.get("alt", ""),
+                    "src": img["src"],
+                }
+                for img in self.soup.find_all("img", src=True)
+            ]
+        return self._images
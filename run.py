@@ -1,13 +1,13 @@
-#!/usr/bin/env python3
-
-"""
-DocRepo Runner Script
-
-This script is a simple way to run the DocRepo application.
-It imports and executes the main function from the docrepo module.
-"""
-
-from docrepo import main
-
-if __name__ == "__main__":
-    main() 
\ No newline at end of file
+#!/usr/bin/env python3
+
+"""
+DocRepo Runner Script
+
+This script is a simple way to run the DocRepo application.
+It imports and executes the main function from the docrepo module.
+"""
+
+from docrepo import main
+
+if __name__ == "__main__":
+    main()
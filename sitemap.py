@@ -0,0 +1,174 @@
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from http_client import HttpSession, create_session
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a sitemap <lastmod> value (W3C datetime) into a Unix timestamp.
+
+    Args:
+        value: e.g. "2024-05-01" or "2024-05-01T12:30:00+02:00"
+
+    Returns:
+        Seconds since the epoch, or None if the value is missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace from a tag."""
+    return tag.rsplit("}", 1)[-1]
+
+
+class SitemapParser:
+    def __init__(self):
+        """
+        Incremental parser for one sitemap or sitemap index.
+
+        Bytes are fed in as they arrive and entries are returned as soon as
+        their element is complete; finished elements are discarded, so memory
+        use does not grow with the size of the sitemap. Gzip-compressed
+        sitemaps are recognised by their magic bytes and decompressed on the
+        fly.
+        """
+        self._parser = ElementTree.XMLPullParser(events=("start", "end"))
+        self._decompressor = None
+        self._started = False
+        # Leading bytes held back until the gzip magic can be checked
+        self._head = b""
+        self._root = None
+        # Sitemaps listed by a sitemap index
+        self.sitemaps: List[str] = []
+
+    def feed(self, chunk: bytes) -> List[Tuple[str, Optional[float]]]:
+        """
+        Parse the next chunk of the document.
+
+        Args:
+            chunk: Raw bytes of the response body
+
+        Returns:
+            List of (page URL, lastmod timestamp) entries completed by the chunk
+        """
+        if not self._started:
+            self._head += chunk
+            if len(self._head) < len(GZIP_MAGIC):
+                return []
+            chunk, self._head = self._head, b""
+            self._started = True
+            if chunk.startswith(GZIP_MAGIC):
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._decompressor is not None:
+            chunk = self._decompressor.decompress(chunk)
+        self._parser.feed(chunk)
+        return self._read_events()
+
+    def close(self) -> List[Tuple[str, Optional[float]]]:
+        """Finish parsing and return any remaining entries."""
+        if self._head:
+            self._parser.feed(self._head)
+        if self._decompressor is not None:
+            self._parser.feed(self._decompressor.flush())
+        self._parser.close()
+        return self._read_events()
+
+    def _read_events(self) -> List[Tuple[str, Optional[float]]]:
+        """Collect <url> entries and index <sitemap> locations from parser events."""
+        entries = []
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = element
+                continue
+
+            tag = _local_name(element.tag)
+            if tag not in ("url", "sitemap"):
+                continue
+
+            loc, lastmod = None, None
+            for child in element:
+                name = _local_name(child.tag)
+                if name == "loc":
+                    loc = (child.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = parse_lastmod(child.text)
+            if loc:
+                if tag == "url":
+                    entries.append((loc, lastmod))
+                else:
+                    self.sitemaps.append(loc)
+
+            # Drop the finished entry (and any before it) from the tree
+            self._root.clear()
+        return entries
+
+
+class SitemapReader:
+    def __init__(self, session: Optional[HttpSession] = None, max_sitemaps: int = 1000):
+        """
+        Read page URLs from sitemaps, following sitemap indexes.
+
+        Args:
+            session: HTTP session used to download sitemaps
+            max_sitemaps: Maximum number of sitemap documents to read
+        """
+        self.session = session or create_session()
+        self.max_sitemaps = max_sitemaps
+
+    def iter_urls(
+        self, sitemap_urls: Iterable[str]
+    ) -> Iterator[Tuple[str, Optional[float]]]:
+        """
+        Stream the page entries of the given sitemaps.
+
+        Sitemaps that cannot be downloaded or parsed are reported and skipped;
+        entries read before a parse error are still returned.
+
+        Args:
+            sitemap_urls: URLs of sitemaps or sitemap indexes
+
+        Yields:
+            Tuples of (page URL, lastmod timestamp or None)
+        """
+        queue = deque(sitemap_urls)
+        seen = set()
+
+        while queue and len(seen) < self.max_sitemaps:
+            sitemap_url = queue.popleft()
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+
+            parser = SitemapParser()
+            try:
+                response = self.session.get(sitemap_url, stream=True)
+                try:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=65536):
+                        yield from parser.feed(chunk)
+                    yield from parser.close()
+                finally:
+                    response.close()
+            except Exception as e:
+                print(f"Warning: Could not read sitemap {sitemap_url}: {e}")
+
+            # Sitemaps listed by an index are read after the index itself
+            queue.extend(parser.sitemaps)
@@ -0,0 +1,75 @@
+import http.server
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+import pytest
+
+# A response: (status, headers, body), or a callable building one from the
+# number of times the path was requested so far
+Response = Tuple[int, Dict[str, str], bytes]
+Route = Union[Response, Callable[[int], Response]]
+
+
+class FixtureServer:
+    def __init__(self):
+        """
+        Threaded HTTP server on localhost serving canned responses.
+
+        Paths not in ``routes`` get a 404. Every request path is appended to
+        ``requests`` in the order it arrived.
+        """
+        self.routes: Dict[str, Route] = {}
+        self.requests: List[str] = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests.append(self.path)
+                    count = server.requests.count(self.path)
+                route = server.routes.get(self.path, (404, {}, b"not found"))
+                status, headers, body = route(count) if callable(route) else route
+                self.send_response(status)
+                headers = {"Content-Type": "text/html", **headers}
+                headers.setdefault("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def add_page(
+        self, path: str, title: str, links: Sequence[str] = (), body: str = ""
+    ) -> None:
+        """Serve a small HTML page with a title, links and optional extra body HTML."""
+        anchors = "".join(f'<li><a href="{link}">{link}</a></li>' for link in links)
+        html = (
+            f"<html><head><title>{title}</title></head><body><h1>{title}</h1>"
+            f"{body}<ul>{anchors}</ul></body></html>"
+        )
+        self.routes[path] = (200, {}, html.encode("utf-8"))
+
+    def url(self, path: str = "/") -> str:
+        """Return the absolute URL of a path on this server."""
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+    def close(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    fixture_server = FixtureServer()
+    yield fixture_server
+    fixture_server.close()
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import threading
+
+from docrepo import DocRepo
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x01" * 64
+
+
+def serve_site(server):
+    server.add_page(
+        "/docs/index.html",
+        "Index",
+        ["a.html", "b.html"],
+        body='<p><img src="logo.png" alt="Logo"></p>',
+    )
+    server.add_page(
+        "/docs/a.html",
+        "A",
+        ["index.html", "b.html"],
+        body='<p><img src="logo.png" alt="Logo"></p>',
+    )
+    server.add_page("/docs/b.html", "B", ["index.html"])
+    server.routes["/docs/logo.png"] = (200, {"Content-Type": "image/png"}, PNG)
+
+
+def make_repo(server, tmp_path, **kwargs):
+    return DocRepo(
+        server.url("/docs/index.html"),
+        output_dir=str(tmp_path),
+        delay=0,
+        respect_robots_txt=False,
+        concurrency=2,
+        **kwargs
+    )
+
+
+def test_pages_are_saved_off_the_event_loop(server, tmp_path):
+    serve_site(server)
+    repo = make_repo(server, tmp_path, incremental=True)
+    save_threads = []
+    save_streamed_page = repo.save_streamed_page
+
+    def record_thread(*args):
+        save_threads.append(threading.get_ident())
+        return save_streamed_page(*args)
+
+    repo.save_streamed_page = record_thread
+
+    async def run():
+        loop_thread = threading.get_ident()
+        events = [event async for event in repo.aiter_events()]
+        return loop_thread, events
+
+    loop_thread, events = asyncio.run(run())
+
+    assert [event["event"] for event in events] == ["page", "page", "page", "done"]
+    assert len(save_threads) == 3 and loop_thread not in save_threads
+    # Images queued from the worker thread were downloaded and linked
+    filename = repo.url_to_file_map[server.url("/docs/a.html")]
+    with open(os.path.join(tmp_path, filename), encoding="utf-8") as f:
+        markdown = f.read()
+    assert "](images/" in markdown
+    assert server.requests.count("/docs/logo.png") == 1
+
+
+def test_event_loop_keeps_running_while_pages_are_saved(server, tmp_path):
+    serve_site(server)
+    repo = make_repo(server, tmp_path, download_images=False)
+    save_streamed_page = repo.save_streamed_page
+    ticks_during_save = []
+    ticks = [0]
+
+    def slow_save(*args):
+        before = ticks[0]
+        threading.Event().wait(0.1)
+        ticks_during_save.append(ticks[0] - before)
+        return save_streamed_page(*args)
+
+    repo.save_streamed_page = slow_save
+
+    async def ticker():
+        while True:
+            ticks[0] += 1
+            await asyncio.sleep(0.005)
+
+    async def run():
+        task = asyncio.ensure_future(ticker())
+        await repo.arun()
+        task.cancel()
+
+    asyncio.run(run())
+    assert len(ticks_during_save) == 3
+    assert min(ticks_during_save) > 0
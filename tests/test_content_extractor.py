@@ -0,0 +1,126 @@
+import pytest
+
+from content_extractor import ContentExtractor, parse_selectors
+from page_document import PageDocument
+
+NAV = (
+    '<nav><ul><li><a href="/">Home page</a></li>'
+    '<li><a href="/docs/">Documentation</a></li></ul></nav>'
+)
+FOOTER = "<footer><p>Copyright Example Corporation, all rights reserved</p></footer>"
+
+
+def page(body, url="http://h/page.html"):
+    html = f"<html><head><title>T</title></head><body>{body}</body></html>"
+    return PageDocument(url, html, "html.parser")
+
+
+def extract(selectors, body):
+    return ContentExtractor(selectors).extract(page(body)).html
+
+
+def test_parse_selectors():
+    assert parse_selectors(" main, div.document >  div.body ,,") == [
+        "main",
+        "div.document >  div.body",
+    ]
+
+
+@pytest.mark.parametrize(
+    "selector", ["div >", "> div", "div > > p", "a:hover", "div + p", "div[x~=y]", ""]
+)
+def test_unsupported_selectors(selector):
+    with pytest.raises(ValueError):
+        ContentExtractor([selector])
+
+
+def test_first_selector_that_matches_wins():
+    body = (
+        '<div class="document">Doc</div><main>Main one</main><p>x</p>'
+        "<main>Main two</main>"
+    )
+
+    assert extract(["main", "div.document"], body) == (
+        "<main>Main one</main><main>Main two</main>"
+    )
+    assert extract(["article", "div.document"], body) == (
+        '<div class="document">Doc</div>'
+    )
+
+
+def test_page_without_a_match_is_kept_whole():
+    document = page("<p>Only text</p>")
+
+    assert ContentExtractor(["main"]).extract(document) is document
+
+
+@pytest.mark.parametrize(
+    "selector, expected",
+    [
+        ("div.a > p", "<p>child</p>"),
+        ("div.a p", "<p>child</p><p>grandchild</p>"),
+        ("#main", '<section id="main"><p>grandchild</p></section>'),
+        ("p[title=t]", '<p data-x="a > b" title=t>attr</p>'),
+        ("section[id=main] p", "<p>grandchild</p>"),
+    ],
+)
+def test_combinators_and_attributes(selector, expected):
+    body = (
+        '<div class="a b"><p>child</p>'
+        '<section id="main"><p>grandchild</p></section></div>'
+        '<p data-x="a > b" title=t>attr</p>'
+    )
+
+    assert extract([selector], body) == expected
+
+
+def test_markup_in_comments_and_scripts_is_ignored():
+    body = (
+        '<script>var s = "<main>fake</main>";</script>'
+        "<!-- <main>old</main> --><main>real</main>"
+    )
+
+    assert extract(["main"], body) == "<main>real</main>"
+
+
+def test_unclosed_element_ends_with_its_parent():
+    body = '<section><div class="content"><p>text</section><p>after</p>'
+
+    assert extract([".content"], body) == '<div class="content"><p>text'
+
+
+def test_repeated_blocks_are_removed_after_learning():
+    extractor = ContentExtractor(auto=True, sample_pages=3)
+    pages = [
+        page(f"{NAV}<main><p>Page {i} has its own text.</p></main>{FOOTER}")
+        for i in range(3)
+    ]
+    for document in pages:
+        assert not extractor.ready
+        extractor.learn(document)
+    assert extractor.ready
+
+    document = page(f"{NAV}<main><p>New page text.</p></main>{FOOTER}")
+    html = extractor.extract(document).html
+
+    assert "Documentation" not in html and "Copyright" not in html
+    assert "<main><p>New page text.</p></main>" in html
+
+
+def test_page_that_is_all_boilerplate_is_kept():
+    extractor = ContentExtractor(auto=True, sample_pages=2)
+    for _ in range(2):
+        extractor.learn(page(NAV + FOOTER))
+    document = page(NAV + FOOTER)
+
+    assert extractor.extract(document) is document
+
+
+def test_boilerplate_is_removed_inside_the_selected_content():
+    extractor = ContentExtractor(["main"], auto=True, sample_pages=2)
+    for i in range(2):
+        extractor.learn(page(f"{NAV}<main>{NAV}<p>Text number {i}</p></main>"))
+
+    html = extractor.extract(page(f"{NAV}<main>{NAV}<p>Fresh text</p></main>")).html
+
+    assert html == "<main><p>Fresh text</p></main>"
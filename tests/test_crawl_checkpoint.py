@@ -0,0 +1,85 @@
+from crawl_checkpoint import CrawlCheckpoint
+from crawler import Crawler
+
+
+def test_load_replays_queue_pages_and_failures(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path))
+    checkpoint.open()
+    enqueued = (
+        ("http://a/", 0),
+        ("http://a/x", 1),
+        ("http://a/y", 1),
+        ("http://a/z", 1),
+    )
+    for url, depth in enqueued:
+        checkpoint.record_enqueue(url, depth)
+    page = {"title": "Home", "content": "<p>hi</p>", "document": object()}
+    checkpoint.record_page("http://a/", 0, page)
+    checkpoint.record_done("http://a/y")
+    checkpoint.close()
+
+    state = CrawlCheckpoint(str(tmp_path)).load()
+    assert state["pending"] == [("http://a/x", 1), ("http://a/z", 1)]
+    assert state["seen"] == {"http://a/", "http://a/x", "http://a/y", "http://a/z"}
+    assert len(state["pages"]) == 1
+
+    url, depth, page = checkpoint.read_page(state["pages"][0])
+    assert (url, depth) == ("http://a/", 0)
+    # The parsed document is never journaled
+    assert page == {"title": "Home", "content": "<p>hi</p>"}
+
+
+def test_torn_last_line_is_dropped_on_resume(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path))
+    checkpoint.open()
+    checkpoint.record_enqueue("http://a/", 0)
+    checkpoint.record_enqueue("http://a/x", 1)
+    checkpoint.close()
+    with open(checkpoint.path, "a", encoding="utf-8") as f:
+        f.write('{"e":"page","u":"http://a/","d":0,"p":{"tit')
+
+    resumed = CrawlCheckpoint(str(tmp_path))
+    state = resumed.load()
+    assert state["pending"] == [("http://a/", 0), ("http://a/x", 1)]
+    resumed.open(resume=True)
+    resumed.record_done("http://a/")
+    resumed.close()
+
+    assert CrawlCheckpoint(str(tmp_path)).load()["pending"] == [("http://a/x", 1)]
+
+
+def make_crawler(server, tmp_path, resume):
+    checkpoint = CrawlCheckpoint(str(tmp_path), flush_every=1)
+    return Crawler(
+        server.url("/index.html"),
+        max_depth=2,
+        delay=0,
+        respect_robots_txt=False,
+        checkpoint=checkpoint,
+        resume=resume,
+    )
+
+
+def test_resumed_crawl_does_not_refetch_pages(server, tmp_path):
+    server.add_page("/index.html", "Index", ["a.html", "b.html", "c.html"])
+    for name in "abc":
+        server.add_page(f"/{name}.html", name.upper(), ["index.html"])
+
+    crawler = make_crawler(server, tmp_path, resume=False)
+    pages = crawler.iter_crawl()
+    first = [next(pages)[0], next(pages)[0]]
+    # Interrupted: the generator is abandoned without finishing the crawl
+    pages.close()
+    crawler.checkpoint.close()
+    fetched_before = list(server.requests)
+
+    resumed = make_crawler(server, tmp_path, resume=True)
+    results = dict(resumed.iter_crawl())
+
+    assert first == [server.url("/index.html"), server.url("/a.html")]
+    names = ("index.html", "a.html", "b.html", "c.html")
+    assert set(results) == {server.url(f"/{name}") for name in names}
+    assert results[server.url("/a.html")]["title"] == "A"
+    assert results[server.url("/index.html")]["document"] is not None
+    # Only the pages not fetched before the interruption were requested again
+    assert sorted(server.requests[len(fetched_before) :]) == ["/b.html", "/c.html"]
@@ -0,0 +1,103 @@
+import os
+
+from crawl_state import CrawlStateStore
+from docrepo import DocRepo
+
+MARKER = "\n<!-- kept from the first run -->\n"
+
+
+def test_store_round_trip_and_conditional_headers(tmp_path):
+    store = CrawlStateStore(str(tmp_path))
+    store.record(
+        "http://h/a",
+        '"v1"',
+        "Mon, 01 Jan 2024 00:00:00 GMT",
+        "hash",
+        "A",
+        ["http://h/b"],
+        "h_a.md",
+    )
+    store.close()
+
+    store = CrawlStateStore(str(tmp_path))
+    state = store.get("http://h/a")
+    assert (state["title"], state["links"]) == ("A", ["http://h/b"])
+    assert store.get("http://h/b") is None
+    assert store.filenames() == {"http://h/a": "h_a.md"}
+    # Without the output file a 304 could not be turned back into Markdown
+    assert store.conditional_headers("http://h/a") == {}
+    (tmp_path / "h_a.md").write_text("# A")
+    assert store.conditional_headers("http://h/a") == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+
+
+def serve_site(server):
+    server.add_page(
+        "/index.html",
+        "Index",
+        ["etag.html", "same.html", "changed.html", "listed.html"],
+    )
+    server.add_page("/etag.html", "ETag")
+    etag_page = server.routes["/etag.html"][2]
+    server.routes["/etag.html"] = lambda count: (
+        (200, {"ETag": '"v1"'}, etag_page) if count == 1 else (304, {}, b"")
+    )
+    server.add_page("/same.html", "Same")
+    server.add_page("/listed.html", "Listed")
+    server.routes["/sitemap.xml"] = (
+        200,
+        {"Content-Type": "application/xml"},
+        (
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><url>'
+            f'<loc>{server.url("/listed.html")}</loc><lastmod>2001-01-01</lastmod>'
+            "</url></urlset>"
+        ).encode(),
+    )
+
+
+def run(server, tmp_path, version):
+    server.add_page("/changed.html", "Changed", body=f"<p>Version {version}</p>")
+    repo = DocRepo(
+        server.url("/index.html"),
+        output_dir=str(tmp_path),
+        delay=0,
+        respect_robots_txt=False,
+        download_images=False,
+        incremental=True,
+        sitemap=True,
+    )
+    repo.run()
+    return {
+        path: os.path.join(tmp_path, repo.url_to_file_map[server.url(path)])
+        for path in ("/etag.html", "/same.html", "/changed.html", "/listed.html")
+    }
+
+
+def test_recrawl_reuses_unchanged_pages(server, tmp_path):
+    serve_site(server)
+    files = run(server, tmp_path, 1)
+    for filename in files.values():
+        with open(filename, "a", encoding="utf-8") as f:
+            f.write(MARKER)
+
+    files = run(server, tmp_path, 2)
+
+    def read(path):
+        with open(files[path], encoding="utf-8") as f:
+            return f.read()
+
+    # 304, same content hash, and sitemap <lastmod> older than the saved page
+    for path in ("/etag.html", "/same.html", "/listed.html"):
+        assert read(path).endswith(MARKER)
+    assert server.requests.count("/etag.html") == 2
+    assert server.requests.count("/same.html") == 2
+    assert server.requests.count("/listed.html") == 1
+    changed = read("/changed.html")
+    assert "Version 2" in changed and MARKER not in changed
+    # Reused pages are still part of the documentation
+    with open(os.path.join(tmp_path, "index.md"), encoding="utf-8") as f:
+        index = f.read()
+    for filename in files.values():
+        assert f"({os.path.basename(filename)})" in index
@@ -0,0 +1,120 @@
+import random
+
+import pytest
+
+from canonical import UrlCanonicalizer, parse_alias
+from crawler import Crawler
+from dedupe import DuplicateIndex, simhash
+
+WORDS = [f"word{i}" for i in range(400)]
+
+
+@pytest.mark.parametrize(
+    "url, canonical",
+    [
+        ("HTTP://Example.COM", "http://example.com/"),
+        ("https://example.com:443/a#top", "https://example.com/a"),
+        ("http://example.com:8080/a", "http://example.com:8080/a"),
+        ("http://user@Example.com:80/A", "http://user@example.com/A"),
+        ("http://[::1]/a", "http://[::1]/a"),
+        ("http://h/a?utm_source=x&id=1&fbclid=y&UTM_Medium=z", "http://h/a?id=1"),
+        ("http://h/a?gclid=1", "http://h/a"),
+        ("http://h/a?b=2&a=1", "http://h/a?b=2&a=1"),
+    ],
+)
+def test_canonicalize(url, canonical):
+    assert UrlCanonicalizer().canonicalize(url) == canonical
+
+
+def test_aliases_use_the_longest_matching_prefix():
+    canonicalizer = UrlCanonicalizer(
+        {
+            "/latest/": "/v3/",
+            "/latest/old/": "/v1/",
+            "http://mirror.h/": "http://h/",
+        }
+    )
+
+    assert canonicalizer.canonicalize("http://h/latest/a?utm_id=1") == "http://h/v3/a"
+    assert canonicalizer.canonicalize("http://h/latest/old/b") == "http://h/v1/b"
+    assert canonicalizer.canonicalize("http://MIRROR.h/c") == "http://h/c"
+    unchanged = "http://h/other/latest/"
+    assert canonicalizer.canonicalize(unchanged) == unchanged
+
+
+def test_parse_alias():
+    assert parse_alias("/latest/=/v3/") == ("/latest/", "/v3/")
+    assert parse_alias("http://a/=http://b/x=y") == ("http://a/", "http://b/x=y")
+    for value in ("/latest/", "=/v3/"):
+        with pytest.raises(ValueError):
+            parse_alias(value)
+
+
+def test_simhash_of_similar_texts_differs_in_few_bits():
+    text = " ".join(WORDS)
+    edited = text.replace("word200", "changed")
+
+    assert simhash(text) == simhash(text.upper())
+    assert bin(simhash(text) ^ simhash(edited)).count("1") <= 3
+    assert bin(simhash(text) ^ simhash(" ".join(reversed(WORDS)))).count("1") > 10
+    assert simhash("") == 0
+
+
+def test_exact_duplicates_point_at_the_first_page():
+    index = DuplicateIndex()
+    index.add("http://h/a", "hash1")
+
+    assert index.find("http://h/b", "hash1") == "http://h/a"
+    assert index.find("http://h/c", "hash2") is None
+    assert index.find("http://h/d", "hash2") == "http://h/c"
+
+
+@pytest.mark.parametrize("distance", [1, 3, 6])
+def test_near_duplicates_match_a_linear_scan(distance):
+    rng = random.Random(distance)
+    index = DuplicateIndex(near_distance=distance)
+    seen = []
+    for i in range(300):
+        if seen and rng.random() < 0.5:
+            # A copy of an earlier fingerprint with up to distance + 1 bits flipped
+            fingerprint = rng.choice(seen)[0]
+            for bit in rng.sample(range(64), rng.randint(0, distance + 1)):
+                fingerprint ^= 1 << bit
+        else:
+            fingerprint = rng.getrandbits(64)
+        url = f"http://h/{i}"
+
+        expected = [
+            seen_url
+            for seen_fingerprint, seen_url in seen
+            if bin(seen_fingerprint ^ fingerprint).count("1") <= distance
+        ]
+        found = index._find_near(url, fingerprint)
+        if expected:
+            assert found in expected
+        else:
+            assert found is None
+            seen.append((fingerprint, url))
+
+
+def test_crawl_maps_duplicates_to_the_first_copy(server):
+    server.add_page(
+        "/index.html", "Home", ["a.html", "copy.html", "moved.html", "print.html"]
+    )
+    server.add_page("/a.html", "A")
+    server.routes["/copy.html"] = server.routes["/a.html"]
+    server.routes["/moved.html"] = (301, {"Location": server.url("/a.html")}, b"")
+    server.add_page(
+        "/print.html",
+        "Print",
+        body=f'<link rel="canonical" href="{server.url("/a.html")}">',
+    )
+
+    results = Crawler(
+        server.url("/index.html"), max_depth=1, delay=0, respect_robots_txt=False
+    ).crawl()
+
+    a = server.url("/a.html")
+    assert results[a]["duplicate_of"] is None
+    for path in ("/copy.html", "/moved.html", "/print.html"):
+        assert results[server.url(path)]["duplicate_of"] == a
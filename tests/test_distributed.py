@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+from distributed import CrawlQueue, SharedHostRateLimiter, ShardCrawler, shard_for
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "queue.sqlite")
+
+
+def test_urls_are_claimed_by_their_shard_only(queue_path):
+    queue = CrawlQueue(queue_path, shards=3)
+    urls = [f"http://h/{i}" for i in range(30)]
+    queue.add((url, 1) for url in urls)
+    queue.add([(urls[0], 0)])
+
+    claimed = {shard: queue.claim(shard, 100) for shard in range(3)}
+
+    assert sorted(url for rows in claimed.values() for url, _ in rows) == sorted(urls)
+    for shard, rows in claimed.items():
+        assert all(shard_for(url, 3) == shard for url, _ in rows)
+    # Known URLs are not queued again, and claimed ones are not handed out twice
+    assert dict(claimed[shard_for(urls[0], 3)])[urls[0]] == 1
+    assert queue.claim(0, 100) == []
+    assert queue.unfinished() == 30
+    queue.close()
+
+
+def test_finish_queues_links_and_aliases(queue_path):
+    queue = CrawlQueue(queue_path, shards=1)
+    queue.add([("http://h/", 0)])
+    queue.claim(0, 10)
+
+    queue.finish(
+        "http://h/",
+        "Home",
+        [("http://h/a", 1), ("http://h/b", 1)],
+        {"http://h/b": "http://h/a"},
+    )
+
+    assert queue.claim(0, 10) == [("http://h/a", 1)]
+    assert queue.titles() == {"http://h/": "Home"}
+    assert queue.aliases() == {"http://h/b": "http://h/a"}
+    queue.skip("http://h/a")
+    assert queue.unfinished() == 0
+    queue.close()
+
+
+def test_settings_must_match(queue_path):
+    CrawlQueue(queue_path, shards=2).close()
+    with pytest.raises(ValueError):
+        CrawlQueue(queue_path, shards=3)
+    with pytest.raises(ValueError):
+        CrawlQueue(queue_path, shards=2, shard_by="host")
+    CrawlQueue(queue_path, shards=3, reset=True).close()
+
+
+def test_host_slots_are_shared_between_connections(queue_path):
+    first, second = CrawlQueue(queue_path, shards=2), CrawlQueue(queue_path, shards=2)
+    start = time.time()
+
+    slots = [
+        first.reserve_slot("h", 10),
+        second.reserve_slot("h", 10),
+        first.reserve_slot("other", 10),
+    ]
+
+    assert slots[0] == pytest.approx(start, abs=1)
+    assert slots[1] == pytest.approx(slots[0] + 10)
+    assert slots[2] == pytest.approx(start, abs=1)
+    assert second.next_slot("h") == pytest.approx(slots[1] + 10)
+
+    second.hold_host("h", start + 100)
+    second.hold_host("h", start + 50)
+    assert first.next_slot("h") == start + 100
+    first.close()
+    second.close()
+
+
+def test_shared_rate_limiter_spaces_shards(queue_path):
+    first = SharedHostRateLimiter(CrawlQueue(queue_path, shards=2), 5)
+    second = SharedHostRateLimiter(CrawlQueue(queue_path, shards=2), 5)
+
+    assert first.ready_in("http://h/a") == 0
+    assert first.reserve("http://h/a") == 0
+    assert second.ready_in("http://h/b") == pytest.approx(5, abs=0.5)
+    assert second.ready_in("http://other/b") == 0
+
+    # A Retry-After seen by one shard holds back the other
+    first.record("http://other/a", 503, retry_after=30)
+    first.ready_in("http://other/a")
+    assert second.ready_in("http://other/b") == pytest.approx(30, abs=0.5)
+
+
+def test_shards_keep_the_delay_between_requests_to_a_host(queue_path, server):
+    links = [f"p{i}.html" for i in range(6)]
+    server.add_page("/index.html", "Home", links)
+    for link in links:
+        server.add_page(f"/{link}", link)
+    started = []
+    for path, route in list(server.routes.items()):
+
+        def timed(count, route=route):
+            started.append(time.monotonic())
+            return route
+
+        server.routes[path] = timed
+
+    def run_shard(shard):
+        queue = CrawlQueue(queue_path, shards=2)
+        try:
+            ShardCrawler(
+                server.url("/index.html"),
+                max_depth=1,
+                delay=0.3,
+                respect_robots_txt=False,
+                concurrency=2,
+                queue=queue,
+                shard=shard,
+                poll_interval=0.05,
+            ).crawl()
+        finally:
+            queue.close()
+
+    threads = [threading.Thread(target=run_shard, args=(shard,)) for shard in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(started) == 7
+    gaps = [b - a for a, b in zip(started, started[1:])]
+    assert min(gaps) > 0.25
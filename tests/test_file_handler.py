@@ -0,0 +1,85 @@
+import itertools
+
+import pytest
+
+from distributed import CrawlQueue, SharedFilenameAllocator
+from file_handler import FileHandler, FilenameAllocator, hashed_filename
+
+# URLs that all sanitize to h_a.md
+COLLIDING = ["http://h/a", "http://h/a/", "http://h/a.md", "http://h/a?"]
+
+
+@pytest.fixture
+def handler(tmp_path):
+    handler = FileHandler(str(tmp_path), hash_suffix=True)
+    yield handler
+    handler.close()
+
+
+def test_counters_skip_reserved_names():
+    filenames = FilenameAllocator()
+    filenames.reserve("page_2.md")
+
+    names = [filenames.allocate("page.md", str(i)) for i in range(4)]
+
+    assert names == ["page.md", "page_1.md", "page_3.md", "page_4.md"]
+
+
+def test_ambiguous_keys_always_get_the_hashed_name():
+    filenames = FilenameAllocator(hash_suffix=True)
+
+    first = filenames.allocate("page.md", "x", ambiguous=True)
+    assert first == hashed_filename("page.md", "x")
+    assert filenames.allocate("page.md", "y") == "page.md"
+    assert filenames.allocate("page.md", "z") == hashed_filename("page.md", "z")
+
+
+@pytest.mark.parametrize(
+    "url, ambiguous",
+    [
+        ("http://h/", False),
+        ("http://h/docs/api.html", False),
+        ("http://h/docs/", True),
+        ("http://h/docs_api", True),
+        ("http://h/docs//api", True),
+        ("http://h/a?x=1", True),
+        ("http://h/index", True),
+        ("http://h:8080/docs", True),
+        ("http://h/caf%C3%A9", True),
+        ("http://h/" + "a" * 200, True),
+    ],
+)
+def test_filename_may_collide(handler, url, ambiguous):
+    assert handler.filename_may_collide(url) == ambiguous
+
+
+def test_hashed_names_do_not_depend_on_crawl_order(tmp_path):
+    results = set()
+    for order in itertools.permutations(COLLIDING):
+        handler = FileHandler(str(tmp_path / str(len(results))), hash_suffix=True)
+        try:
+            names = {url: handler.generate_unique_filename(url) for url in order}
+        finally:
+            handler.close()
+        results.add(tuple(sorted(names.items())))
+
+    assert len(results) == 1
+    names = dict(results.pop())
+    assert names["http://h/a"] == "h_a.md"
+    assert len(set(names.values())) == len(COLLIDING)
+
+
+def test_shared_allocator_matches_local_allocator(tmp_path):
+    queue = CrawlQueue(str(tmp_path / "queue.sqlite"), shards=2)
+    try:
+        shared = SharedFilenameAllocator(queue, hash_suffix=True)
+        local = FilenameAllocator(hash_suffix=True)
+        for url in reversed(COLLIDING):
+            ambiguous = url != "http://h/a"
+            assert shared.allocate("h_a.md", url, ambiguous) == local.allocate(
+                "h_a.md", url, ambiguous
+            )
+        # A URL keeps the name it was given first
+        assert shared.allocate("other.md", "http://h/a") == "h_a.md"
+    finally:
+        queue.close()
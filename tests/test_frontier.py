@@ -0,0 +1,71 @@
+from crawler import Crawler
+from frontier import Frontier
+from url_registry import UrlRegistry
+
+
+def test_duplicates_are_queued_once():
+    frontier = Frontier()
+
+    assert frontier.add("http://h/a", 0)
+    assert frontier.add("http://h/b", 1)
+    assert not frontier.add("http://h/a", 1)
+    assert not frontier.add("http://h/b", 2)
+
+    assert frontier.pop() == ("http://h/a", 0)
+    # Popped URLs stay seen
+    assert not frontier.add("http://h/a", 3)
+    assert "http://h/a" in frontier and "http://h/c" not in frontier
+    assert frontier.stats() == {
+        "queued": 1,
+        "max_queued": 2,
+        "unique_urls": 2,
+        "duplicates_suppressed": 3,
+    }
+    assert frontier.depth_counts == {0: 1, 1: 1}
+
+
+def test_urls_come_out_in_discovery_order():
+    registry = UrlRegistry()
+    frontier = Frontier(registry)
+    for url, depth in [
+        ("http://h/", 0),
+        ("http://h/a", 1),
+        ("http://h/b", 1),
+        ("http://h/a/x", 2),
+    ]:
+        frontier.add(url, depth)
+
+    popped = [frontier.pop() for _ in range(len(frontier))]
+
+    assert popped == [
+        ("http://h/", 0),
+        ("http://h/a", 1),
+        ("http://h/b", 1),
+        ("http://h/a/x", 2),
+    ]
+    assert len(registry) == 4 and len(frontier) == 0
+
+
+def test_crawl_is_breadth_first_and_stops_at_max_depth(server):
+    server.add_page("/index.html", "Index", ["a.html", "b.html", "a.html"])
+    server.add_page("/a.html", "A", ["index.html", "a1.html", "b.html"])
+    server.add_page("/b.html", "B", ["b1.html", "a.html"])
+    server.add_page("/a1.html", "A1", ["deep.html"])
+    server.add_page("/b1.html", "B1", ["deep.html"])
+    server.add_page("/deep.html", "Deep")
+
+    results = Crawler(
+        server.url("/index.html"), max_depth=2, delay=0, respect_robots_txt=False
+    ).crawl()
+
+    assert server.requests == [
+        "/index.html",
+        "/a.html",
+        "/b.html",
+        "/a1.html",
+        "/b1.html",
+    ]
+    assert sorted(results) == sorted(
+        server.url(path)
+        for path in ("/index.html", "/a.html", "/b.html", "/a1.html", "/b1.html")
+    )
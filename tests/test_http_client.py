@@ -0,0 +1,157 @@
+import pytest
+
+from crawler import Crawler
+from docrepo import DocRepo
+from http_client import (
+    DEFAULT_TIMEOUT,
+    SNIFF_BYTES,
+    USER_AGENT,
+    HtmlBodyReader,
+    ResponseRejected,
+    create_session,
+)
+from metrics import Metrics
+
+HTML = "<html><head><title>Café</title></head><body>Ünïcödé</body></html>"
+
+
+def read(headers, body, max_bytes=None, chunk_size=7):
+    reader = HtmlBodyReader(headers, max_bytes)
+    for start in range(0, len(body), chunk_size):
+        reader.feed(body[start : start + chunk_size])
+    return reader.text()
+
+
+@pytest.mark.parametrize(
+    "content_type", ["application/pdf", "image/png", "text/css; charset=utf-8"]
+)
+def test_other_content_types_are_rejected_from_the_headers(content_type):
+    with pytest.raises(ResponseRejected):
+        HtmlBodyReader({"Content-Type": content_type})
+
+
+def test_announced_size_over_the_limit_is_rejected_from_the_headers():
+    headers = {"Content-Type": "text/html", "Content-Length": "2000"}
+
+    with pytest.raises(ResponseRejected):
+        HtmlBodyReader(headers, max_bytes=1000)
+    assert read(headers, b"<html></html>", max_bytes=None) == "<html></html>"
+
+
+def test_body_growing_past_the_limit_is_rejected():
+    reader = HtmlBodyReader({"Content-Type": "text/html"}, max_bytes=100)
+    reader.feed(b"x" * 100)
+
+    with pytest.raises(ResponseRejected):
+        reader.feed(b"x")
+
+
+@pytest.mark.parametrize("content_type", ["", "text/plain", "application/octet-stream"])
+def test_missing_content_type_is_sniffed(content_type):
+    headers = {"Content-Type": content_type} if content_type else {}
+    body = b"\n  <!DOCTYPE html>" + HTML.encode("utf-8")
+
+    assert read(headers, body) == body.decode("utf-8")
+    with pytest.raises(ResponseRejected):
+        read(headers, b"%PDF-1.7 " * 200)
+
+
+def test_long_sniffed_body_is_decoded_whole():
+    body = ("<html>" + "é" * SNIFF_BYTES * 2 + "</html>").encode("utf-8")
+
+    assert read({}, body, chunk_size=100) == body.decode("utf-8")
+
+
+@pytest.mark.parametrize(
+    "headers, body",
+    [
+        ({"Content-Type": 'text/html; charset="ISO-8859-1"'}, HTML.encode("latin-1")),
+        (
+            {"Content-Type": "text/html"},
+            b'<meta charset="windows-1252">' + HTML.encode("cp1252"),
+        ),
+        ({"Content-Type": "text/html;charset=utf-8"}, b"\xef\xbb\xbf" + HTML.encode()),
+        ({"Content-Type": "text/html"}, b"\xef\xbb\xbf" + HTML.encode()),
+        ({"Content-Type": "text/html; charset=unknown-charset"}, HTML.encode()),
+    ],
+)
+def test_charset_from_headers_meta_or_bom(headers, body):
+    assert read(headers, body).endswith(HTML)
+    assert not read(headers, body).startswith("\ufeff")
+
+
+def test_crawl_skips_rejected_responses(server):
+    server.add_page("/index.html", "Home", ["doc.pdf", "big.html", "ok.html"])
+    server.routes["/doc.pdf"] = (200, {"Content-Type": "application/pdf"}, b"%PDF-1.7")
+    server.add_page("/big.html", "Big", body="x" * 5000)
+    server.add_page("/ok.html", "OK")
+    metrics = Metrics()
+
+    results = Crawler(
+        server.url("/index.html"),
+        max_depth=1,
+        delay=0,
+        respect_robots_txt=False,
+        max_page_bytes=4000,
+        metrics=metrics,
+    ).crawl()
+
+    assert sorted(results) == [server.url("/index.html"), server.url("/ok.html")]
+    assert metrics.counters['pages_skipped_total{reason="rejected"}'] == 2
+
+
+def test_session_pool_size_and_default_timeout(server):
+    server.add_page("/index.html", "Home")
+    session = create_session(concurrency=25, timeout=5)
+    adapter = session.get_adapter("http://example.com/")
+    timeouts = []
+    send = adapter.send
+
+    def record_timeout(request, **kwargs):
+        timeouts.append(kwargs["timeout"])
+        return send(request, **kwargs)
+
+    adapter.send = record_timeout
+    session.get(server.url("/index.html"))
+    session.get(server.url("/index.html"), timeout=1)
+
+    assert adapter is session.get_adapter("https://example.com/")
+    assert adapter._pool_maxsize == 25
+    assert create_session().get_adapter("http://h/")._pool_maxsize == 10
+    assert timeouts == [(DEFAULT_TIMEOUT[0], 5), 1]
+    assert create_session().timeout == DEFAULT_TIMEOUT
+    assert session.headers["User-Agent"] == USER_AGENT
+
+
+def test_pages_and_images_share_one_session(server, tmp_path):
+    server.add_page(
+        "/docs/index.html", "Home", ["a.html"], body='<img src="logo.png" alt="Logo">'
+    )
+    server.add_page("/docs/a.html", "A")
+    server.routes["/docs/logo.png"] = (
+        200,
+        {"Content-Type": "image/png"},
+        b"\x89PNG\r\n\x1a\n" + b"\x03" * 64,
+    )
+    repo = DocRepo(
+        server.url("/docs/index.html"),
+        output_dir=str(tmp_path),
+        delay=0,
+        respect_robots_txt=False,
+    )
+    adapter = repo.session.get_adapter(server.url())
+    sent = []
+    send = adapter.send
+
+    def record_url(request, **kwargs):
+        sent.append(request.path_url)
+        return send(request, **kwargs)
+
+    adapter.send = record_url
+
+    repo.run()
+
+    assert repo.crawler.session is repo.session
+    assert repo.image_downloader.session is repo.session
+    assert repo.file_handler.session is repo.session
+    assert sorted(sent) == ["/docs/a.html", "/docs/index.html", "/docs/logo.png"]
@@ -0,0 +1,59 @@
+import os
+
+from http_client import create_session
+from image_downloader import ImageDownloader
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 200
+
+
+def make_downloader(tmp_path, **kwargs):
+    return ImageDownloader(str(tmp_path), session=create_session(), workers=2, **kwargs)
+
+
+def test_accept_ignores_malformed_content_length(tmp_path):
+    downloader = make_downloader(tmp_path, max_bytes=100)
+    try:
+        for value in ("abc", "12 34", "-5", ""):
+            assert downloader._accept("http://x/a.png", {"Content-Length": value})
+        assert not downloader._accept("http://x/a.png", {"Content-Length": "101"})
+        assert downloader._accept("http://x/a.png", {"Content-Length": " 100 "})
+    finally:
+        downloader.close()
+
+
+def test_malformed_content_length_falls_back_to_streaming_cap(tmp_path, server):
+    # Connection: close lets the client read the body without a usable length
+    headers = {
+        "Content-Type": "image/png",
+        "Content-Length": "lots",
+        "Connection": "close",
+    }
+    server.routes["/big.png"] = (200, headers, PNG)
+    server.routes["/small.png"] = (200, headers, PNG[:50])
+    downloader = make_downloader(tmp_path, max_bytes=100)
+    try:
+        downloader.submit(server.url("/big.png"))
+        downloader.submit(server.url("/small.png"))
+        stored = downloader.wait()
+    finally:
+        downloader.close()
+
+    assert server.url("/big.png") not in stored
+    local_path = stored[server.url("/small.png")]
+    with open(os.path.join(tmp_path, local_path), "rb") as f:
+        assert f.read() == PNG[:50]
+
+
+def test_identical_images_are_stored_once(tmp_path, server):
+    server.routes["/a.png"] = (200, {"Content-Type": "image/png"}, PNG)
+    server.routes["/b.png"] = (200, {"Content-Type": "image/png"}, PNG)
+    downloader = make_downloader(tmp_path)
+    try:
+        downloader.submit(server.url("/a.png"))
+        downloader.submit(server.url("/b.png"))
+        stored = downloader.wait()
+    finally:
+        downloader.close()
+
+    assert stored[server.url("/a.png")] == stored[server.url("/b.png")]
+    assert stored[server.url("/a.png")].endswith(".png")
@@ -0,0 +1,103 @@
+import json
+import os
+
+from index_builder import IndexBuilder
+
+PAGES = [
+    ("http://h/", "Home", "h_index.md"),
+    ("http://h/docs/intro.html", "Intro", "h_docs_intro.html.md"),
+    ("http://h/docs/api/a.html", "A", "h_docs_api_a.html.md"),
+    ("http://h/docs/api/v1/b.html", "B", "h_docs_api_v1_b.html.md"),
+    ("http://h/blog/post.html", "Post", "h_blog_post.html.md"),
+]
+
+
+def build(output_dir, pages=PAGES, **kwargs):
+    builder = IndexBuilder(str(output_dir), **kwargs)
+    for url, title, filename in pages:
+        builder.add(url, title, filename)
+    return builder.close()
+
+
+def read(output_dir, filename):
+    with open(os.path.join(output_dir, filename), encoding="utf-8") as f:
+        return f.read()
+
+
+def files(output_dir):
+    paths = (
+        os.path.relpath(os.path.join(dirpath, name), output_dir)
+        for dirpath, _, names in os.walk(output_dir)
+        for name in names
+    )
+    return sorted(path.replace(os.sep, "/") for path in paths)
+
+
+def test_section_path():
+    builder = IndexBuilder("unused", depth=2)
+
+    assert builder.section_path("http://h/page.html") == ()
+    assert builder.section_path("http://h/docs/") == ("docs",)
+    assert builder.section_path("http://h/a/b/c/page.html") == ("a", "b")
+    assert builder.section_path("http://h/my docs/..//page") == ("my_docs",)
+
+
+def test_sections_link_to_parents_children_and_pages(tmp_path):
+    assert build(tmp_path) == "index.md"
+
+    assert files(tmp_path) == [
+        "index.md",
+        "index/blog.md",
+        "index/docs.md",
+        "index/docs/api.md",
+    ]
+    assert read(tmp_path, "index.md") == (
+        "# Documentation Repository Index\n\n"
+        "## Sections\n\n"
+        "- [blog](index/blog.md) (1 page)\n"
+        "- [docs](index/docs.md) (3 pages)\n"
+        "\n## Pages\n\n"
+        "- [Home](h_index.md)\n"
+    )
+    assert read(tmp_path, "index/docs/api.md") == (
+        "# docs/api\n\n"
+        "Up: [docs](../../index/docs.md)\n\n"
+        "- [A](../../h_docs_api_a.html.md)\n"
+        "- [B](../../h_docs_api_v1_b.html.md)\n"
+    )
+    docs = read(tmp_path, "index/docs.md")
+    assert "- [api](../index/docs/api.md) (2 pages)\n" in docs
+
+
+def test_spilled_entries_keep_their_order(tmp_path):
+    pages = [(f"http://h/docs/{i}.html", f"Page {i}", f"{i}.md") for i in range(7)]
+
+    build(tmp_path, pages, buffer_size=2)
+
+    entries = read(tmp_path, "index/docs.md").split("\n\n")[-1]
+    assert entries == "".join(f"- [Page {i}](../{i}.md)\n" for i in range(7))
+    assert files(tmp_path) == ["index.md", "index/docs.md"]
+
+
+def test_flat_index(tmp_path):
+    build(tmp_path, depth=0)
+
+    assert files(tmp_path) == ["index.md"]
+    assert read(tmp_path, "index.md").count("\n- [") == len(PAGES)
+
+
+def test_manifest_and_stale_files(tmp_path):
+    build(tmp_path, manifest=True)
+
+    with open(tmp_path / "index.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+    titles = [page["title"] for page in manifest["pages"]]
+    assert titles == ["Home", "Intro", "A", "B", "Post"]
+    assert manifest["pages"][3]["section"] == "index/docs/api.md"
+    sections = {section["path"]: section for section in manifest["sections"]}
+    assert sections["docs"]["total"] == 3
+    assert sections["docs"]["sections"] == ["index/docs/api.md"]
+
+    # A later build drops sections and the manifest it no longer writes
+    build(tmp_path, PAGES[:2])
+    assert files(tmp_path) == ["index.md", "index/docs.md"]
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pytest
+
+from markdown_backends import BACKENDS, MarkdownBackend, create_backend
+from page_document import PageDocument
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from bench_markdown import BASE_URL, CORPUS, normalize  # noqa: E402
+
+# Normalized output every backend must produce (see bench_markdown.normalize)
+EXPECTED = {
+    "headings": [
+        ("heading", 1, "Title"),
+        ("text", "Intro"),
+        ("heading", 2, "Section _two_"),
+        ("heading", 3, "Three"),
+        ("text", "Body"),
+    ],
+    "links": [
+        (
+            "text",
+            "See [the guide](guide.html), [API](/api/) and "
+            "[elsewhere](https://example.org/x?a=1#top).",
+        )
+    ],
+    "table": [("row", ("Name", "Value")), ("row", ("a", "1")), ("row", ("`b`", "_2_"))],
+    "table_sections": [("row", ("Key", "Description")), ("row", ("x", "The x axis"))],
+    "code_block": [
+        ("text", "Example:"),
+        ("code", "def f(x):\n    return x * 2\n\nprint(f(3))"),
+        ("text", "Done."),
+    ],
+    "code_language": [("code", "import os\nprint(os.sep)")],
+    "images": [
+        ("text", "![Logo](images/logo.png) and![](/static/a.svg)"),
+        ("text", "[![Thumb](thumb.png)](big.html)"),
+    ],
+}
+
+
+def convert(backend, case):
+    html = f"<html><head><title>{case}</title></head><body>{CORPUS[case]}</body></html>"
+    return create_backend(backend).convert(PageDocument(BASE_URL, html, "html.parser"))
+
+
+@pytest.mark.parametrize("case", sorted(CORPUS))
+def test_backends_agree_on_corpus(case):
+    outputs = {backend: normalize(convert(backend, case)) for backend in BACKENDS}
+
+    assert outputs["tree"] == outputs["html2text"]
+
+
+@pytest.mark.parametrize("case", sorted(EXPECTED))
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_corpus_output(backend, case):
+    assert normalize(convert(backend, case)) == EXPECTED[case]
+
+
+def test_tree_backend_layout():
+    assert convert("tree", "code_language") == (
+        "```python\nimport os\nprint(os.sep)\n```\n"
+    )
+    assert convert("tree", "table_sections") == (
+        "| Key | Description |\n|---|---|\n| x | The x axis |\n"
+    )
+
+
+def test_unknown_backend():
+    assert type(create_backend(None)) is BACKENDS["html2text"]
+    with pytest.raises(ValueError):
+        create_backend("pandoc")
+
+
+def test_backend_without_convert_cannot_be_created():
+    class Incomplete(MarkdownBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,105 @@
+import os
+import sys
+
+import pytest
+
+from markdown_converter import ConversionPool, MarkdownConverter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from fixture_site import FixtureSite  # noqa: E402
+
+PAGE = "https://ex.com/docs/page.html"
+LINK_MAP = {"https://ex.com/home": "home.md", "https://ex.com/docs/a.html": "a.md"}
+
+
+def rewrite(markdown, images=None, **kwargs):
+    handled = []
+
+    def image_handler(url):
+        handled.append(url)
+        return (images or {}).get(url)
+
+    converter = MarkdownConverter(LINK_MAP, image_handler=image_handler)
+    return converter.rewrite_links(markdown, PAGE, **kwargs), handled
+
+
+def test_links_and_images_are_rewritten():
+    markdown, handled = rewrite(
+        "See [A](a.html#part), [B](<b.html>) and ![fig](img/f.png) [](/home)",
+        images={"https://ex.com/docs/img/f.png": "images/f.png"},
+    )
+
+    assert markdown == (
+        "See [A](a.md#part), [B](<b.html>) and ![fig](images/f.png) [](/home)"
+    )
+    assert handled == ["https://ex.com/docs/img/f.png"]
+
+
+def test_linked_images_are_rewritten():
+    markdown, handled = rewrite(
+        "[![logo](/img/logo.png)](/home) and ![a](/img/b.png) "
+        "[![icon](/img/i.png) Home](/elsewhere)",
+        images={
+            "https://ex.com/img/logo.png": "images/logo.png",
+            "https://ex.com/img/i.png": "images/i.png",
+        },
+    )
+
+    assert markdown == (
+        "[![logo](images/logo.png)](home.md) and ![a](/img/b.png) "
+        "[![icon](images/i.png) Home](/elsewhere)"
+    )
+    assert handled == [
+        "https://ex.com/img/logo.png",
+        "https://ex.com/img/b.png",
+        "https://ex.com/img/i.png",
+    ]
+
+
+def test_unresolved_links_and_pending_images_are_collected():
+    unresolved, pending = set(), set()
+
+    rewrite(
+        "[![x](x.png)](later.html) [out](https://other.org/) [home](/home)",
+        unresolved=unresolved,
+        pending_images=pending,
+    )
+
+    assert unresolved == {"https://ex.com/docs/later.html"}
+    assert pending == {"https://ex.com/docs/x.png"}
+
+
+def test_only_rewrites_the_given_targets():
+    markdown, _ = rewrite(
+        "[A](a.html) [![logo](/l.png)](/home)",
+        images={"https://ex.com/l.png": "l.png"},
+        only={"https://ex.com/home"},
+    )
+
+    assert markdown == "[A](a.html) [![logo](/l.png)](home.md)"
+
+
+@pytest.mark.parametrize("backend", ["html2text", "tree"])
+def test_pool_matches_serial_conversion_in_order(backend):
+    site = FixtureSite(pages=12, fanout=5, page_size=3000, images_per_page=2)
+    base = "http://docs.example.com/docs/"
+    pages = [
+        (f"{base}page{n}.html", site.render_page(n).decode("utf-8")) for n in range(12)
+    ]
+    # Half of the pages are mapped, so some links stay unresolved
+    link_map = {f"{base}page{n}.html": f"page{n}.md" for n in range(0, 12, 2)}
+    serial = MarkdownConverter(link_map, backend=backend)
+    expected = []
+    for url, html in pages:
+        images = set()
+        expected.append(
+            (serial.convert_html_to_markdown(html, url, pending_images=images), images)
+        )
+
+    with ConversionPool(link_map, workers=3, chunksize=2, backend=backend) as pool:
+        converted = list(pool.convert(pages))
+
+    assert converted == expected
+    assert all(f"# Page {n}\n" in markdown for n, (markdown, _) in enumerate(converted))
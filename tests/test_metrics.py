@@ -0,0 +1,110 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics import NULL_METRICS, Histogram, Metrics, metric_key
+
+
+def test_metric_key_sorts_labels():
+    assert metric_key("pages_total", {}) == "pages_total"
+    assert metric_key("errors_total", {"type": "Timeout", "stage": "fetch"}) == (
+        'errors_total{stage="fetch",type="Timeout"}'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.0, 10.0))
+    for value in (0.05, 0.1, 0.5, 2.0, 50.0):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+
+    assert snapshot["buckets"] == {"0.1": 2, "1.0": 3, "10.0": 4}
+    assert snapshot["count"] == 5
+    assert snapshot["sum"] == pytest.approx(52.65)
+    assert snapshot["mean"] == pytest.approx(10.53)
+    assert (snapshot["min"], snapshot["max"]) == (0.05, 50.0)
+    assert Histogram().snapshot()["mean"] == 0.0
+
+
+def make_metrics():
+    metrics = Metrics()
+    metrics.inc("pages_total")
+    metrics.inc("pages_total", 2)
+    metrics.inc("responses_total", status="200")
+    metrics.inc("responses_total", status="404")
+    metrics.observe("fetch_seconds", 0.003)
+    metrics.observe("fetch_seconds", 60.0)
+    metrics.observe("stage_seconds", 0.2, stage="crawl")
+    return metrics
+
+
+def test_prometheus_exposition():
+    lines = make_metrics().to_prometheus().splitlines()
+
+    assert lines[:6] == [
+        "# TYPE docrepo_pages_total counter",
+        "docrepo_pages_total 3",
+        "# TYPE docrepo_responses_total counter",
+        'docrepo_responses_total{status="200"} 1',
+        'docrepo_responses_total{status="404"} 1',
+        "# TYPE docrepo_fetch_seconds histogram",
+    ]
+    assert 'docrepo_fetch_seconds_bucket{le="0.001"} 0' in lines
+    assert 'docrepo_fetch_seconds_bucket{le="0.005"} 1' in lines
+    assert 'docrepo_fetch_seconds_bucket{le="30.0"} 1' in lines
+    assert 'docrepo_fetch_seconds_bucket{le="+Inf"} 2' in lines
+    assert "docrepo_fetch_seconds_sum 60.003" in lines
+    assert "docrepo_fetch_seconds_count 2" in lines
+    assert 'docrepo_stage_seconds_bucket{stage="crawl",le="0.25"} 1' in lines
+    assert 'docrepo_stage_seconds_bucket{stage="crawl",le="+Inf"} 1' in lines
+    assert 'docrepo_stage_seconds_count{stage="crawl"} 1' in lines
+    assert lines.count("# TYPE docrepo_stage_seconds histogram") == 1
+
+
+def test_json_export(tmp_path):
+    metrics = make_metrics()
+    with metrics.time("convert_seconds", backend="tree"):
+        pass
+    path = tmp_path / "metrics.json"
+
+    metrics.write_json(str(path))
+
+    with open(path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    assert snapshot["counters"] == {
+        "pages_total": 3,
+        'responses_total{status="200"}': 1,
+        'responses_total{status="404"}': 1,
+    }
+    assert list(snapshot["histograms"]) == [
+        'convert_seconds{backend="tree"}',
+        "fetch_seconds",
+        'stage_seconds{stage="crawl"}',
+    ]
+    assert snapshot["histograms"]["fetch_seconds"]["buckets"]["30.0"] == 1
+    assert snapshot["elapsed_seconds"] >= 0
+
+
+def test_metrics_are_served_over_http():
+    metrics = make_metrics()
+    metrics.serve(0)
+    try:
+        host, port = metrics._server.server_address
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert response.read().decode("utf-8") == metrics.to_prometheus()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://{host}:{port}/other")
+    finally:
+        metrics.close()
+    assert metrics._server is None
+
+
+def test_null_metrics_record_nothing():
+    with NULL_METRICS.time("stage_seconds", stage="crawl"):
+        NULL_METRICS.inc("pages_total")
+        NULL_METRICS.observe("fetch_seconds", 1.0)
+    assert not NULL_METRICS.enabled
@@ -0,0 +1,133 @@
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from crawl_state import CrawlStateStore
+from docrepo import DocRepo
+from metrics import Metrics
+from output_writer import OutputWriter, archive_mode, write_archive
+
+
+def read_file(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_queued_content_is_readable_before_it_is_written(tmp_path):
+    writer = OutputWriter(str(tmp_path))
+    try:
+        writer.write("a.md", "first")
+        writer.write("a.md", "second")
+        assert writer.read("a.md") == "second"
+        writer.flush()
+        assert read_file(tmp_path / "a.md") == "second"
+        assert writer.read("a.md") == "second"
+    finally:
+        writer.close()
+
+
+def test_unchanged_files_are_not_rewritten(tmp_path):
+    (tmp_path / "a.md").write_text("same", encoding="utf-8")
+    inode = os.stat(tmp_path / "a.md").st_ino
+    metrics = Metrics()
+    writer = OutputWriter(str(tmp_path), metrics=metrics)
+    try:
+        writer.write("a.md", "same")
+        writer.flush()
+        assert os.stat(tmp_path / "a.md").st_ino == inode
+
+        writer.write("a.md", "changed")
+        writer.flush()
+        assert read_file(tmp_path / "a.md") == "changed"
+        # Replaced by a rename, with no temporary file left behind
+        assert os.stat(tmp_path / "a.md").st_ino != inode
+        assert sorted(os.listdir(tmp_path)) == ["a.md"]
+
+        writer.write("a.md", "changed")
+        writer.flush()
+    finally:
+        writer.close()
+    assert metrics.counters["writes_skipped_total"] == 2
+
+
+def test_write_errors_are_recorded(tmp_path):
+    writer = OutputWriter(str(tmp_path))
+    writer.write("missing/a.md", "text")
+    writer.write("b.md", "text")
+    errors = writer.close()
+
+    assert [filename for filename, _ in errors] == ["missing/a.md"]
+    assert read_file(tmp_path / "b.md") == "text"
+    with pytest.raises(FileNotFoundError):
+        writer.read("missing/a.md")
+
+
+def test_run_fails_when_pages_are_not_written(server, tmp_path, monkeypatch):
+    server.add_page("/docs/index.html", "Index", ["a.html"])
+    server.add_page("/docs/a.html", "A")
+    replace = os.replace
+
+    def read_only_replace(source, target):
+        if target.endswith("a.html.md"):
+            raise PermissionError("read-only file")
+        replace(source, target)
+
+    monkeypatch.setattr(os, "replace", read_only_replace)
+    repo = DocRepo(
+        server.url("/docs/index.html"),
+        output_dir=str(tmp_path),
+        delay=0,
+        respect_robots_txt=False,
+        download_images=False,
+        incremental=True,
+    )
+
+    with pytest.raises(RuntimeError, match="1 files could not be written"):
+        repo.run()
+
+    # The next incremental run regenerates the page instead of trusting the disk
+    store = CrawlStateStore(str(tmp_path))
+    assert store.get(server.url("/docs/a.html")) is None
+    assert store.get(server.url("/docs/index.html")) is not None
+
+
+def test_close_writes_remaining_files(tmp_path):
+    writer = OutputWriter(str(tmp_path), batch_size=2, max_pending=4)
+    for i in range(20):
+        writer.write(f"{i}.md", str(i))
+    writer.close()
+    writer.close()
+
+    assert all(read_file(tmp_path / f"{i}.md") == str(i) for i in range(20))
+
+
+def test_archive_mode():
+    assert archive_mode("site.ZIP") == (True, None)
+    assert archive_mode("site.tar.gz") == (False, "w:gz")
+    assert archive_mode("site.tgz") == (False, "w:gz")
+    with pytest.raises(ValueError):
+        archive_mode("site.rar")
+
+
+@pytest.mark.parametrize("name", ["site.zip", "site.tar.xz"])
+def test_write_archive_leaves_out_hidden_files(tmp_path, name):
+    output_dir = tmp_path / "docs"
+    (output_dir / "guide").mkdir(parents=True)
+    (output_dir / "index.md").write_text("index")
+    (output_dir / "guide" / "a.md").write_text("a")
+    (output_dir / ".crawl_state.db").write_text("state")
+    (output_dir / ".images").mkdir()
+    (output_dir / ".images" / "x.png").write_text("x")
+    path = str(tmp_path / name)
+
+    assert write_archive(str(output_dir), path) == 2
+
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            names = archive.namelist()
+    else:
+        with tarfile.open(path) as archive:
+            names = archive.getnames()
+    assert sorted(names) == ["docs/guide/a.md", "docs/index.md"]
@@ -0,0 +1,112 @@
+import os
+import sys
+from urllib.parse import urljoin
+
+import pytest
+
+from crawler import Crawler
+from markdown_converter import MarkdownConverter
+from page_document import PageDocument, PageScanner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from bench_extract import (  # noqa: E402
+    BASE_URL,
+    extract_with_scanner,
+    extract_with_soup,
+)
+from fixture_site import FixtureSite  # noqa: E402
+
+# Pages where a quick scan is easy to get wrong
+TRICKY_PAGES = [
+    '<html><head></head><body><a href="a.html">A</a></body></html>',
+    '<title>Unclosed <a href="x.html">x</a>',
+    '<title>A &amp; B</title><title>Second</title><a href="a.html" href="b.html">',
+    '<base href="/other/"><base href="/ignored/"><a href="a.html"></a><a>no href</a>',
+    '<BASE HREF="sub/"><A HREF="../b.html?x=1#frag">B</A><a href="">self</a>',
+    '<!-- <title>Commented</title> <a href="c.html"> --><title>Real</title>',
+    '<script>var a = "<a href=\'s.html\'>";</script><a href="ok.html">ok</a>',
+]
+
+
+@pytest.mark.parametrize("html", TRICKY_PAGES)
+def test_scanner_matches_a_tree_search(html):
+    crawler = Crawler(BASE_URL, respect_robots_txt=False)
+
+    assert extract_with_scanner(
+        crawler, BASE_URL, html, "html.parser"
+    ) == extract_with_soup(crawler, BASE_URL, html, "html.parser")
+
+
+def test_scanner_matches_a_tree_search_on_fixture_pages():
+    site = FixtureSite(pages=5, fanout=50, page_size=4000, images_per_page=2)
+    crawler = Crawler(BASE_URL, respect_robots_txt=False)
+    for n in range(5):
+        url = urljoin(BASE_URL, f"page{n}.html")
+        html = site.render_page(n).decode("utf-8")
+
+        assert extract_with_scanner(
+            crawler, url, html, "html.parser"
+        ) == extract_with_soup(crawler, url, html, "html.parser")
+
+
+def test_scanner_reads_title_base_canonical_and_links():
+    scanner = PageScanner().scan(
+        '<head><title>Guide</title><base href="/v2/">'
+        '<link rel="Alternate Canonical" href="guide.html"></head>'
+        '<body><a href="a.html">A</a><a name="x">anchor</a><a href="">top</a>'
+    )
+
+    assert scanner.title == "Guide"
+    assert scanner.base_href == "/v2/"
+    assert scanner.canonical_href == "guide.html"
+    assert scanner.hrefs == ["a.html", ""]
+
+
+def test_base_href_resolves_links_images_and_canonical():
+    document = PageDocument(
+        "http://h/docs/page.html",
+        '<head><base href="../v2/"><link rel="canonical" href="page.html"></head>'
+        '<body><a href="a.html#x">A</a><a href="/root.html">R</a>'
+        '<img src="img/f.png" alt="F"></body>',
+        "html.parser",
+    )
+
+    assert document.base_url == "http://h/v2/"
+    assert document.links() == ["http://h/v2/a.html#x", "http://h/root.html"]
+    assert document.canonical_url == "http://h/v2/page.html"
+    assert document.images == [
+        {"url": "http://h/v2/img/f.png", "alt": "F", "src": "img/f.png"}
+    ]
+
+
+def test_page_without_title_or_base():
+    document = PageDocument(
+        "http://h/docs/page.html", '<p><a href="a.html">A</a>', "html.parser"
+    )
+
+    assert document.title == "Untitled Page"
+    assert document.base_url == "http://h/docs/page.html"
+    assert document.canonical_url is None
+    assert document.links() == ["http://h/docs/a.html"]
+
+
+def test_tree_is_built_lazily_and_shared():
+    document = PageDocument(
+        "http://h/", '<title>T</title><img src="a.png">', "html.parser"
+    )
+    assert (document.title, document.links()) == ("T", [])
+    assert document._soup is None
+
+    images = document.images
+    soup = document.soup
+    html, converter_images = MarkdownConverter().extract_images(document, "http://h/")
+
+    assert soup is document.soup
+    assert converter_images is images and document.images is images
+    assert html == document.html
+    document.discard_soup()
+    assert document._soup is None
+    assert document.images is images
+    assert document.soup is not soup
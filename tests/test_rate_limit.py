@@ -0,0 +1,149 @@
+import time
+from email.utils import formatdate
+
+import pytest
+
+from crawler import Crawler, HostRateLimiter
+from http_client import retry_after_seconds
+from metrics import Metrics
+
+URL = "http://h/page"
+
+
+def interval(limiter, url=URL):
+    """Spacing the limiter currently puts between two requests to the URL's host."""
+    first = limiter.reserve(url)
+    return round(limiter.reserve(url) - first, 2)
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds(" 120 ") == 120
+    later = formatdate(time.time() + 60, usegmt=True)
+    assert retry_after_seconds(later) == pytest.approx(60, abs=2)
+    assert retry_after_seconds(formatdate(time.time() - 60, usegmt=True)) == 0
+    assert retry_after_seconds("soon") is None
+    assert retry_after_seconds(None) is None
+
+
+def test_requests_are_spaced_per_host():
+    limiter = HostRateLimiter(0.5)
+
+    assert limiter.reserve(URL) == 0
+    assert limiter.ready_in(URL) == pytest.approx(0.5, abs=0.05)
+    assert limiter.reserve(URL) == pytest.approx(0.5, abs=0.05)
+    assert limiter.ready_in("http://other/") == 0
+
+
+def test_fast_responses_speed_up_to_min_delay():
+    limiter = HostRateLimiter(1.0, min_delay=0.2)
+    for _ in range(20):
+        limiter.record(URL, 200, latency=0.01)
+
+    assert interval(limiter) == 0.2
+
+
+def test_rate_never_exceeds_delay_by_default():
+    limiter = HostRateLimiter(1.0)
+    for _ in range(20):
+        limiter.record(URL, 200, latency=0.01)
+
+    assert interval(limiter) == 1.0
+
+
+def test_errors_back_off_once_per_interval():
+    limiter = HostRateLimiter(1.0, max_delay=3.0)
+
+    limiter.record(URL, 503)
+    limiter.record(URL, None)
+    assert interval(limiter) == 2.0
+
+    # A later failure, once the hold is over, backs off up to max_delay
+    limiter._host(URL).hold_until = 0
+    limiter.record(URL, 429)
+    assert interval(limiter) == 3.0
+
+
+def test_slow_responses_back_off():
+    limiter = HostRateLimiter(1.0, max_delay=10.0)
+    limiter.record(URL, 200, latency=0.1)
+
+    limiter.record(URL, 200, latency=5.0)
+
+    assert interval(limiter) == 1.25
+
+
+def test_retry_after_holds_the_host_up_to_a_limit():
+    limiter = HostRateLimiter(0, max_retry_after=30)
+
+    limiter.record(URL, 503, retry_after=10)
+    assert limiter.ready_in(URL) == pytest.approx(10, abs=0.1)
+    limiter.record(URL, 503, retry_after=3600)
+    assert limiter.ready_in(URL) == pytest.approx(30, abs=0.1)
+
+
+def test_crawl_delay_is_a_floor():
+    limiter = HostRateLimiter(0.1, min_delay=0)
+    limiter.set_min_delay(URL, 2.0)
+    for _ in range(20):
+        limiter.record(URL, 200, latency=0.01)
+
+    assert interval(limiter) == 2.0
+
+
+def crawl(server, **kwargs):
+    options = dict(max_depth=1, delay=0, respect_robots_txt=False, retry_backoff=0.01)
+    options.update(kwargs)
+    crawler = Crawler(server.url("/index.html"), **options)
+    return crawler, crawler.crawl()
+
+
+def test_transient_failures_are_retried(server):
+    server.add_page("/index.html", "Home", ["flaky.html", "ok.html"])
+    server.add_page("/ok.html", "OK")
+    page = server.routes["/ok.html"][2]
+    server.routes["/flaky.html"] = lambda count: (
+        (503, {"Retry-After": "0"}, b"busy") if count < 3 else (200, {}, page)
+    )
+    metrics = Metrics()
+
+    _, results = crawl(server, metrics=metrics)
+
+    assert server.url("/flaky.html") in results
+    assert server.requests.count("/flaky.html") == 3
+    assert metrics.counters['retries_total{reason="503"}'] == 2
+
+
+def test_retries_give_up_after_max_retries(server):
+    server.add_page("/index.html", "Home", ["down.html"])
+    server.routes["/down.html"] = (500, {}, b"error")
+
+    crawler, results = crawl(server, max_retries=2)
+
+    assert server.url("/down.html") not in results
+    assert server.requests.count("/down.html") == 3
+    assert crawler.retry_counts == {}
+
+
+def test_robots_request_rate_spaces_requests(server):
+    # Crawl-delay only takes whole seconds, so ask for 5 requests per second
+    server.routes["/robots.txt"] = (
+        200,
+        {"Content-Type": "text/plain"},
+        b"User-agent: *\nRequest-rate: 5/1\n",
+    )
+    server.add_page("/index.html", "Home", ["a.html", "b.html"])
+    server.add_page("/a.html", "A")
+    server.add_page("/b.html", "B")
+    started = []
+    for path in ("/index.html", "/a.html", "/b.html"):
+
+        def timed(count, route=server.routes[path]):
+            started.append(time.monotonic())
+            return route
+
+        server.routes[path] = timed
+
+    crawl(server, respect_robots_txt=True, concurrency=3)
+
+    assert len(started) == 3
+    assert min(b - a for a, b in zip(started, started[1:])) > 0.15
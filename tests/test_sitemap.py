@@ -0,0 +1,114 @@
+import gzip
+
+from crawler import Crawler
+from http_client import create_session
+from sitemap import SitemapParser, SitemapReader, parse_lastmod
+
+XML = {"Content-Type": "application/xml"}
+
+
+def urlset(*entries):
+    body = "".join(f"<url><loc>{loc}</loc>{lastmod}</url>" for loc, lastmod in entries)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"{body}</urlset>"
+    ).encode()
+
+
+def sitemap_index(*locs):
+    body = "".join(f"<sitemap><loc>{loc}</loc></sitemap>" for loc in locs)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"{body}</sitemapindex>"
+    ).encode()
+
+
+def test_parse_lastmod():
+    assert parse_lastmod("1970-01-02") == 86400
+    assert parse_lastmod("1970-01-01T01:00:00Z") == 3600
+    assert parse_lastmod("1970-01-01T02:00:00+01:00") == 3600
+    assert parse_lastmod("yesterday") is None
+    assert parse_lastmod(None) is None
+
+
+def test_parser_handles_gzip_fed_byte_by_byte():
+    document = gzip.compress(
+        urlset(("http://a/x", "<lastmod>1970-01-02</lastmod>"), ("http://a/y", ""))
+    )
+    parser = SitemapParser()
+    entries = []
+    for i in range(len(document)):
+        entries.extend(parser.feed(document[i : i + 1]))
+    entries.extend(parser.close())
+
+    assert entries == [("http://a/x", 86400), ("http://a/y", None)]
+
+
+def test_reader_follows_indexes_and_skips_broken_sitemaps(server):
+    server.routes["/sitemap.xml"] = (
+        200,
+        XML,
+        sitemap_index(
+            server.url("/pages.xml.gz"),
+            server.url("/missing.xml"),
+            server.url("/broken.xml"),
+        ),
+    )
+    server.routes["/pages.xml.gz"] = (
+        200,
+        {"Content-Type": "application/x-gzip"},
+        gzip.compress(urlset(("http://a/1", ""))),
+    )
+    # Cut off inside the second entry
+    broken = urlset(("http://a/2", ""), ("http://a/3", ""))[:-20]
+    server.routes["/broken.xml"] = (200, XML, broken)
+
+    reader = SitemapReader(create_session())
+    entries = list(reader.iter_urls([server.url("/sitemap.xml")]))
+
+    # Entries read before the parse error are kept
+    assert entries == [("http://a/1", None), ("http://a/2", None)]
+    assert server.requests.count("/sitemap.xml") == 1
+
+
+def test_reader_stops_at_max_sitemaps(server):
+    # Each sitemap index lists itself and the next one
+    for i in range(5):
+        server.routes[f"/s{i}.xml"] = (
+            200,
+            XML,
+            sitemap_index(server.url(f"/s{i}.xml"), server.url(f"/s{i + 1}.xml")),
+        )
+
+    reader = SitemapReader(create_session(), max_sitemaps=3)
+    list(reader.iter_urls([server.url("/s0.xml")]))
+
+    assert server.requests == ["/s0.xml", "/s1.xml", "/s2.xml"]
+
+
+def test_crawl_seeds_same_site_pages_from_sitemap(server):
+    server.add_page("/index.html", "Home")
+    server.add_page("/orphan.html", "Orphan")
+    server.routes["/sitemap.xml"] = (
+        200,
+        XML,
+        urlset(
+            (server.url("/orphan.html"), "<lastmod>2024-05-01</lastmod>"),
+            ("http://elsewhere.invalid/page.html", ""),
+        ),
+    )
+
+    crawler = Crawler(
+        server.url("/index.html"),
+        max_depth=1,
+        delay=0,
+        respect_robots_txt=False,
+        use_sitemaps=True,
+    )
+    results = crawler.crawl()
+
+    assert set(results) == {server.url("/index.html"), server.url("/orphan.html")}
+    lastmod = crawler.sitemap_lastmod[server.url("/orphan.html")]
+    assert lastmod == parse_lastmod("2024-05-01")
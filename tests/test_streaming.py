@@ -0,0 +1,75 @@
+import os
+
+from docrepo import DocRepo
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x02" * 64
+
+
+def serve_site(server):
+    # Each page links to pages that are only crawled after it was saved
+    server.add_page(
+        "/docs/index.html",
+        "Index",
+        ["a.html", "b.html"],
+        body='<p><img src="logo.png" alt="Logo"></p>',
+    )
+    server.add_page("/docs/a.html", "A", ["b.html", "c.html#part"])
+    server.add_page(
+        "/docs/b.html",
+        "B",
+        ["index.html", "c.html"],
+        body='<p><img src="logo.png" alt="Logo"></p>',
+    )
+    server.add_page("/docs/c.html", "C", ["a.html"])
+    server.routes["/docs/logo.png"] = (200, {"Content-Type": "image/png"}, PNG)
+
+
+def generate(server, output_dir, **kwargs):
+    repo = DocRepo(
+        server.url("/docs/index.html"),
+        output_dir=str(output_dir),
+        delay=0,
+        respect_robots_txt=False,
+        **kwargs,
+    )
+    repo.run()
+    return repo
+
+
+def read_tree(output_dir):
+    contents = {}
+    for dirpath, _, filenames in os.walk(output_dir):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            with open(path, "rb") as f:
+                contents[os.path.relpath(path, output_dir)] = f.read()
+    return contents
+
+
+def test_streamed_pages_are_fixed_up_after_the_crawl(server, tmp_path):
+    serve_site(server)
+
+    repo = generate(server, tmp_path, stream=True)
+
+    filenames = {
+        path: repo.url_to_file_map[server.url(f"/docs/{path}")]
+        for path in ("index.html", "a.html", "b.html", "c.html")
+    }
+    with open(os.path.join(tmp_path, filenames["a.html"]), encoding="utf-8") as f:
+        markdown = f.read()
+    assert f"]({filenames['b.html']})" in markdown
+    assert f"]({filenames['c.html']}#part)" in markdown
+    # Only the front matter and the [Source] link keep the page's own URL
+    assert markdown.count(server.url("/docs/")) == 2
+    with open(os.path.join(tmp_path, filenames["index.html"]), encoding="utf-8") as f:
+        assert "](images/" in f.read()
+    assert server.requests.count("/docs/logo.png") == 1
+
+
+def test_streamed_output_matches_a_batch_run(server, tmp_path):
+    serve_site(server)
+
+    generate(server, tmp_path / "batch")
+    generate(server, tmp_path / "stream", stream=True)
+
+    assert read_tree(tmp_path / "stream") == read_tree(tmp_path / "batch")
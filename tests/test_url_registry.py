@@ -0,0 +1,82 @@
+import pytest
+
+from crawler import Crawler
+from file_handler import FileHandler
+from frontier import Frontier
+from url_registry import SEEN, VISITED, UrlMap, UrlRegistry, UrlSet
+
+
+def test_urls_are_interned_once():
+    registry = UrlRegistry()
+    url = "http://h/a"
+    copy = "".join(["http://h/", "a"])
+
+    assert registry.intern(url) == 0
+    assert registry.intern("http://h/b") == 1
+    assert registry.intern(copy) == 0
+    assert registry.url(0) is url
+    assert registry.lookup("http://h/b") == 1
+    assert registry.lookup("http://h/c") is None
+    assert "http://h/c" not in registry
+    assert len(registry) == 2
+
+
+def test_sets_share_the_registry_but_not_membership():
+    registry = UrlRegistry()
+    seen, visited = UrlSet(registry, SEEN), UrlSet(registry, VISITED)
+    seen.add("http://h/b")
+    seen.add("http://h/a")
+    seen.add("http://h/b")
+    visited.add("http://h/a")
+
+    assert len(registry) == 2
+    assert "http://h/a" in seen and "http://h/a" in visited
+    assert "http://h/b" in seen and "http://h/b" not in visited
+    assert "http://h/c" not in seen and len(registry) == 2
+    assert (len(seen), len(visited)) == (2, 1)
+    # Iteration follows the order URLs were first registered
+    assert list(seen) == ["http://h/b", "http://h/a"]
+
+    seen.discard("http://h/b")
+    seen.discard("http://h/b")
+    seen.discard("http://h/never")
+    assert list(seen) == ["http://h/a"] and len(seen) == 1
+    assert list(visited) == ["http://h/a"]
+
+
+def test_map_get_set_and_delete():
+    registry = UrlRegistry()
+    registry.intern("http://h/first")
+    titles = UrlMap(registry)
+    titles["http://h/b"] = "B"
+    titles["http://h/a"] = "A"
+    titles["http://h/b"] = "B2"
+    titles["http://h/none"] = None
+
+    assert titles["http://h/b"] == "B2"
+    assert titles.get("http://h/first") is None
+    assert titles.get("http://h/first", "-") == "-"
+    assert titles.get("http://h/none", "-") is None
+    assert "http://h/none" in titles and "http://h/first" not in titles
+    assert list(titles) == ["http://h/b", "http://h/a", "http://h/none"]
+    assert len(titles) == 3
+    with pytest.raises(KeyError):
+        titles["http://h/unknown"]
+
+    del titles["http://h/b"]
+    with pytest.raises(KeyError):
+        del titles["http://h/b"]
+    assert dict(titles) == {"http://h/a": "A", "http://h/none": None}
+
+
+def test_components_share_an_empty_registry(tmp_path):
+    registry = UrlRegistry()
+    crawler = Crawler("http://h/", registry=registry, respect_robots_txt=False)
+    frontier = Frontier(registry)
+    file_handler = FileHandler(str(tmp_path), registry=registry)
+
+    frontier.add("http://h/a", 0)
+    file_handler.url_to_file_map["http://h/b"] = "h_b.md"
+
+    assert crawler.registry is registry and frontier.registry is registry
+    assert registry.lookup("http://h/a") == 0 and registry.lookup("http://h/b") == 1
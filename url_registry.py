@@ -0,0 +1,150 @@
+from collections.abc import MutableMapping, MutableSet
+from typing import Any, Dict, Iterator, List, Optional
+
+# Per-URL flag bits kept in UrlRegistry.flags
+SEEN = 0x01
+VISITED = 0x02
+
+# Marks an empty slot in a UrlMap
+_MISSING = object()
+
+
+class UrlRegistry:
+    def __init__(self):
+        """
+        Intern URLs into dense integer ids shared by all crawl components.
+
+        Each URL string is stored once, no matter how many components refer
+        to it. Per-URL state lives in compact structures indexed by id: one
+        byte of flags per URL here, and one list slot per URL in each UrlMap.
+        """
+        self._ids: Dict[str, int] = {}
+        self._urls: List[str] = []
+        self.flags = bytearray()
+
+    def intern(self, url: str) -> int:
+        """
+        Return the id of a URL, registering it if it is new.
+
+        Args:
+            url: The URL to intern
+
+        Returns:
+            The URL's integer id
+        """
+        url_id = self._ids.get(url)
+        if url_id is None:
+            url_id = len(self._urls)
+            self._ids[url] = url_id
+            self._urls.append(url)
+            self.flags.append(0)
+        return url_id
+
+    def lookup(self, url: str) -> Optional[int]:
+        """Return the id of a URL, or None if it was never registered."""
+        return self._ids.get(url)
+
+    def url(self, url_id: int) -> str:
+        """Return the URL registered under an id."""
+        return self._urls[url_id]
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._ids
+
+
+class UrlSet(MutableSet):
+    def __init__(self, registry: UrlRegistry, flag: int):
+        """
+        Set of URLs stored as one flag bit per id in a UrlRegistry.
+
+        Args:
+            registry: Registry the URLs are interned in
+            flag: Flag bit that marks membership
+        """
+        self.registry = registry
+        self.flag = flag
+        self._count = 0
+
+    def __contains__(self, url: Any) -> bool:
+        url_id = self.registry.lookup(url)
+        return url_id is not None and bool(self.registry.flags[url_id] & self.flag)
+
+    def add(self, url: str) -> None:
+        url_id = self.registry.intern(url)
+        if not self.registry.flags[url_id] & self.flag:
+            self.registry.flags[url_id] |= self.flag
+            self._count += 1
+
+    def discard(self, url: str) -> None:
+        url_id = self.registry.lookup(url)
+        if url_id is not None and self.registry.flags[url_id] & self.flag:
+            self.registry.flags[url_id] &= ~self.flag
+            self._count -= 1
+
+    def __iter__(self) -> Iterator[str]:
+        flag = self.flag
+        for url_id, flags in enumerate(self.registry.flags):
+            if flags & flag:
+                yield self.registry.url(url_id)
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class UrlMap(MutableMapping):
+    def __init__(self, registry: UrlRegistry):
+        """
+        Dictionary keyed by URL, stored as a list indexed by registry id.
+
+        Args:
+            registry: Registry the URLs are interned in
+        """
+        self.registry = registry
+        self._values: List[Any] = []
+        self._count = 0
+
+    def __getitem__(self, url: str) -> Any:
+        value = self.get(url, _MISSING)
+        if value is _MISSING:
+            raise KeyError(url)
+        return value
+
+    def get(self, url: str, default: Any = None) -> Any:
+        url_id = self.registry.lookup(url)
+        if url_id is None or url_id >= len(self._values):
+            return default
+        value = self._values[url_id]
+        return default if value is _MISSING else value
+
+    def __contains__(self, url: Any) -> bool:
+        return self.get(url, _MISSING) is not _MISSING
+
+    def __setitem__(self, url: str, value: Any) -> None:
+        url_id = self.registry.intern(url)
+        if url_id >= len(self._values):
+            self._values.extend([_MISSING] * (url_id + 1 - len(self._values)))
+        if self._values[url_id] is _MISSING:
+            self._count += 1
+        self._values[url_id] = value
+
+    def __delitem__(self, url: str) -> None:
+        url_id = self.registry.lookup(url)
+        if (
+            url_id is None
+            or url_id >= len(self._values)
+            or self._values[url_id] is _MISSING
+        ):
+            raise KeyError(url)
+        self._values[url_id] = _MISSING
+        self._count -= 1
+
+    def __iter__(self) -> Iterator[str]:
+        for url_id, value in enumerate(self._values):
+            if value is not _MISSING:
+                yield self.registry.url(url_id)
+
+    def __len__(self) -> int:
+        return self._count